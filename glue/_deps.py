@@ -171,7 +171,8 @@ general = (
     Dependency('scipy', 'Used for some image processing calculation'),
     Dependency('skimage',
                'Used to read popular image formats (jpeg, png, etc.)',
-               'scikit-image'))
+               'scikit-image'),
+    Dependency('numexpr', 'Used to speed up the evaluation of custom components and subsets'))
 
 
 ipython = (
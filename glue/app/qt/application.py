@@ -851,7 +851,8 @@ class GlueApplication(Application, QtWidgets.QMainWindow):
         # include file filter twice, so it shows up in Dialog
         outfile, file_filter = compat.getsavefilename(
             parent=self, filters=("Glue Session (*.glu);; "
-                                  "Glue Session including data (*.glu)"))
+                                  "Glue Session including data (*.glu);; "
+                                  "Glue Session bundle including data (*.glu)"))
 
         # This indicates that the user cancelled
         if not outfile:
@@ -863,7 +864,8 @@ class GlueApplication(Application, QtWidgets.QMainWindow):
 
         with set_cursor_cm(Qt.WaitCursor):
             self.save_session(
-                outfile, include_data="including data" in file_filter)
+                outfile, include_data="including data" in file_filter,
+                bundle="bundle" in file_filter)
 
     @messagebox_on_error("Failed to export session")
     def _choose_export_session(self, saver, checker, outmode):
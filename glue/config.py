@@ -771,3 +771,11 @@ settings.add('DATA_ALPHA', 0.8, validator=float)
 settings.add('BACKGROUND_COLOR', '#FFFFFF')
 settings.add('FOREGROUND_COLOR', '#000000')
 settings.add('SHOW_LARGE_DATA_WARNING', True, validator=bool)
+settings.add('MASK_CACHE_SIZE', 512, validator=int)
+settings.add('MASK_CHUNK_SIZE', 2 ** 22, validator=int)
+settings.add('DERIVED_CACHE_SIZE', 0, validator=int)
+settings.add('WORLD_CACHE_SIZE', 256, validator=int)
+settings.add('ROI_INDEX_CACHE_SIZE', 512, validator=int)
+settings.add('SPECTRUM_CACHE_SIZE', 16, validator=int)
+settings.add('IMAGE_PYRAMID', False, validator=bool)
+settings.add('LAZY_SESSION_RESTORE', False, validator=bool)
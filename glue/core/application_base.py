@@ -91,22 +91,30 @@ class Application(HubListener):
         return c
 
     @catch_error("Failed to save session")
-    def save_session(self, path, include_data=False):
+    def save_session(self, path, include_data=False, bundle=False):
         """ Save the data collection and hub to file.
 
         Can be restored via restore_session
 
+        If ``bundle`` is `True`, the session is saved as a zip file in which
+        arrays (e.g. data and masks) are stored separately from the JSON
+        description of the session, which makes it faster to save and load
+        sessions that include large arrays.
+
         Note: Saving of client is not currently supported. Thus,
         restoring this session will lose all current viz windows
         """
         from glue.core.state import GlueSerializer
         gs = GlueSerializer(self, include_data=include_data)
+        if bundle:
+            gs.dump_bundle(path, indent=2)
+            return
         state = gs.dumps(indent=2)
         with open(path, 'w') as out:
             out.write(state)
 
     @staticmethod
-    def restore_session(path):
+    def restore_session(path, lazy=None):
         """
         Reload a previously-saved session
 
@@ -114,16 +122,26 @@ class Application(HubListener):
         ----------
         path : str
             Path to the file to load
+        lazy : bool, optional
+            If `True`, data that was saved as references to files is only read
+            from the files once the values are needed. Defaults to the
+            ``LAZY_SESSION_RESTORE`` setting.
 
         Returns
         -------
         app : :class:`Application`
             The loaded application
         """
-        from glue.core.state import GlueUnSerializer
+        from glue.core.state import GlueUnSerializer, is_bundle
 
-        with open(path) as infile:
-            state = GlueUnSerializer.load(infile)
+        if lazy is None:
+            lazy = settings.LAZY_SESSION_RESTORE
+
+        if is_bundle(path):
+            state = GlueUnSerializer.load_bundle(path, lazy=lazy)
+        else:
+            with open(path) as infile:
+                state = GlueUnSerializer.load(infile, lazy=lazy)
 
         return state.object('__main__')
 
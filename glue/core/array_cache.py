@@ -0,0 +1,120 @@
+"""
+A generic least-recently-used cache for arrays with a memory budget.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+
+from glue.config import settings
+
+__all__ = ['ArrayCache']
+
+
+class ArrayCache(object):
+    """
+    A least-recently-used cache of arrays with a memory budget.
+
+    Parameters
+    ----------
+    setting : str or `None`
+        The name of the setting giving the default size of the cache (in
+        megabytes). This can be `None` if ``max_bytes`` is specified.
+    max_bytes : int, optional
+        The maximum total size of the arrays in the cache. If not specified,
+        this is determined by ``setting``.
+    """
+
+    def __init__(self, setting, max_bytes=None):
+        self._max_bytes = max_bytes
+        self._setting = setting
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is None:
+            return int(getattr(settings, self._setting) * 1024 ** 2)
+        else:
+            return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        self._max_bytes = value
+        self._evict()
+
+    @property
+    def nbytes(self):
+        """
+        The total size of the arrays in the cache.
+        """
+        return self._bytes
+
+    @property
+    def stats(self):
+        """
+        A dictionary with the number of cache hits, misses, and evictions,
+        as well as the number of entries and total size of the cache.
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Return the array for ``key``, or `None` if it is not in the cache.
+        """
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Add an array to the cache, evicting older arrays if needed.
+        """
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._bytes += value.nbytes
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, value = self._entries.popitem(last=False)
+            self._bytes -= value.nbytes
+            self.evictions += 1
+
+    def clear(self, data=None):
+        """
+        Remove all arrays from the cache, or only the arrays computed for
+        ``data`` if specified (this assumes that the dataset is the second
+        item in the cache keys).
+        """
+        if data is None:
+            self._entries.clear()
+            self._bytes = 0
+        else:
+            for key in list(self._entries):
+                if key[1] is data:
+                    self._bytes -= self._entries.pop(key).nbytes
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
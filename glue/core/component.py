@@ -14,12 +14,28 @@ from glue.core.subset import (RoiSubsetState, RangeSubsetState,
 from glue.core.roi import (PolygonalROI, CategoricalROI, RangeROI, XRangeROI,
                            YRangeROI, RectangularROI)
 from glue.core.util import row_lookup
+from glue.core.array_cache import ArrayCache
+from glue.config import settings
 from glue.utils import (unique, shape_to_string, coerce_numeric, check_sorted,
                         polygon_line_intersections, broadcast_to)
 
 
-__all__ = ['Component', 'DerivedComponent', 'CategoricalComponent',
-           'CoordinateComponent']
+__all__ = ['Component', 'DerivedComponent', 'DeferredComponent',
+           'CategoricalComponent', 'DeferredCategoricalComponent',
+           'CoordinateComponent', 'DERIVED_CACHE', 'WORLD_CACHE']
+
+# The maximum size of the (minimal) world coordinate arrays computed by
+# CoordinateComponent - larger arrays are computed directly for each view.
+WORLD_CACHE_MAX_SIZE = 2 ** 24
+
+# Cache for the world coordinates computed by CoordinateComponent, with a
+# maximum size in megabytes set by WORLD_CACHE_SIZE.
+WORLD_CACHE = ArrayCache('WORLD_CACHE_SIZE')
+
+# Cache for the values of derived components. This is disabled by default,
+# and can be enabled by setting DERIVED_CACHE_SIZE to the maximum size of the
+# cache in megabytes.
+DERIVED_CACHE = ArrayCache('DERIVED_CACHE_SIZE')
 
 
 class Component(object):
@@ -248,7 +264,7 @@ class DerivedComponent(Component):
     @property
     def data(self):
         """ Return the numerical data as a numpy array """
-        return self._link.compute(self._data)
+        return self._compute()
 
     @property
     def link(self):
@@ -256,7 +272,100 @@ class DerivedComponent(Component):
         return self._link
 
     def __getitem__(self, key):
-        return self._link.compute(self._data, key)
+        return self._compute(key)
+
+    def _compute(self, view=None):
+
+        # If the cache is enabled, we cache the values for the whole dataset,
+        # and serve views by slicing the cached values. The cache keys include
+        # the version of the dataset, which changes whenever the values of any
+        # of the components change. Identity links are cheap to compute so we
+        # don't cache these.
+
+        if settings.DERIVED_CACHE_SIZE > 0 and not getattr(self._link, 'identity', False):
+            key = (self, self._data, getattr(self._data, '_version', 0))
+            result = DERIVED_CACHE.get(key)
+            if result is None and view is None:
+                result = self._link.compute(self._data)
+                DERIVED_CACHE.set(key, result)
+            if result is not None:
+                return result if view is None else result[view]
+
+        if view is None:
+            return self._link.compute(self._data)
+        else:
+            return self._link.compute(self._data, view)
+
+
+class DeferredComponent(Component):
+
+    """
+    A component whose values are only loaded when they are first accessed.
+
+    This is used when restoring sessions lazily, so that files are only read
+    once the data is actually needed. The shape and data type are known in
+    advance so that the component can be added to a dataset and shown in the
+    user interface without loading the values.
+
+    Parameters
+    ----------
+    loader : callable
+        A function that takes no arguments and returns the values of the
+        component.
+    shape : tuple
+        The shape of the values
+    dtype : `~numpy.dtype`, optional
+        The data type of the values, if known
+    units : str, optional
+        Unit label
+    """
+
+    def __init__(self, loader, shape, dtype=None, units=None):
+        self._loader = loader
+        self._shape = tuple(shape)
+        self._dtype = None if dtype is None else np.dtype(dtype)
+        super(DeferredComponent, self).__init__(None, units=units)
+
+    @property
+    def _data(self):
+        if self._values is None:
+            data = coerce_numeric(np.asarray(self._loader()))
+            if data.shape != self._shape:
+                raise ValueError("Shape of loaded values {0} does not match "
+                                 "the expected shape {1}".format(data.shape, self._shape))
+            data.setflags(write=False)
+            self._values = data
+        return self._values
+
+    @_data.setter
+    def _data(self, value):
+        self._values = value
+
+    @property
+    def loaded(self):
+        """ Whether the values have been loaded """
+        return self._values is not None
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def ndim(self):
+        return len(self._shape)
+
+    @property
+    def numeric(self):
+        if self._dtype is None or self.loaded:
+            return super(DeferredComponent, self).numeric
+        return np.can_cast(self._dtype, np.complex)
+
+    @property
+    def dtype(self):
+        """ The data type of the values """
+        if self._dtype is None or self.loaded:
+            return self._data.dtype
+        return self._dtype
 
 
 class CoordinateComponent(Component):
@@ -276,6 +385,47 @@ class CoordinateComponent(Component):
     def data(self):
         return self._calculate()
 
+    def _world_coordinates(self):
+        """
+        Return the world coordinates for the whole dataset, in a minimal form
+        where axes that the coordinates don't depend on have length one. This
+        is kept in :data:`WORLD_CACHE` (until the coordinates or the shape of
+        the data change). If the minimal array would be too large, `None` is
+        returned.
+        """
+
+        coords = self._data.coords
+        shape = self._data.shape
+
+        key = (self, self._data, coords, shape)
+
+        world_coords = WORLD_CACHE.get(key)
+        if world_coords is not None:
+            return world_coords
+
+        dep_coords = coords.dependent_axes(self.axis)
+
+        minimal_shape = tuple(shape[i] if i in dep_coords else 1
+                              for i in range(self._data.ndim))
+
+        if np.prod(minimal_shape) > WORLD_CACHE_MAX_SIZE:
+            return None
+
+        # For separable axes, this results in a 1D lookup table along the
+        # axis, and the coordinate object is never called on N-dimensional
+        # arrays of pixel coordinates.
+        pix_coords = [np.arange(shape[i]) if i in dep_coords else 0
+                      for i in range(self._data.ndim)]
+        pix_coords = np.meshgrid(*pix_coords, indexing='ij', copy=False)
+
+        axis = self._data.ndim - 1 - self.axis
+        world_coords = coords.pixel2world_single_axis(*pix_coords[::-1], axis=axis)
+        world_coords = np.array(world_coords).reshape(minimal_shape)
+
+        WORLD_CACHE.set(key, world_coords)
+
+        return world_coords
+
     def _calculate(self, view=None):
 
         if self.world:
@@ -293,7 +443,10 @@ class CoordinateComponent(Component):
 
             # To optimize this, we therefore essentially consider only the
             # dependent dimensions and then broacast the result to the full
-            # array size at the very end.
+            # array size at the very end. The world coordinates for the
+            # dependent dimensions are cached, so that accessing the
+            # coordinates again (e.g. for a different view) does not require
+            # the coordinates to be recomputed.
 
             # view=None actually adds a dimension which is never what we really
             # mean, at least in glue.
@@ -319,68 +472,104 @@ class CoordinateComponent(Component):
                 else:
                     optimize_view = True
 
-            pix_coords = []
-            dep_coords = self._data.coords.dependent_axes(self.axis)
+            world_coords = self._world_coordinates()
+
+            if world_coords is None:
+                return self._calculate_world(view, optimize_view)
+
+            if not optimize_view:
+                world_coords = broadcast_to(world_coords, self._data.shape)
+                if view is Ellipsis:
+                    return world_coords
+                else:
+                    return world_coords[view]
 
             final_slice = []
             final_shape = []
 
             for i in range(self._data.ndim):
 
-                if optimize_view and i < len(view) and np.isscalar(view[i]):
-                    final_slice.append(0)
+                if i < len(view):
+                    if np.isscalar(view[i]):
+                        final_slice.append(0 if world_coords.shape[i] == 1 else view[i])
+                    else:
+                        size = len(range(*view[i].indices(self._data.shape[i])))
+                        final_shape.append(size)
+                        final_slice.append(slice(None) if world_coords.shape[i] == 1 else view[i])
                 else:
                     final_slice.append(slice(None))
+                    final_shape.append(self._data.shape[i])
 
-                # We set up a 1D pixel axis along that dimension.
-                pix_coord = np.arange(self._data.shape[i])
+            return broadcast_to(world_coords[tuple(final_slice)], tuple(final_shape))
 
-                # If a view was specified, we need to take it into account for
-                # that axis.
-                if optimize_view and i < len(view):
-                    pix_coord = pix_coord[view[i]]
-                    if not np.isscalar(view[i]):
-                        final_shape.append(len(pix_coord))
-                else:
-                    final_shape.append(self._data.shape[i])
+        else:
+
+            slices = [slice(0, s, 1) for s in self.shape]
+            grids = np.broadcast_arrays(*np.ogrid[slices])
+            if view is not None:
+                grids = [g[view] for g in grids]
+            return grids[self.axis]
 
-                if i not in dep_coords:
-                    # The axis is not dependent on this instance's axis, so we
-                    # just compute the values once and broadcast along this
-                    # dimension later.
-                    pix_coord = 0
+    def _calculate_world(self, view, optimize_view):
 
-                pix_coords.append(pix_coord)
+        # Compute the world coordinates for a view without caching, which is
+        # used if the world coordinates depend on too many dimensions to be
+        # cached.
 
-            # We build the list of N arrays, one for each pixel coordinate
-            pix_coords = np.meshgrid(*pix_coords, indexing='ij', copy=False)
+        pix_coords = []
+        dep_coords = self._data.coords.dependent_axes(self.axis)
 
-            # Finally we convert these to world coordinates
-            axis = self._data.ndim - 1 - self.axis
-            world_coords = self._data.coords.pixel2world_single_axis(*pix_coords[::-1],
-                                                                     axis=axis)
+        final_slice = []
+        final_shape = []
 
-            # We get rid of any dimension for which using the view should get
-            # rid of that dimension.
-            if optimize_view:
-                world_coords = world_coords[tuple(final_slice)]
+        for i in range(self._data.ndim):
 
-            # We then broadcast the final array back to what it should be
-            world_coords = broadcast_to(world_coords, tuple(final_shape))
+            if optimize_view and i < len(view) and np.isscalar(view[i]):
+                final_slice.append(0)
+            else:
+                final_slice.append(slice(None))
+
+            # We set up a 1D pixel axis along that dimension.
+            pix_coord = np.arange(self._data.shape[i])
 
-            # We apply the view if we weren't able to optimize before
-            if optimize_view:
-                return world_coords
+            # If a view was specified, we need to take it into account for
+            # that axis.
+            if optimize_view and i < len(view):
+                pix_coord = pix_coord[view[i]]
+                if not np.isscalar(view[i]):
+                    final_shape.append(len(pix_coord))
             else:
-                return world_coords[view]
+                final_shape.append(self._data.shape[i])
 
-        else:
+            if i not in dep_coords:
+                # The axis is not dependent on this instance's axis, so we
+                # just compute the values once and broadcast along this
+                # dimension later.
+                pix_coord = 0
 
-            slices = [slice(0, s, 1) for s in self.shape]
-            grids = np.broadcast_arrays(*np.ogrid[slices])
-            if view is not None:
-                grids = [g[view] for g in grids]
-            return grids[self.axis]
+            pix_coords.append(pix_coord)
+
+        # We build the list of N arrays, one for each pixel coordinate
+        pix_coords = np.meshgrid(*pix_coords, indexing='ij', copy=False)
+
+        # Finally we convert these to world coordinates
+        axis = self._data.ndim - 1 - self.axis
+        world_coords = self._data.coords.pixel2world_single_axis(*pix_coords[::-1],
+                                                                 axis=axis)
+
+        # We get rid of any dimension for which using the view should get
+        # rid of that dimension.
+        if optimize_view:
+            world_coords = world_coords[tuple(final_slice)]
+
+        # We then broadcast the final array back to what it should be
+        world_coords = broadcast_to(world_coords, tuple(final_shape))
+
+        # We apply the view if we weren't able to optimize before
+        if optimize_view:
+            return world_coords
+        else:
+            return world_coords[view]
 
     @property
     def shape(self):
@@ -693,3 +882,104 @@ class CategoricalComponent(Component):
 
         return pd.Series(self._categorical_data.ravel(),
                          dtype=np.object, **kwargs)
+
+
+class DeferredCategoricalComponent(CategoricalComponent):
+
+    """
+    A categorical component whose values are only loaded when they are first
+    accessed.
+
+    This is the equivalent of :class:`DeferredComponent` for categorical
+    data - the categories and codes are computed once the values have been
+    loaded.
+
+    Parameters
+    ----------
+    loader : callable
+        A function that takes no arguments and returns the (non-numerical)
+        values of the component.
+    shape : tuple
+        The shape of the values
+    dtype : `~numpy.dtype`, optional
+        The data type of the values, if known
+    jitter : str, optional
+        Strategy for jittering the data
+    units : str, optional
+        Unit label
+    """
+
+    def __init__(self, loader, shape, dtype=None, jitter=None, units=None):
+        self._loader = loader
+        self._shape = tuple(shape)
+        self._dtype = None if dtype is None else np.dtype(dtype)
+        self._labels = None
+        self._loaded_categories = None
+        self._codes = None
+        self._jitter_method = jitter
+        self._is_jittered = False
+        Component.__init__(self, None, units=units)
+
+    def _load(self):
+        if self._labels is None:
+            labels = np.asarray(self._loader())
+            if labels.shape != self._shape:
+                raise ValueError("Shape of loaded values {0} does not match "
+                                 "the expected shape {1}".format(labels.shape, self._shape))
+            labels.setflags(write=False)
+            self._labels = labels
+            self._update_categories()
+
+    # The attributes used by CategoricalComponent trigger the loading of the
+    # values when they are first accessed.
+
+    @property
+    def _categorical_data(self):
+        self._load()
+        return self._labels
+
+    @_categorical_data.setter
+    def _categorical_data(self, value):
+        self._labels = value
+
+    @property
+    def _categories(self):
+        self._load()
+        return self._loaded_categories
+
+    @_categories.setter
+    def _categories(self, value):
+        self._loaded_categories = value
+
+    @property
+    def _data(self):
+        self._load()
+        return self._codes
+
+    @_data.setter
+    def _data(self, value):
+        self._codes = value
+
+    @property
+    def loaded(self):
+        """ Whether the values have been loaded """
+        return self._labels is not None
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def ndim(self):
+        return len(self._shape)
+
+    @property
+    def dtype(self):
+        """ The data type of the (non-numerical) values """
+        if self._dtype is None or self.loaded:
+            return self._categorical_data.dtype
+        return self._dtype
+
+    def jitter(self, method=None):
+        self._load()
+        super(DeferredCategoricalComponent, self).jitter(method=method)
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function
 
+import weakref
 import numbers
 import logging
 import operator
@@ -10,6 +11,7 @@ from glue.external.six import add_metaclass
 from glue.core.contracts import contract, ContractsMeta
 from glue.core.subset import InequalitySubsetState
 from glue.core.util import join_component_view
+from glue.utils import view_key
 
 
 __all__ = ['ComponentLink', 'BinaryComponentLink', 'CoordinateComponentLink']
@@ -23,6 +25,73 @@ OPSYM = {operator.add: '+', operator.sub: '-',
          operator.pow: '**'}
 
 
+class MultiOutputCache(object):
+    """
+    Share the results of a link function that returns several outputs
+    between the links for the individual outputs.
+
+    Functions such as coordinate transformations compute several output
+    components at once, and each output is computed by a separate
+    :class:`ComponentLink` (see :class:`~glue.core.link_helpers.MultiLink`).
+    This keeps the outputs of the last call to the function, so that
+    computing the sibling components for the same dataset, input components
+    and view (and as long as the dataset does not change) does not call the
+    function again. To limit the memory used, the outputs are discarded once
+    each of them has been requested.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._data = None
+        self._key = None
+        self._outputs = None
+        self._shape = None
+        self._pending = None
+
+    def compute(self, func, index, data, from_ids, view=None):
+        """
+        Return output ``index`` of ``func`` applied to the values of the
+        components ``from_ids`` in ``data``, as well as the shape of the
+        inputs.
+        """
+
+        try:
+            key = (getattr(data, '_version', 0), view_key(view)) + tuple(id(cid) for cid in from_ids)
+        except TypeError:  # views with arrays are not cached
+            key = None
+
+        if (key is not None and self._key == key and
+                self._data is not None and self._data() is data and
+                index in self._pending):
+            outputs, shape = self._outputs, self._shape
+            self._pending.discard(index)
+            if not self._pending:
+                self.clear()
+            return outputs[index], shape
+
+        args = [data[join_component_view(f, view)] for f in from_ids]
+        outputs = func(*args)
+        shape = args[0].shape
+
+        self.clear()
+
+        if key is not None and len(outputs) > 1:
+            try:
+                self._data = weakref.ref(data)
+            except TypeError:
+                pass
+            else:
+                self._key = key
+                self._outputs = outputs
+                self._shape = shape
+                self._pending = set(range(len(outputs)))
+                self._pending.discard(index)
+
+        return outputs[index], shape
+
+
 @add_metaclass(ContractsMeta)
 class ComponentLink(object):
 
@@ -145,16 +214,24 @@ class ComponentLink(object):
             ComponentIDs needed for the transformation
         """
         logger = logging.getLogger(__name__)
-        args = [data[join_component_view(f, view)] for f in self._from]
-        logger.debug("shape of first argument: %s", args[0].shape)
-        result = self._using(*args)
+        # Functions with several outputs can share the result of a single
+        # call between the links for each output
+        cache = getattr(self._using, 'cache', None)
+        if isinstance(cache, MultiOutputCache):
+            result, shape = cache.compute(self._using.func, self._using.index,
+                                          data, self._from, view)
+        else:
+            args = [data[join_component_view(f, view)] for f in self._from]
+            shape = args[0].shape
+            result = self._using(*args)
+        logger.debug("shape of first argument: %s", shape)
         # We call asarray since link functions may return Python scalars in some cases
         result = np.asarray(result)
         logger.debug("shape of result: %s", result.shape)
-        if result.shape != args[0].shape:
+        if result.shape != shape:
             logger.debug("ComponentLink function %s changed shape. Fixing",
                          self._using.__name__)
-            result.shape = args[0].shape
+            result.shape = shape
         return result
 
     def get_from_ids(self):
@@ -257,7 +257,14 @@ class WCSCoordinates(Coordinates):
 
     def dependent_axes(self, axis):
 
-        # TODO: we should cache this
+        # The WCS is not expected to change, so we cache the result. Note that
+        # the cache may not be present if the object was unpickled.
+        cache = self.__dict__.setdefault('_dependent_axes_cache', {})
+        if axis not in cache:
+            cache[axis] = self._dependent_axes(axis)
+        return cache[axis]
+
+    def _dependent_axes(self, axis):
 
         # if distorted, all bets are off
         try:
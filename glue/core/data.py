@@ -11,13 +11,14 @@ from glue.core.message import (DataUpdateMessage, DataRemoveComponentMessage,
                                DataAddComponentMessage, NumericalDataChangedMessage,
                                SubsetCreateMessage, ComponentsChangedMessage,
                                ComponentReplacedMessage)
-from glue.core.decorators import clear_cache
 from glue.core.util import split_component_view
 from glue.core.hub import Hub
 from glue.core.subset import Subset, SubsetState
 from glue.core.component_id import ComponentIDList
 from glue.core.component_link import ComponentLink, CoordinateComponentLink
 from glue.core.exceptions import IncompatibleAttribute
+from glue.core.joins import JoinIndex
+from glue.core.statistics import DataStatistics
 from glue.core.visual import VisualAttributes
 from glue.core.coordinates import Coordinates
 from glue.core.contracts import contract
@@ -88,6 +89,15 @@ class Data(object):
         # Subsets of the data
         self._subsets = []
 
+        # Version counter, incremented every time the components or their
+        # values change. This is used in particular as part of the keys for
+        # cached subset masks.
+        self._version = 0
+
+        # Statistics of the components, computed on demand and kept until
+        # the version changes
+        self.statistics = DataStatistics(self)
+
         # Hub that the data is attached to
         self.hub = None
 
@@ -105,6 +115,9 @@ class Data(object):
 
         self._key_joins = {}
 
+        # Cache of the indices used to propagate selections across joins
+        self._key_join_indices = {}
+
         # To avoid circular references when saving objects with references to
         # the data, we make sure that all Data objects have a UUID that can
         # uniquely identify them.
@@ -177,6 +190,7 @@ class Data(object):
         """
         if component_id in self._components:
             self._components.pop(component_id)
+            self._version += 1
             if self.hub:
                 msg = DataRemoveComponentMessage(self, component_id)
                 self.hub.broadcast(msg)
@@ -240,9 +254,6 @@ class Data(object):
 
         **Joining on multiple components**
 
-        .. note:: This mode is currently slow, and will be optimized
-                  significantly in future.
-
         Next, one can specify several components for each dataset: in this
         case, the number of components given should match for both datasets.
         This causes items in both datasets to be linked when (and only when)
@@ -354,6 +365,37 @@ class Data(object):
         self._key_joins[other] = (cid, cid_other)
         other._key_joins[self] = (cid_other, cid)
 
+        self._key_join_indices.pop(other, None)
+        other._key_join_indices.pop(self, None)
+
+    def _get_join_index(self, other):
+        """
+        Return the :class:`~glue.core.joins.JoinIndex` used to propagate
+        selections from ``other`` to this dataset, building it if needed.
+        """
+        cid, cid_other = self._key_joins[other]
+        index = self._key_join_indices.get(other)
+        if index is None or not index.matches(cid, cid_other):
+            index = JoinIndex(self, other, cid, cid_other)
+            self._key_join_indices[other] = index
+        return index
+
+    def _clear_join_indices(self, cids=None):
+        """
+        Remove cached join indices involving this dataset.
+
+        If ``cids`` is given, only the indices that depend on these key
+        components of this dataset are removed.
+        """
+        for other in list(self._key_join_indices):
+            index = self._key_join_indices[other]
+            if cids is None or index.depends_on(cids):
+                self._key_join_indices.pop(other)
+        for other in self._key_joins:
+            index = other._key_join_indices.get(self)
+            if index is not None and (cids is None or index.depends_on(cids, other=True)):
+                other._key_join_indices.pop(self)
+
     @contract(component='component_like', label='cid_like')
     def add_component(self, component, label, hidden=False):
         """ Add a new component to this data set.
@@ -403,6 +445,7 @@ class Data(object):
 
         is_present = component_id in self._components
         self._components[component_id] = component
+        self._version += 1
 
         first_component = len(self._components) == 1
         if first_component:
@@ -745,6 +788,9 @@ class Data(object):
         except ValueError:
             pass
 
+        if changed:
+            self._version += 1
+
         if changed and self.hub is not None:
             # promote hidden status
             new._hidden = new.hidden and old.hidden
@@ -882,22 +928,30 @@ class Data(object):
           - New compoments must have the same shape as old compoments
           - Component subclasses cannot be updated.
         """
+        changed = []
         for comp, data in mapping.items():
             if isinstance(comp, ComponentID):
+                changed.append(comp)
                 comp = self.get_component(comp)
+            else:
+                changed.extend(cid for cid, c in self._components.items() if c is comp)
             data = np.asarray(data)
             if data.shape != self.shape:
                 raise ValueError("Cannot change shape of data")
 
             comp._data = data
 
+        # Derived components may depend on any of the updated components
+        changed.extend(self.derived_components)
+
+        self._version += 1
+
         # alert hub of the change
         if self.hub is not None:
             msg = NumericalDataChangedMessage(self)
             self.hub.broadcast(msg)
 
-        for subset in self.subsets:
-            clear_cache(subset.subset_state.to_mask)
+        self._clear_join_indices(changed)
 
     def update_values_from_data(self, data):
         """
@@ -963,13 +1017,14 @@ class Data(object):
         # Update data coordinates
         self.coords = data.coords
 
+        self._version += 1
+
         # alert hub of the change
         if self.hub is not None:
             msg = NumericalDataChangedMessage(self)
             self.hub.broadcast(msg)
 
-        for subset in self.subsets:
-            clear_cache(subset.subset_state.to_mask)
+        self._clear_join_indices()
 
 
 @contract(i=int, ndim=int)
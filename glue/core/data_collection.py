@@ -7,6 +7,9 @@ from glue.core.message import (DataCollectionAddMessage,
 from glue.core.registry import Registry
 from glue.core.link_manager import LinkManager
 from glue.core.data import Data
+from glue.core.component import DERIVED_CACHE, WORLD_CACHE
+from glue.core.point_index import POINT_INDEX_CACHE
+from glue.core.mask_cache import MASK_CACHE
 from glue.core.hub import Hub, HubListener
 from glue.core.coordinates import WCSCoordinates
 from glue.config import settings
@@ -96,24 +99,38 @@ class DataCollection(HubListener):
             return
         self._data.remove(data)
         Registry().unregister(data, Data)
+        MASK_CACHE.clear(data)
+        DERIVED_CACHE.clear(data)
+        WORLD_CACHE.clear(data)
+        POINT_INDEX_CACHE.clear(data)
+        # Imported here since glue.core should not depend on the plugins
+        # when the module is imported
+        from glue.plugins.tools.spectrum_tool.extraction import SPECTRUM_CACHE
+        SPECTRUM_CACHE.clear(data)
         if self.hub:
             msg = DataCollectionDeleteMessage(self, data)
             self.hub.broadcast(msg)
 
-    def _sync_link_manager(self):
+    def _sync_link_manager(self, data=None):
         """ update the LinkManager, so all the DerivedComponents
         for each data set are up-to-date
+
+        If ``data`` is specified, only the links in that dataset are
+        added, and only the datasets affected by these links are updated.
         """
 
         # add any links in the data
-        for d in self._data:
-            for derived in d.derived_components:
-                self._link_manager.add_link(d.get_component(derived).link)
-            for link in d.coordinate_links:
+        new_links = []
+        for d in self._data if data is None else [data]:
+            links = [d.get_component(derived).link for derived in d.derived_components]
+            for link in links + list(d.coordinate_links):
+                if link not in self._link_manager and link.inverse not in self._link_manager:
+                    new_links.append(link)
                 self._link_manager.add_link(link)
 
         for d in self._data:
-            self._link_manager.update_data_components(d)
+            if data is None or d is data or self._link_manager.is_affected(d, new_links):
+                self._link_manager.update_data_components(d)
 
     @property
     def links(self):
@@ -134,7 +151,8 @@ class DataCollection(HubListener):
         """
         self._link_manager.add_link(links)
         for d in self._data:
-            self._link_manager.update_data_components(d)
+            if self._link_manager.is_affected(d, links):
+                self._link_manager.update_data_components(d)
 
     def remove_link(self, links):
         """
@@ -149,7 +167,8 @@ class DataCollection(HubListener):
         """
         self._link_manager.remove_link(links)
         for d in self._data:
-            self._link_manager.update_data_components(d)
+            if self._link_manager.is_affected(d, links):
+                self._link_manager.update_data_components(d)
 
 
     def _merge_link(self, link):
@@ -192,7 +211,7 @@ class DataCollection(HubListener):
                 s.register()
 
         hub.subscribe(self, DataAddComponentMessage,
-                      lambda msg: self._sync_link_manager(),
+                      lambda msg: self._sync_link_manager(msg.sender),
                       filter=lambda x: x.sender in self._data)
 
     def new_subset_group(self, label=None, subset_state=None):
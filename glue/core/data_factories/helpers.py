@@ -29,6 +29,7 @@ import warnings
 
 from glue.core.contracts import contract
 from glue.core.data import Component, Data
+from glue.core.component import DeferredComponent, DeferredCategoricalComponent
 from glue.config import auto_refresh, data_factory
 from glue.backends import get_timer
 from glue.utils import as_list
@@ -99,6 +100,12 @@ class LoadLog(object):
         self.components = []
         self.data = []
 
+        # When restoring sessions lazily, the file is only read once one of
+        # the components is needed - until then, the components are
+        # represented by placeholders, indexed by their position in the log.
+        self._pending = False
+        self._placeholders = {}
+
         if auto_refresh():
             self.watcher = FileWatcher(path, self.reload)
         else:
@@ -118,11 +125,90 @@ class LoadLog(object):
         obj._load_log = self
 
     def id(self, component):
+        for index, placeholder in self._placeholders.items():
+            if placeholder is component:
+                return index
         return self.components.index(component)
 
     def component(self, index):
+        self.materialize()
         return self.components[index]
 
+    def deferred_component(self, index, shape, dtype=None, units=None,
+                           categorical=False):
+        """
+        Return a placeholder for a component which is only read from the file
+        when its values are first accessed.
+
+        If the file has already been read, the component is returned directly.
+        """
+
+        if not self._pending:
+            return self.component(index)
+
+        if index not in self._placeholders:
+
+            if categorical:
+
+                def loader():
+                    self.materialize()
+                    return self.components[index].labels
+
+                placeholder = DeferredCategoricalComponent(loader, shape, dtype=dtype, units=units)
+
+            else:
+
+                def loader():
+                    self.materialize()
+                    return self.components[index].data
+
+                placeholder = DeferredComponent(loader, shape, dtype=dtype, units=units)
+
+            placeholder._load_log = self
+            self._placeholders[index] = placeholder
+
+        return self._placeholders[index]
+
+    def materialize(self):
+        """
+        Read the file if this log was restored lazily and has not been read yet.
+        """
+
+        if not self._pending:
+            return
+
+        d = load_data(self.path, factory=self.factory, **self.kwargs)
+        log = as_list(d)[0]._load_log
+
+        if log.watcher is not None:
+            log.watcher.stop()
+
+        for index, placeholder in self._placeholders.items():
+            if placeholder.shape != log.components[index].shape:
+                raise ValueError("Cannot load data from {0} -- data shape "
+                                 "changed".format(self.path))
+
+        self._pending = False
+        self.components = list(log.components)
+
+        # Placeholders take the place of the loaded components, so that
+        # components already used in the session keep their identity.
+        for index, component in enumerate(self.components):
+            placeholder = self._placeholders.get(index)
+            if placeholder is None:
+                component._load_log = self
+            else:
+                if isinstance(placeholder, DeferredCategoricalComponent):
+                    placeholder._categorical_data = component.labels
+                    placeholder._categories = component.categories
+                    placeholder._data = component.codes
+                else:
+                    placeholder._data = component.data
+                placeholder.units = component.units
+                self.components[index] = placeholder
+
+        self._placeholders.clear()
+
     def reload(self):
         """
         Re-read files, and update data
@@ -145,7 +231,7 @@ class LoadLog(object):
             mapping = dict((c, log.component(self.id(c)).data)
                            for c in dold._components.values()
                            if c in self.components
-                           and type(c) == Component)
+                           and type(c) in (Component, DeferredComponent))
             dold.coords = dnew.coords
             dold.update_components(mapping)
 
@@ -158,6 +244,10 @@ class LoadLog(object):
     def __setgluestate__(cls, rec, context):
         fac = context.object(rec['factory'])
         kwargs = dict(*rec['kwargs'])
+        if getattr(context, 'lazy', False):
+            log = cls(rec['path'], fac, kwargs)
+            log._pending = True
+            return log
         d = load_data(rec['path'], factory=fac, **kwargs)
         return as_list(d)[0]._load_log
 
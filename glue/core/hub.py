@@ -1,11 +1,14 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+import numbers
+import weakref
 from contextlib import contextmanager
 from weakref import WeakKeyDictionary
 from inspect import getmro
 from collections import defaultdict
 
+from glue.external import six
 from glue.core.exceptions import InvalidSubscriber, InvalidMessage
 from glue.core.message import Message
 from glue.core.hub_callback_container import HubCallbackContainer
@@ -41,6 +44,11 @@ class Hub(object):
         # Dictionary of subscriptions
         self._subscriptions = WeakKeyDictionary()
 
+        # Dispatch table giving, for each message class that has been
+        # broadcast, the subscribers and the message class they subscribed
+        # to that should be used. This is reset when subscriptions change.
+        self._dispatch = {}
+
         self._paused = False
         self._queue = []
 
@@ -116,6 +124,7 @@ class Hub(object):
             self._subscriptions[subscriber] = HubCallbackContainer()
 
         self._subscriptions[subscriber][message_class] = handler, filter
+        self._dispatch.clear()
 
     def is_subscribed(self, subscriber, message):
         """
@@ -150,6 +159,7 @@ class Hub(object):
             return
         if message in self._subscriptions[subscriber]:
             self._subscriptions[subscriber].pop(message)
+            self._dispatch.clear()
 
     def unsubscribe_all(self, subscriber):
         """
@@ -157,6 +167,38 @@ class Hub(object):
         """
         if subscriber in self._subscriptions:
             self._subscriptions.pop(subscriber)
+            self._dispatch.clear()
+
+    def _dispatch_entries(self, message_class):
+        """
+        Return a list of (subscriber reference, message class) pairs for
+        subscribers that should receive messages of class ``message_class``,
+        where the message class is the most specific class the subscriber has
+        subscribed to.
+        """
+
+        if message_class not in self._dispatch:
+
+            entries = []
+
+            # loop over subscribed objects
+            for subscriber, subscriptions in list(self._subscriptions.items()):
+
+                # subscriptions to message or its superclasses
+                messages = [msg for msg in subscriptions.keys() if
+                            issubclass(message_class, msg)]
+
+                if len(messages) == 0:
+                    continue
+
+                # narrow to the most-specific message
+                candidate = max(messages, key=_mro_count)
+
+                entries.append((weakref.ref(subscriber), candidate))
+
+            self._dispatch[message_class] = entries
+
+        return self._dispatch[message_class]
 
     def _find_handlers(self, message):
         """Yields all (subscriber, handler) pairs that should receive a message
@@ -164,34 +206,53 @@ class Hub(object):
         # self._subscriptions:
         # subscriber => { message type => (filter, handler)}
 
-        # loop over subscribed objects
-        for subscriber, subscriptions in list(self._subscriptions.items()):
+        for subscriber_ref, candidate in self._dispatch_entries(type(message)):
 
-            # subscriptions to message or its superclasses
-            messages = [msg for msg in subscriptions.keys() if
-                        issubclass(type(message), msg)]
+            subscriber = subscriber_ref()
 
-            if len(messages) == 0:
+            # Skip subscribers that have since been garbage collected
+            if subscriber is None or subscriber not in self._subscriptions:
                 continue
 
-            # narrow to the most-specific message
-            candidate = max(messages, key=_mro_count)
+            subscriptions = self._subscriptions[subscriber]
+
+            # Callbacks can be removed automatically if the objects they
+            # are defined on are garbage collected, in which case we fall
+            # back to the remaining subscriptions for this subscriber.
+            if candidate not in subscriptions:
+                messages = [msg for msg in subscriptions.keys() if
+                            issubclass(type(message), msg)]
+                if len(messages) == 0:
+                    continue
+                candidate = max(messages, key=_mro_count)
 
             handler, test = subscriptions[candidate]
             if test(message):
                 yield subscriber, handler
 
     @contextmanager
-    def delay_callbacks(self):
+    def delay_callbacks(self, coalesce=False):
+        """
+        Delay the delivery of messages until the end of the context manager.
+
+        Parameters
+        ----------
+        coalesce : bool, optional
+            If `True`, duplicate messages (messages of the same class with the
+            same sender, attribute, and other properties) are only delivered
+            once, at the position of the first occurrence but using the last
+            message.
+        """
         self._paused = True
         try:
             yield
         finally:
             self._paused = False
-            # TODO: could de-duplicate messages here
-            for message in self._queue:
+            queue, self._queue = self._queue, []
+            if coalesce:
+                queue = _coalesce_messages(queue)
+            for message in queue:
                 self.broadcast(message)
-            self._queue = []
 
     def broadcast(self, message):
         """Broadcasts a message to all subscribed objects.
@@ -215,6 +276,7 @@ class Hub(object):
         """
         result = self.__dict__.copy()
         result['_subscriptions'] = self._subscriptions.copy()
+        result['_dispatch'] = {}
         for s in self._subscriptions:
             try:
                 module = s.__module__
@@ -247,3 +309,37 @@ class HubListener(object):
 
 def _mro_count(obj):
     return len(getmro(obj))
+
+
+def _message_key(message):
+    """
+    Return a key identifying duplicate messages, based on the message class,
+    the sender, and any other properties of the message (such as the
+    attribute that was changed).
+    """
+    key = [type(message), id(message.sender)]
+    for name, value in sorted(vars(message).items()):
+        if name == 'sender':
+            continue
+        if value is None or isinstance(value, (numbers.Number, six.string_types)):
+            key.append((name, value))
+        else:
+            key.append((name, id(value)))
+    return tuple(key)
+
+
+def _coalesce_messages(messages):
+    """
+    Remove duplicate messages from a list of messages, keeping the position
+    of the first occurrence and the last message object.
+    """
+    positions = {}
+    result = []
+    for message in messages:
+        key = _message_key(message)
+        if key in positions:
+            result[positions[key]] = message
+        else:
+            positions[key] = len(result)
+            result.append(message)
+    return result
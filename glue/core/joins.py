@@ -0,0 +1,258 @@
+"""
+Index structures used to propagate selections between datasets that have been
+joined with :meth:`~glue.core.data.Data.join_on_key`.
+
+Rather than comparing key values row by row, the key components of both
+datasets are factorized into integer codes that live in a common code space.
+For joins on several components at once, the per-component codes are packed
+into a single integer per row. Propagating a selection then reduces to
+flagging the codes present in the selected rows of one dataset and looking up
+these flags for every row of the other dataset, which is fully vectorized.
+In addition, the rows of each dataset are sorted by code, which allows the
+matching rows to be found by only visiting the selected rows.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import pandas as pd
+
+from glue.core.component_id import ComponentID
+
+__all__ = ['JoinIndex', 'factorize_keys']
+
+# Once the number of possible packed codes exceeds this value, we re-factorize
+# the partially packed codes to keep them compact and avoid integer overflow.
+MAX_PACKED_CODES = 2 ** 31
+
+
+def _factorize(values):
+    """
+    Convert an array of values to integer codes, with missing values (NaN or
+    None) given a code of -1.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes.astype(np.int64), len(uniques)
+
+
+def _concatenate(arrays):
+    arrays = [np.asarray(array).ravel() for array in arrays]
+    try:
+        return np.concatenate(arrays)
+    except TypeError:
+        return np.concatenate([array.astype(object) for array in arrays])
+
+
+def factorize_keys(left, right, compound):
+    """
+    Convert key values from two datasets to integer codes in a shared space.
+
+    Parameters
+    ----------
+    left, right : list of `numpy.ndarray`
+        The key values for each key component in the two datasets. All arrays
+        for a given dataset should have the same size.
+    compound : bool
+        If `True`, ``left`` and ``right`` should have the same length, and the
+        codes for the different key components are packed into a single code
+        per row, so that rows only match if all their keys match. If `False`,
+        each key component is factorized separately but in the same code space,
+        so that any key in one dataset can match any key in the other.
+
+    Returns
+    -------
+    left_codes, right_codes : list of `numpy.ndarray`
+        The codes for each dataset. If ``compound`` is `True`, each list
+        contains a single array. Missing values are given the code ``n_codes``.
+    n_codes : int
+        The number of valid codes.
+    """
+
+    if compound:
+
+        n_left = np.asarray(left[0]).size
+        packed = None
+        invalid = None
+        n_codes = 1
+
+        for left_i, right_i in zip(left, right):
+
+            codes, n_i = _factorize(_concatenate([left_i, right_i]))
+
+            if invalid is None:
+                invalid = codes < 0
+                packed = codes
+            else:
+                invalid |= codes < 0
+                if n_codes * n_i > MAX_PACKED_CODES:
+                    packed, n_codes = _factorize(packed)
+                packed = packed * n_i + codes
+
+            n_codes *= n_i
+
+        valid = ~invalid
+        codes, n_codes = _factorize(packed[valid])
+        packed = np.full(packed.shape, n_codes, dtype=np.int64)
+        packed[valid] = codes
+
+        return [packed[:n_left]], [packed[n_left:]], n_codes
+
+    else:
+
+        sizes = [np.asarray(values).size for values in list(left) + list(right)]
+        codes, n_codes = _factorize(_concatenate(list(left) + list(right)))
+        codes[codes < 0] = n_codes
+
+        codes = np.split(codes, np.cumsum(sizes)[:-1])
+
+        return codes[:len(left)], codes[len(left):], n_codes
+
+
+def _key_values(data, cid):
+    # For categorical components, the codes are specific to each dataset, so
+    # we join on the labels instead.
+    comp = data.get_component(cid)
+    if comp.categorical:
+        return comp.labels
+    else:
+        return data[cid]
+
+
+class JoinIndex(object):
+    """
+    A pre-computed mapping between the keys of two joined datasets.
+
+    The index is built once for a given ``(data, other, cid, cid_other)``
+    combination and can then be used to propagate any selection made on
+    ``other`` to ``data``.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset to which selections are propagated
+    other : :class:`~glue.core.data.Data`
+        The dataset on which selections are defined
+    cid : tuple of :class:`~glue.core.component_id.ComponentID`
+        The key component(s) in ``data``
+    cid_other : tuple of :class:`~glue.core.component_id.ComponentID`
+        The key component(s) in ``other``
+    """
+
+    def __init__(self, data, other, cid, cid_other):
+
+        if isinstance(cid, ComponentID):
+            cid = (cid,)
+        if isinstance(cid_other, ComponentID):
+            cid_other = (cid_other,)
+
+        if len(cid) > 1 and len(cid_other) > 1 and len(cid) != len(cid_other):
+            raise Exception("Either the number of components in the key join sets "
+                            "should match, or one of the component sets should "
+                            "contain a single component.")
+
+        self.shape = data.shape
+        self.other_shape = other.shape
+        self.cid = tuple(cid)
+        self.cid_other = tuple(cid_other)
+
+        left = [_key_values(data, c) for c in self.cid]
+        right = [_key_values(other, c) for c in self.cid_other]
+
+        compound = len(self.cid) == len(self.cid_other)
+
+        self._codes, self._other_codes, self.n_codes = factorize_keys(left, right, compound)
+
+        self._mapping = None
+
+    def matches(self, cid, cid_other):
+        """
+        Whether the index was built for the given key components.
+        """
+        return tuple(cid) == self.cid and tuple(cid_other) == self.cid_other
+
+    def selected_codes(self, mask_other):
+        """
+        Return a boolean array indicating which codes are present in the rows
+        of ``other`` selected by ``mask_other``.
+        """
+        mask_other = np.asarray(mask_other, dtype=bool).ravel()
+        selected = np.zeros(self.n_codes + 1, dtype=bool)
+        for codes in self._other_codes:
+            selected[codes[mask_other]] = True
+        # The last code is reserved for missing values, which never match
+        selected[-1] = False
+        return selected
+
+    def _row_mapping(self):
+        # Build (once) a CSR-style mapping from each code to the (flattened)
+        # rows of data with that code, by sorting the rows by code.
+        if self._mapping is None:
+            self._mapping = []
+            for codes in self._codes:
+                order = np.argsort(codes, kind='mergesort')
+                counts = np.bincount(codes, minlength=self.n_codes + 1)
+                offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+                np.cumsum(counts, out=offsets[1:])
+                self._mapping.append((order, offsets))
+        return self._mapping
+
+    def to_index_list(self, mask_other):
+        """
+        Given a mask defined on ``other``, return the sorted indices of the
+        matching elements in the flattened ``data``.
+
+        This only visits the rows of ``other`` that are selected and the rows
+        of ``data`` that match, using a pre-computed sorted mapping from keys
+        to rows of ``data``.
+        """
+
+        mask_other = np.asarray(mask_other, dtype=bool).ravel()
+        rows_other = np.flatnonzero(mask_other)
+
+        codes = np.unique(np.concatenate([other_codes[rows_other]
+                                          for other_codes in self._other_codes]))
+        codes = codes[codes < self.n_codes]
+
+        result = []
+        for order, offsets in self._row_mapping():
+            start = offsets[codes]
+            length = offsets[codes + 1] - start
+            # Expand the (start, length) ranges into individual positions
+            shift = np.repeat(start - np.cumsum(length) + length, length)
+            result.append(order[shift + np.arange(length.sum())])
+
+        if len(result) == 1:
+            return np.sort(result[0])
+        else:
+            return np.unique(np.concatenate(result))
+
+    def to_mask(self, mask_other, view=None):
+        """
+        Given a mask defined on ``other``, return the mask of matching elements
+        in ``data``, optionally for a view of ``data``.
+        """
+
+        if view is None:
+            result = np.zeros(self.shape, dtype=bool)
+            result.flat[self.to_index_list(mask_other)] = True
+            return result
+
+        selected = self.selected_codes(mask_other)
+
+        result = None
+        for codes in self._codes:
+            codes = codes.reshape(self.shape)[view]
+            if result is None:
+                result = selected[codes]
+            else:
+                result |= selected[codes]
+
+        return result
+
+    def depends_on(self, cids, other=False):
+        """
+        Whether the index uses any of the given key components of ``data``
+        (or of ``other`` if ``other`` is `True`).
+        """
+        keys = self.cid_other if other else self.cid
+        return any(cid in keys for cid in cids)
@@ -9,10 +9,12 @@ multiple ComponentLinks easily. They are meant to be passed to
 
 from __future__ import absolute_import, division, print_function
 
+from weakref import WeakKeyDictionary
+
 from glue.config import link_function
 from glue.external import six
 from glue.core.data import ComponentID
-from glue.core.component_link import ComponentLink
+from glue.core.component_link import ComponentLink, MultiOutputCache
 
 
 __all__ = ['LinkCollection', 'LinkSame', 'LinkTwoWay', 'MultiLink',
@@ -31,11 +33,31 @@ def lengths_to_volume(width, height, depth):
     return width * height * depth
 
 
+# The caches shared by all the PartialResult objects for a given function
+_MULTI_OUTPUT_CACHES = WeakKeyDictionary()
+
+
+def _multi_output_cache(func):
+    try:
+        return _MULTI_OUTPUT_CACHES.setdefault(func, MultiOutputCache())
+    except TypeError:  # func can't be used as a key
+        return MultiOutputCache()
+
+
 class PartialResult(object):
+    """
+    One of the outputs of a function returning several outputs.
+
+    When used in a :class:`~glue.core.component_link.ComponentLink`, the
+    function is only called once when computing the different outputs for
+    the same data and view (see
+    :class:`~glue.core.component_link.MultiOutputCache`).
+    """
 
     def __init__(self, func, index, name_prefix=""):
         self.func = func
         self.index = index
+        self.cache = _multi_output_cache(func)
         self.__name__ = '%s%s_%i' % (name_prefix, func.__name__, index + 1)
 
     def __call__(self, *args, **kwargs):
@@ -30,8 +30,8 @@ from glue.core.component import DerivedComponent
 from glue.core.exceptions import IncompatibleAttribute
 
 
-__all__ = ['accessible_links', 'discover_links', 'find_dependents',
-           'LinkManager', 'is_equivalent_cid']
+__all__ = ['accessible_links', 'consumer_index', 'discover_links',
+           'find_dependents', 'LinkManager', 'is_equivalent_cid']
 
 
 def accessible_links(cids, links):
@@ -50,42 +50,84 @@ def accessible_links(cids, links):
             set(l.get_from_ids()) <= cids]
 
 
-def discover_links(data, links):
+def _flatten_links(links):
+    """
+    Convert a ComponentLink, LinkCollection, or list thereof to a flat list
+    of ComponentLink objects.
+    """
+    if isinstance(links, (LinkCollection, list, tuple, set)):
+        result = []
+        for link in links:
+            result.extend(_flatten_links(link))
+        return result
+    else:
+        return [links]
+
+
+def consumer_index(links):
+    """ Build a reverse index from each ComponentID to the ComponentLink
+    objects that use it as an input.
+
+    :param links: Iterable of ComponentLink objects
+
+    :rtype: dict
+    A dict of componentID -> set of ComponentLinks
+    """
+    index = {}
+    for link in links:
+        for cid in link.get_from_ids():
+            index.setdefault(cid, set()).add(link)
+    return index
+
+
+def discover_links(data, links, consumers=None):
     """ Discover all links to components that can be derived
     based on the current components known to a dataset, and a set
     of ComponentLinks.
 
+    The links are resolved with a breadth-first search starting from the
+    primary components of the dataset, so that each component is derived
+    using the shortest possible chain of links.
+
     :param Data: Data object to discover new components for
     :param links: Set of ComponentLinks to use
+    :param consumers: Optional reverse index for ``links``, as returned
+                      by :func:`consumer_index`
 
     :rtype: dict
     A dict of componentID -> componentLink
     The ComponentLink that data can use to generate the componentID.
     """
 
-    # TODO: try to add shortest paths first -- should
-    # prevent lots of repeated checking
+    if consumers is None:
+        consumers = consumer_index(links)
 
     cids = set(data.primary_components)
     cid_links = {}
-    depth = {}
-    for cid in cids:
-        depth[cid] = 0
-
-    while True:
-        for link in accessible_links(cids, links):
-            from_ = set(link.get_from_ids())
-            to_ = link.get_to_id()
-            cost = max([depth[f] for f in from_]) + 1
-            if to_ in cids and cost >= depth[to_]:
-                continue
-            depth[to_] = cost
-            cids.add(to_)
-            cid_links[to_] = link
-            break
-        else:
-            # no more links to add
-            break
+
+    # Number of inputs of each link that have not been reached yet
+    missing = {}
+
+    frontier = list(cids)
+    while frontier:
+        new_frontier = []
+        for cid in frontier:
+            for link in consumers.get(cid, ()):
+                if link not in missing:
+                    missing[link] = len(set(link.get_from_ids()))
+                missing[link] -= 1
+                if missing[link] > 0:
+                    continue
+                to_ = link.get_to_id()
+                # Since components are reached in order of increasing depth,
+                # the first link found for a component is the shortest.
+                if to_ in cids:
+                    continue
+                cids.add(to_)
+                cid_links[to_] = link
+                new_frontier.append(to_)
+        frontier = new_frontier
+
     return cid_links
 
 
@@ -101,24 +143,21 @@ def find_dependents(data, link):
     A `set` of `glue.core.component.DerivedComponent` IDs that cannot be
     calculated without the input `Link`
     """
-    dependents = set()
-    visited = set()
-    while True:
-        for derived in data.derived_components:
-            derived = data.get_component(derived)
-            if derived in visited:
-                continue
-            to_, from_ = derived.link.get_to_id(), derived.link.get_from_ids()
-            if derived.link is link:
-                dependents.add(to_)
-                visited.add(derived)
-                break
-            if any(f in dependents for f in from_):
+
+    derived = [data.get_component(cid).link for cid in data.derived_components]
+    consumers = consumer_index(derived)
+
+    dependents = set(l.get_to_id() for l in derived if l is link)
+
+    queue = list(dependents)
+    while queue:
+        cid = queue.pop()
+        for l in consumers.get(cid, ()):
+            to_ = l.get_to_id()
+            if to_ not in dependents:
                 dependents.add(to_)
-                visited.add(derived)
-                break
-        else:
-            break  # nothing more to remove
+                queue.append(to_)
+
     return dependents
 
 
@@ -130,6 +169,7 @@ class LinkManager(HubListener):
 
     def __init__(self):
         self._links = set()
+        self._consumers = {}
         self.hub = None
 
     def register_to_hub(self, hub):
@@ -161,8 +201,9 @@ class LinkManager(HubListener):
             for l in link:
                 self.add_link(l)
         else:
-            if link.inverse not in self._links:
+            if link.inverse not in self._links and link not in self._links:
                 self._links.add(link)
+                self._index_link(link)
 
     @contract(link=ComponentLink)
     def remove_link(self, link):
@@ -172,6 +213,45 @@ class LinkManager(HubListener):
         else:
             logging.getLogger(__name__).debug('removing link %s', link)
             self._links.remove(link)
+            self._unindex_link(link)
+
+    def _index_link(self, link):
+        for l in (link, link.inverse):
+            if l is not None:
+                for cid in l.get_from_ids():
+                    self._consumers.setdefault(cid, set()).add(l)
+
+    def _unindex_link(self, link):
+        for l in (link, link.inverse):
+            if l is not None:
+                for cid in l.get_from_ids():
+                    consumers = self._consumers.get(cid)
+                    if consumers is not None:
+                        consumers.discard(l)
+                        if not consumers:
+                            self._consumers.pop(cid)
+
+    def is_affected(self, data, links):
+        """
+        Whether the derived components of a dataset may need to be updated
+        after adding or removing links.
+
+        Parameters
+        ----------
+        data : Data object
+        links : ComponentLink, LinkCollection, or list thereof
+           The links that were added or removed
+        """
+        links = _flatten_links(links)
+        links = set(links) | set(l.inverse for l in links if l.inverse is not None)
+        for cid in data.derived_components:
+            if data.get_component(cid).link in links:
+                return True
+        components = set(data.components)
+        for link in links:
+            if any(cid in components for cid in link.get_from_ids()):
+                return True
+        return False
 
     @contract(data=Data)
     def update_data_components(self, data):
@@ -224,7 +304,8 @@ class LinkManager(HubListener):
         LinkManager
 
         """
-        links = discover_links(data, self._links | self._inverse_links)
+        links = discover_links(data, self._links | self._inverse_links,
+                               consumers=self._consumers)
         for cid, link in six.iteritems(links):
             d = DerivedComponent(data, link)
             if cid not in data.components:
@@ -236,6 +317,7 @@ class LinkManager(HubListener):
 
     def clear(self):
         self._links.clear()
+        self._consumers.clear()
 
     def __contains__(self, item):
         return item in self._links
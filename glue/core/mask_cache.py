@@ -0,0 +1,87 @@
+"""
+A bounded cache for the masks computed by subset states.
+
+Masks are full-size boolean arrays, so rather than keeping every mask that
+has ever been computed, the cache holds at most ``settings.MASK_CACHE_SIZE``
+megabytes of masks, discarding the least recently used masks first. Cache
+keys include the version of the datasets involved (which is incremented
+whenever the values in a dataset are changed) so that masks for datasets that
+have not changed remain valid and do not need to be explicitly cleared.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from functools import wraps
+
+import numpy as np
+
+from glue.core.array_cache import ArrayCache
+from glue.utils import view_key
+
+__all__ = ['MaskCache', 'MASK_CACHE', 'cached_mask']
+
+
+def _data_versions(state, data):
+    """
+    Return a tuple of versions for the dataset the mask is computed for, as
+    well as for any other dataset that the subset state attributes belong to
+    (since these can be linked to the dataset via derived components).
+    """
+    versions = [getattr(data, '_version', 0)]
+    try:
+        attributes = state.attributes
+    except Exception:
+        attributes = ()
+    for att in attributes:
+        parent = getattr(att, 'parent', None)
+        if parent is not None and parent is not data:
+            versions.append((parent.uuid, getattr(parent, '_version', 0)))
+    return tuple(versions)
+
+
+class MaskCache(ArrayCache):
+    """
+    A least-recently-used cache of mask arrays with a memory budget.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        The maximum total size of the masks in the cache. If not specified,
+        this is determined by the ``MASK_CACHE_SIZE`` setting (in megabytes).
+    """
+
+    def __init__(self, max_bytes=None):
+        super(MaskCache, self).__init__('MASK_CACHE_SIZE', max_bytes=max_bytes)
+
+
+MASK_CACHE = MaskCache()
+
+
+def cached_mask(func):
+    """
+    Decorator for :meth:`SubsetState.to_mask` methods that caches the
+    resulting masks in :data:`MASK_CACHE`.
+    """
+
+    @wraps(func)
+    def wrapper(self, data, view=None):
+
+        try:
+            key = (self, data, _data_versions(self, data), view_key(view))
+            hash(key)
+        except TypeError:  # unhashable input
+            return func(self, data, view)
+
+        result = MASK_CACHE.get(key)
+        if result is None:
+            result = func(self, data, view)
+            if isinstance(result, np.ndarray):
+                MASK_CACHE.set(key, result)
+
+        return result
+
+    # Used to identify subset states whose masks are cached, since these
+    # are assumed not to be modified in place.
+    wrapper.cached = True
+
+    return wrapper
@@ -0,0 +1,498 @@
+"""
+Compact representations of subset masks.
+
+Subset masks are conceptually boolean arrays with the same shape as the data
+they are defined on, but for large datasets, storing them as dense boolean
+arrays can use a lot of memory, especially since selections are often sparse.
+This module provides several representations of masks:
+
+* :class:`DenseMask`: a plain boolean array
+* :class:`IndexMask`: a sorted list of the (flattened) indices of the selected
+  elements, suited to sparse selections
+* :class:`RunLengthMask`: a list of runs of consecutive selected elements,
+  suited to selections with large contiguous regions (e.g. slabs of a cube)
+* :class:`BitPackedMask`: a boolean array packed into one bit per element
+
+All representations can be combined with the ``&``, ``|``, ``^`` and ``~``
+operators without being converted to dense boolean arrays, and can be
+converted to index lists or dense arrays with :meth:`Mask.to_index_list` and
+:meth:`Mask.to_dense`. The :func:`compress` function can be used to find the
+most compact representation for a given boolean array.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import operator
+
+import numpy as np
+
+__all__ = ['Mask', 'DenseMask', 'IndexMask', 'RunLengthMask', 'BitPackedMask',
+           'compress']
+
+# The number of elements to process at a time when converting between
+# representations that would otherwise require a full-size temporary array.
+BLOCK_SIZE = 8 * 1024 ** 2
+
+
+def _expand_ranges(starts, ends):
+    """
+    Given arrays of start and (exclusive) end values, return the concatenation
+    of all ``np.arange(start, end)``.
+    """
+    lengths = ends - starts
+    shift = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shift + np.arange(lengths.sum())
+
+
+def _basic_view(view, shape):
+    """
+    If ``view`` only contains slices, integers, and Ellipsis, return it as a
+    tuple with one slice or integer per dimension, otherwise return `None`.
+    """
+
+    if not isinstance(view, tuple):
+        view = (view,)
+
+    result = []
+    for i, item in enumerate(view):
+        if item is Ellipsis:
+            result.extend([slice(None)] * (len(shape) - len(view) + 1))
+        elif isinstance(item, (slice, int, np.integer)):
+            result.append(item)
+        else:
+            return None
+
+    if len(result) > len(shape):
+        return None
+
+    result.extend([slice(None)] * (len(shape) - len(result)))
+
+    return tuple(result)
+
+
+class Mask(object):
+    """
+    Base class for mask representations.
+
+    Sub-classes should implement :meth:`_fill`, :meth:`to_index_list`,
+    :meth:`contains`, :meth:`count` and the :attr:`nbytes` property.
+    """
+
+    shape = None
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes used by the representation.
+        """
+        raise NotImplementedError()
+
+    def _fill(self, out, start):
+        """
+        Fill the 1D boolean array ``out`` with the values of the flattened
+        mask starting at position ``start``.
+        """
+        raise NotImplementedError()
+
+    def count(self):
+        """
+        The number of selected elements.
+        """
+        raise NotImplementedError()
+
+    def contains(self, indices):
+        """
+        Return a boolean array indicating which of the flattened ``indices``
+        are selected.
+        """
+        raise NotImplementedError()
+
+    def to_index_list(self):
+        """
+        Return the sorted indices of the selected elements in the flattened
+        mask.
+        """
+        raise NotImplementedError()
+
+    def to_dense(self, view=None):
+        """
+        Return the mask as a boolean array, optionally for a view of the
+        array.
+        """
+        result = np.zeros(self.size, dtype=bool)
+        self._fill(result, 0)
+        result = result.reshape(self.shape)
+        if view is not None:
+            result = result[view]
+        return result
+
+    def __array__(self, dtype=None):
+        result = self.to_dense()
+        if dtype is not None:
+            result = result.astype(dtype)
+        return result
+
+    def _check_shape(self, other):
+        if not isinstance(other, Mask):
+            return NotImplemented
+        if other.shape != self.shape:
+            raise ValueError("Masks have different shapes: {0} and {1}".format(self.shape, other.shape))
+
+    def __and__(self, other):
+        return _combine(self, other, operator.and_)
+
+    def __or__(self, other):
+        return _combine(self, other, operator.or_)
+
+    def __xor__(self, other):
+        return _combine(self, other, operator.xor)
+
+    def __invert__(self):
+        return BitPackedMask.from_mask(self).__invert__()
+
+    def __repr__(self):
+        return "<{0} shape={1} count={2}>".format(type(self).__name__, self.shape, self.count())
+
+
+class DenseMask(Mask):
+    """
+    A mask represented by a boolean array.
+    """
+
+    def __init__(self, array):
+        self.array = np.asarray(array, dtype=bool)
+        self.shape = self.array.shape
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def _fill(self, out, start):
+        out[:] = self.array.ravel()[start:start + len(out)]
+
+    def count(self):
+        return int(np.count_nonzero(self.array))
+
+    def contains(self, indices):
+        return self.array.ravel()[indices]
+
+    def to_index_list(self):
+        return np.flatnonzero(self.array)
+
+    def to_dense(self, view=None):
+        if view is None:
+            return self.array
+        else:
+            return self.array[view]
+
+    def __invert__(self):
+        return DenseMask(~self.array)
+
+
+class IndexMask(Mask):
+    """
+    A mask represented by the sorted indices of the selected elements in the
+    flattened array.
+
+    Parameters
+    ----------
+    indices : iterable of int
+        The indices of the selected elements. These do not need to be sorted
+        or unique, and can be negative. An `IndexError` is raised if any of
+        the indices are out of bounds.
+    shape : tuple
+        The shape of the mask
+    """
+
+    def __init__(self, indices, shape, sorted_unique=False):
+        self.shape = tuple(shape)
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        if not sorted_unique:
+            size = self.size
+            if len(indices) > 0 and (indices.min() < -size or indices.max() >= size):
+                raise IndexError("Indices are out of bounds for mask of size {0}".format(size))
+            indices = np.unique(np.where(indices < 0, indices + size, indices))
+        self.indices = indices
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes
+
+    def _fill(self, out, start):
+        lo, hi = np.searchsorted(self.indices, [start, start + len(out)])
+        out[self.indices[lo:hi] - start] = True
+
+    def count(self):
+        return len(self.indices)
+
+    def contains(self, indices):
+        indices = np.asarray(indices)
+        if len(self.indices) == 0:
+            return np.zeros(indices.shape, dtype=bool)
+        pos = np.searchsorted(self.indices, indices).clip(0, len(self.indices) - 1)
+        return self.indices[pos] == indices
+
+    def to_index_list(self):
+        return self.indices
+
+    def to_dense(self, view=None):
+
+        if view is None:
+            return super(IndexMask, self).to_dense()
+
+        # If the view consists of slices and integers, we can figure out which
+        # indices fall inside it without creating the full mask.
+
+        basic = _basic_view(view, self.shape)
+
+        if basic is None or len(self.shape) == 0:
+            return super(IndexMask, self).to_dense(view=view)
+
+        coords = np.unravel_index(self.indices, self.shape)
+        keep = np.ones(len(self.indices), dtype=bool)
+
+        new_coords = []
+        new_shape = []
+
+        for item, coord, size in zip(basic, coords, self.shape):
+            if isinstance(item, slice):
+                start, stop, step = item.indices(size)
+                n = len(range(start, stop, step))
+                offset = coord - start
+                if step > 0:
+                    keep &= (coord >= start) & (coord < stop)
+                else:
+                    keep &= (coord <= start) & (coord > stop)
+                keep &= offset % step == 0
+                new_coords.append(offset // step)
+                new_shape.append(n)
+            else:
+                if item < 0:
+                    item += size
+                keep &= coord == item
+
+        result = np.zeros(new_shape, dtype=bool)
+        if len(new_shape) == 0:
+            return np.bool_(keep.any())
+        result[tuple(c[keep] for c in new_coords)] = True
+        return result
+
+    def __invert__(self):
+        return BitPackedMask.from_mask(self).__invert__()
+
+
+class RunLengthMask(Mask):
+    """
+    A mask represented by runs of consecutive selected elements in the
+    flattened array.
+
+    Parameters
+    ----------
+    starts : iterable of int
+        The index of the first element of each run
+    ends : iterable of int
+        The index after the last element of each run
+    shape : tuple
+        The shape of the mask
+    """
+
+    def __init__(self, starts, ends, shape):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, array):
+        array = np.asarray(array, dtype=bool)
+        padded = np.zeros(array.size + 2, dtype=bool)
+        padded[1:-1] = array.ravel()
+        changes = np.flatnonzero(padded[1:] != padded[:-1])
+        return cls(changes[::2], changes[1::2], array.shape)
+
+    @property
+    def lengths(self):
+        return self.ends - self.starts
+
+    @property
+    def nbytes(self):
+        return self.starts.nbytes + self.ends.nbytes
+
+    def _fill(self, out, start):
+        stop = start + len(out)
+        lo = np.searchsorted(self.ends, start, side='right')
+        hi = np.searchsorted(self.starts, stop, side='left')
+        edges = np.zeros(len(out) + 1, dtype=np.int8)
+        edges[self.starts[lo:hi].clip(start, stop) - start] += 1
+        edges[self.ends[lo:hi].clip(start, stop) - start] -= 1
+        out[:] = np.cumsum(edges[:-1]) > 0
+
+    def count(self):
+        return int(self.lengths.sum())
+
+    def contains(self, indices):
+        indices = np.asarray(indices)
+        pos = np.searchsorted(self.starts, indices, side='right') - 1
+        return (pos >= 0) & (indices < self.ends[pos.clip(0)] if len(self.ends) else False)
+
+    def to_index_list(self):
+        return _expand_ranges(self.starts, self.ends)
+
+    def __invert__(self):
+        starts = np.hstack([[0], self.ends])
+        ends = np.hstack([self.starts, [self.size]])
+        keep = ends > starts
+        return RunLengthMask(starts[keep], ends[keep], self.shape)
+
+
+class BitPackedMask(Mask):
+    """
+    A mask represented by a flattened boolean array packed into bits (as
+    returned by :func:`numpy.packbits`).
+
+    Parameters
+    ----------
+    packed : `numpy.ndarray`
+        The packed bits, as a uint8 array
+    shape : tuple
+        The shape of the mask
+    """
+
+    def __init__(self, packed, shape):
+        self.packed = np.asarray(packed, dtype=np.uint8)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_array(cls, array):
+        array = np.asarray(array, dtype=bool)
+        return cls(np.packbits(array.ravel()), array.shape)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Convert any mask to a bit-packed mask, processing the mask in blocks to
+        avoid creating a full-size boolean array.
+        """
+        if isinstance(mask, BitPackedMask):
+            return mask
+        size = mask.size
+        packed = np.zeros((size + 7) // 8, dtype=np.uint8)
+        block = np.zeros(min(BLOCK_SIZE, size), dtype=bool)
+        for start in range(0, size, BLOCK_SIZE):
+            values = block[:min(BLOCK_SIZE, size - start)]
+            values[:] = False
+            mask._fill(values, start)
+            packed[start // 8:(start + len(values) + 7) // 8] = np.packbits(values)
+        return cls(packed, mask.shape)
+
+    @property
+    def nbytes(self):
+        return self.packed.nbytes
+
+    def _fill(self, out, start):
+        # We only call this with values of start that are multiples of 8
+        if start % 8 == 0:
+            out[:] = np.unpackbits(self.packed[start // 8:(start + len(out) + 7) // 8])[:len(out)]
+        else:
+            out[:] = self.contains(np.arange(start, start + len(out)))
+
+    def count(self):
+        return int(np.unpackbits(self.packed).sum(dtype=np.int64))
+
+    def contains(self, indices):
+        indices = np.asarray(indices)
+        return ((self.packed[indices >> 3] >> (7 - (indices & 7))) & 1).astype(bool)
+
+    def to_index_list(self):
+        nonzero = np.flatnonzero(self.packed)
+        rows, bits = np.nonzero(np.unpackbits(self.packed[nonzero]).reshape((-1, 8)))
+        return nonzero[rows].astype(np.int64) * 8 + bits
+
+    def _clear_padding(self, packed):
+        remainder = self.size % 8
+        if remainder > 0 and len(packed) > 0:
+            packed[-1] &= np.uint8((0xff << (8 - remainder)) & 0xff)
+        return packed
+
+    def __invert__(self):
+        return BitPackedMask(self._clear_padding(~self.packed), self.shape)
+
+
+def _combine(mask1, mask2, op):
+
+    check = mask1._check_shape(mask2)
+    if check is NotImplemented:
+        return check
+
+    if isinstance(mask1, DenseMask) and isinstance(mask2, DenseMask):
+        return DenseMask(op(mask1.array, mask2.array))
+
+    if isinstance(mask1, IndexMask) and isinstance(mask2, IndexMask):
+        if op is operator.and_:
+            indices = np.intersect1d(mask1.indices, mask2.indices, assume_unique=True)
+        elif op is operator.or_:
+            indices = np.union1d(mask1.indices, mask2.indices)
+        else:
+            indices = np.setxor1d(mask1.indices, mask2.indices, assume_unique=True)
+        return IndexMask(indices, mask1.shape, sorted_unique=True)
+
+    if op is operator.and_:
+        if isinstance(mask1, IndexMask):
+            return IndexMask(mask1.indices[mask2.contains(mask1.indices)],
+                             mask1.shape, sorted_unique=True)
+        elif isinstance(mask2, IndexMask):
+            return IndexMask(mask2.indices[mask1.contains(mask2.indices)],
+                             mask1.shape, sorted_unique=True)
+
+    if isinstance(mask1, RunLengthMask) and isinstance(mask2, RunLengthMask):
+
+        bounds = np.unique(np.hstack([[0, mask1.size], mask1.starts, mask1.ends,
+                                      mask2.starts, mask2.ends]))
+        starts, ends = bounds[:-1], bounds[1:]
+        keep = op(mask1.contains(starts), mask2.contains(starts))
+        starts, ends = starts[keep], ends[keep]
+
+        # Merge adjacent runs
+        if len(starts) > 0:
+            new_run = np.hstack([[True], starts[1:] != ends[:-1]])
+            starts = starts[new_run]
+            ends = ends[np.hstack([new_run[1:], [True]])]
+
+        return RunLengthMask(starts, ends, mask1.shape)
+
+    packed1 = BitPackedMask.from_mask(mask1).packed
+    packed2 = BitPackedMask.from_mask(mask2).packed
+
+    return BitPackedMask(op(packed1, packed2), mask1.shape)
+
+
+def compress(array):
+    """
+    Convert a boolean array into the most compact mask representation.
+    """
+
+    array = np.asarray(array, dtype=bool)
+
+    if array.size == 0:
+        return DenseMask(array)
+
+    flat = array.ravel()
+
+    n_selected = np.count_nonzero(flat)
+    n_runs = np.count_nonzero(flat[1:] != flat[:-1]) // 2 + 1
+
+    sizes = {'index': n_selected * 8,
+             'runs': n_runs * 16,
+             'bits': (array.size + 7) // 8}
+
+    best = min(sizes, key=sizes.get)
+
+    if best == 'index':
+        return IndexMask(np.flatnonzero(flat), array.shape, sorted_unique=True)
+    elif best == 'runs':
+        return RunLengthMask.from_array(array)
+    else:
+        return BitPackedMask.from_array(array)
@@ -1,16 +1,51 @@
 from __future__ import absolute_import, division, print_function
 
 import re
+import ast
+import math
+import numbers
 import random
 
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+from glue.config import settings
 from glue.core.component_link import ComponentLink
 from glue.core.subset import Subset, SubsetState
 from glue.core.data import ComponentID
+from glue.utils import iterate_chunks, view_shape
 
 
 TAG_RE = re.compile('\{\s*(?P<tag>\S+)\s*\}')
 
-__all__ = ['ParsedCommand', 'ParsedSubsetState']
+__all__ = ['ParsedCommand', 'ParsedSubsetState', 'CompiledExpression']
+
+# Nodes that can be evaluated element by element, and their equivalent
+# operators in numexpr (or None if numexpr does not support them)
+
+BINARY_OPERATORS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/',
+                    ast.Pow: '**', ast.Mod: '%', ast.BitAnd: '&',
+                    ast.BitOr: '|', ast.BitXor: None, ast.FloorDiv: None,
+                    ast.LShift: '<<', ast.RShift: '>>'}
+
+UNARY_OPERATORS = {ast.USub: '-', ast.UAdd: '+', ast.Invert: '~'}
+
+COMPARISON_OPERATORS = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+                        ast.Eq: '==', ast.NotEq: '!='}
+
+NUMBER_NODES = tuple(getattr(ast, name) for name in ('Num', 'Constant')
+                     if hasattr(ast, name))
+
+NUMPY_NAMES = ('np', 'numpy')
+
+NUMEXPR_FUNCTIONS = set(['sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan',
+                         'arctan2', 'sinh', 'cosh', 'tanh', 'arcsinh',
+                         'arccosh', 'arctanh', 'log', 'log10', 'log1p', 'exp',
+                         'expm1', 'sqrt', 'abs'])
 
 
 def _ensure_only_component_references(cmd, references):
@@ -143,6 +178,203 @@ def _validate(cmd, references):
             raise InvalidTagError(tag, references)
 
 
+def _number_value(node):
+    # Return the value of a numerical literal, or None. Numbers are
+    # represented by ast.Num before Python 3.8 and ast.Constant afterwards.
+    if isinstance(node, NUMBER_NODES):
+        value = getattr(node, 'value' if 'value' in node._fields else 'n')
+        if isinstance(value, numbers.Number) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def _numpy_ufunc_name(node):
+    # Return the name of the Numpy ufunc called by a node, or None
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and
+            isinstance(node.func.value, ast.Name) and node.func.value.id in NUMPY_NAMES and
+            isinstance(getattr(np, node.func.attr, None), np.ufunc) and
+            not node.keywords and not any(isinstance(arg, getattr(ast, 'Starred', ())) for arg in node.args) and
+            not getattr(node, 'starargs', None) and not getattr(node, 'kwargs', None)):
+        return node.func.attr
+    return None
+
+
+def _translate(node, names):
+    """
+    Check whether an expression node can be evaluated element by element.
+
+    Returns
+    -------
+    elementwise : bool
+        Whether the result of the expression for any element only depends on
+        the values of the inputs for that element, in which case it can be
+        evaluated in chunks.
+    numexpr_source : str or None
+        An equivalent expression that can be evaluated with numexpr, if one
+        exists.
+    """
+
+    if isinstance(node, ast.Name):
+        if node.id in names:
+            return True, node.id
+        return False, None
+
+    value = _number_value(node)
+    if value is not None:
+        return True, repr(value)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        left, left_source = _translate(node.left, names)
+        right, right_source = _translate(node.right, names)
+        operator = BINARY_OPERATORS[type(node.op)]
+        if not (left and right):
+            return False, None
+        if left_source is None or right_source is None or operator is None:
+            return True, None
+        return True, '({0} {1} {2})'.format(left_source, operator, right_source)
+
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        elementwise, source = _translate(node.operand, names)
+        if source is None:
+            return elementwise, None
+        return elementwise, '({0}{1})'.format(UNARY_OPERATORS[type(node.op)], source)
+
+    # Chained comparisons (e.g. a < b < c) are not elementwise for arrays
+    if (isinstance(node, ast.Compare) and len(node.ops) == 1 and
+            type(node.ops[0]) in COMPARISON_OPERATORS):
+        left, left_source = _translate(node.left, names)
+        right, right_source = _translate(node.comparators[0], names)
+        if not (left and right):
+            return False, None
+        if left_source is None or right_source is None:
+            return True, None
+        return True, '({0} {1} {2})'.format(left_source,
+                                            COMPARISON_OPERATORS[type(node.ops[0])],
+                                            right_source)
+
+    ufunc = _numpy_ufunc_name(node)
+    if ufunc is not None:
+        arguments = [_translate(arg, names) for arg in node.args]
+        if not all(elementwise for elementwise, _ in arguments):
+            return False, None
+        if ufunc not in NUMEXPR_FUNCTIONS or any(source is None for _, source in arguments):
+            return True, None
+        return True, '{0}({1})'.format(ufunc, ', '.join(source for _, source in arguments))
+
+    return False, None
+
+
+def _namespace():
+    """
+    Return the variables available in commands, which are the ones defined in
+    config.py, and the numpy and math modules if not already defined.
+    """
+    from glue import env
+    namespace = {'numpy': np, 'np': np, 'math': math}
+    namespace.update(vars(env))
+    return namespace
+
+
+class CompiledExpression(object):
+    """
+    A template command that has been parsed and compiled once, so that it can
+    be evaluated repeatedly without parsing it again.
+
+    Tags in the command are replaced by variables, and each component or
+    subset referenced by the command is only read once per evaluation. If the
+    expression only consists of arithmetic, comparisons and Numpy ufuncs,
+    it is evaluated element by element: views are then passed down to the
+    components and subsets, and large arrays are evaluated in chunks (of
+    approximately ``MASK_CHUNK_SIZE`` elements). If numexpr is installed and
+    supports all operations in the expression, it is used to evaluate it.
+
+    Parameters
+    ----------
+    cmd : str
+        A template command
+    references : dict
+        A mapping from tags to `~glue.core.component_id.ComponentID` or
+        `~glue.core.subset.Subset` objects
+    """
+
+    def __init__(self, cmd, references):
+
+        self.references = {}
+
+        def sub_func(match):
+            tag = match.group('tag')
+            if not isinstance(references[tag], (ComponentID, Subset)):
+                raise TypeError("Tag %s maps to unrecognized type: %s" %
+                                (tag, type(references[tag])))
+            name = '_glue_ref_{0}'.format(sorted(references).index(tag))
+            self.references[name] = references[tag]
+            return name
+
+        self.source = TAG_RE.sub(sub_func, cmd).strip()
+
+        tree = ast.parse(self.source, mode='eval')
+        self.code = compile(tree, '<command>', 'eval')
+
+        if self.references:
+            self.elementwise, self.numexpr_source = _translate(tree.body, self.references)
+        else:
+            self.elementwise, self.numexpr_source = False, None
+
+    def _inputs(self, data, view):
+        inputs = {}
+        for name, reference in self.references.items():
+            if isinstance(reference, ComponentID):
+                inputs[name] = data[reference, view]
+            else:
+                inputs[name] = reference.to_mask(view)
+        return inputs
+
+    def _evaluate(self, data, view, namespace):
+
+        inputs = self._inputs(data, view)
+
+        # numexpr follows different casting rules than Numpy for integer and
+        # single-precision values (e.g. abs() of integers returns floats) and
+        # silently gives different results in some cases (e.g. integers to
+        # negative integer powers), so we only use it for double-precision
+        # inputs, for which the results are the same as with Numpy.
+        if (numexpr is not None and self.numexpr_source is not None and
+                all(getattr(value, 'dtype', None) == np.float64 for value in inputs.values())):
+            try:
+                return numexpr.evaluate(self.numexpr_source, local_dict=inputs,
+                                        global_dict={})
+            except Exception:
+                # numexpr does not support all data types, so we fall back to
+                # Python for this expression from now on.
+                self.numexpr_source = None
+
+        return eval(self.code, namespace, inputs)  # careful!
+
+    def evaluate(self, data, view=None):
+        """
+        Evaluate the expression for a view of a dataset.
+        """
+
+        namespace = _namespace()
+
+        if not self.elementwise or data is None:
+            return self._evaluate(data, view, namespace)
+
+        result = None
+
+        for chunk_view, out_view in iterate_chunks(data.shape, view,
+                                                   chunk_size=settings.MASK_CHUNK_SIZE):
+            values = self._evaluate(data, chunk_view, namespace)
+            if out_view is Ellipsis:
+                return values
+            values = np.asarray(values)
+            if result is None:
+                result = np.empty(view_shape(data.shape, view), dtype=values.dtype)
+            result[out_view] = values
+
+        return result
+
+
 class ParsedCommand(object):
 
     """ Class to manage commands that define new components and subsets """
@@ -158,6 +390,7 @@ class ParsedCommand(object):
         _validate(cmd, references)
         self._cmd = cmd
         self._references = references
+        self._compiled = None
 
     def ensure_only_component_references(self):
         _ensure_only_component_references(self._cmd, self._references)
@@ -166,48 +399,22 @@ class ParsedCommand(object):
     def reference_list(self):
         return _reference_list(self._cmd, self._references)
 
-    def evaluate(self, data, view=None):
-        from glue import env
-        # pylint: disable=W0613, W0612
-        references = self._references
-        cmd = _dereference(self._cmd, self._references)
-
-        scope = vars(env)
-        scope['__view'] = view
-
-        global_variables = vars(env)
-
-        # We now import math modules if not already defined in local or
-        # global variables
-        if 'numpy' not in global_variables and 'numpy' not in locals():
-            import numpy
-        if 'np' not in global_variables and 'np' not in locals():
-            import numpy as np
-        if 'math' not in global_variables and 'math' not in locals():
-            import math
+    def compile(self):
+        """
+        Return the :class:`CompiledExpression` for this command, which is
+        only created the first time it is needed.
+        """
+        if self._compiled is None:
+            self._compiled = CompiledExpression(self._cmd, self._references)
+        return self._compiled
 
-        return eval(cmd, global_variables, locals())  # careful!
+    def evaluate(self, data, view=None):
+        return self.compile().evaluate(data, view)
 
     def evaluate_test(self, view=None):
-        from glue import env
         cmd = _dereference_random(self._cmd)
+        return eval(cmd, _namespace())  # careful!
 
-        scope = vars(env)
-        scope['__view'] = view
-
-        global_variables = vars(env)
-
-        # We now import math modules if not already defined in local or
-        # global variables
-        if 'numpy' not in global_variables and 'numpy' not in locals():
-            import numpy
-        if 'np' not in global_variables and 'np' not in locals():
-            import numpy as np
-        if 'math' not in global_variables and 'math' not in locals():
-            import math
-
-        return eval(cmd, global_variables, locals())  # careful!
-        
     def __gluestate__(self, context):
         return dict(cmd=self._cmd,
                     references=dict((k, context.id(v))
@@ -267,6 +474,13 @@ class ParsedSubsetState(SubsetState):
 
     def to_mask(self, data, view=None):
         """ Calculate the new mask by evaluating the dereferenced command """
+
+        # If the command is evaluated element by element, we can evaluate it
+        # for the view directly, otherwise we need to evaluate it for the
+        # whole dataset first.
+        if self._parsed.compile().elementwise:
+            return self._parsed.evaluate(data, view)
+
         result = self._parsed.evaluate(data)
         if view is not None:
             result = result[view]
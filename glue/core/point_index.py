@@ -0,0 +1,361 @@
+"""
+A spatial index for the points defined by two components of a dataset, used
+to speed up the selection of points inside regions of interest.
+
+The points are sorted by the cell of a regular grid that they fall in, so
+that the points in any cell can be found without scanning all the points.
+When selecting points inside a polygon, circle or rectangle, cells that lie
+entirely inside the region are selected without looking at individual points,
+cells that lie entirely outside the region are skipped, and only the points in
+cells that intersect the edge of the region are tested individually.
+
+Indices are cached in :data:`POINT_INDEX_CACHE`, which holds at most
+``settings.ROI_INDEX_CACHE_SIZE`` megabytes of indices. As for the other
+caches, keys include the version of the dataset so that indices are not used
+once the values in the dataset change.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.config import settings
+from glue.core.array_cache import ArrayCache
+from glue.core.roi import RectangularROI, CircularROI, PolygonalROI
+from glue.utils import points_inside_poly
+
+__all__ = ['PointIndex', 'POINT_INDEX_CACHE', 'get_point_index']
+
+# The minimum number of points for which an index is built - for smaller
+# datasets, testing all the points is fast enough.
+MIN_INDEX_SIZE = 2 ** 20
+
+# The target mean number of points in each cell of the grid
+POINTS_PER_CELL = 32
+
+# Tolerance (in units of cells) used to make sure that cells are only
+# considered to be inside or outside regions if this is not affected by
+# rounding errors.
+CELL_TOLERANCE = 1e-6
+
+POINT_INDEX_CACHE = ArrayCache('ROI_INDEX_CACHE_SIZE')
+
+
+def _ranges(starts, stops):
+    """
+    Return the concatenation of ``np.arange(start, stop)`` for all pairs of
+    ``starts`` and ``stops``.
+    """
+    lengths = stops - starts
+    total = lengths.sum()
+    if total == 0:
+        return np.zeros(0, dtype=np.intp)
+    # Offset to add to a running index at the start of each range
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(total) + shifts
+
+
+def _runs(selected):
+    """
+    Return the start and end (exclusive) of runs of `True` values in a 1D
+    boolean array.
+    """
+    edges = np.diff(np.hstack([False, selected, False]).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _closed_polygon(vx, vy):
+    vx = np.asarray(vx, dtype=float)
+    vy = np.asarray(vy, dtype=float)
+    if vx[0] != vx[-1] or vy[0] != vy[-1]:
+        vx = np.hstack([vx, vx[0]])
+        vy = np.hstack([vy, vy[0]])
+    return vx, vy
+
+
+class PointIndex(object):
+    """
+    A spatial index for a set of 2D points, which sorts the points by the
+    cell they fall in on a regular grid covering all the points.
+
+    Parameters
+    ----------
+    x, y : `~numpy.ndarray`
+        The coordinates of the points. Points with non-finite coordinates are
+        never selected.
+    shape : tuple, optional
+        The number of cells along y and x. By default, this is chosen so that
+        there are on average ``POINTS_PER_CELL`` points per cell.
+    """
+
+    def __init__(self, x, y, shape=None):
+
+        x = np.asarray(x).ravel()
+        y = np.asarray(y).ravel()
+
+        self.size = x.size
+
+        if shape is None:
+            n = max(int(np.sqrt(self.size / POINTS_PER_CELL)), 1)
+            shape = (n, n)
+
+        self.shape = ny, nx = shape
+
+        finite = np.isfinite(x) & np.isfinite(y)
+
+        if np.any(finite):
+            xmin, xmax = x[finite].min(), x[finite].max()
+            ymin, ymax = y[finite].min(), y[finite].max()
+        else:
+            xmin = xmax = ymin = ymax = 0.
+
+        # Avoid zero-sized cells if all the points have the same coordinates
+        if xmax == xmin:
+            xmax = xmin + 1.
+        if ymax == ymin:
+            ymax = ymin + 1.
+
+        self.xmin, self.ymin = float(xmin), float(ymin)
+        self.dx = (xmax - xmin) / nx
+        self.dy = (ymax - ymin) / ny
+
+        ix, iy = self._to_cell(x, y)
+
+        with np.errstate(invalid='ignore'):
+            ix = ix.astype(np.intp)
+            iy = iy.astype(np.intp)
+        np.clip(ix, 0, nx - 1, out=ix)
+        np.clip(iy, 0, ny - 1, out=iy)
+
+        cell = iy
+        cell *= nx
+        cell += ix
+        del ix
+
+        # Non-finite points are put in an extra cell that is never selected
+        cell[~finite] = nx * ny
+
+        dtype = np.int32 if self.size < 2 ** 31 else np.int64
+        self.order = np.argsort(cell, kind='mergesort').astype(dtype)
+        self.offsets = np.zeros(nx * ny + 2, dtype=np.intp)
+        np.cumsum(np.bincount(cell, minlength=nx * ny + 1), out=self.offsets[1:])
+
+    @property
+    def nbytes(self):
+        return self.order.nbytes + self.offsets.nbytes
+
+    def _to_cell(self, x, y):
+        # Convert coordinates to (fractional) cell coordinates
+        with np.errstate(invalid='ignore'):
+            return (x - self.xmin) / self.dx, (y - self.ymin) / self.dy
+
+    def _indices(self, cells):
+        """
+        Return the indices of the points in the cells selected by a boolean
+        array of shape ``shape``.
+        """
+        starts, stops = _runs(cells.ravel())
+        return self.order[_ranges(self.offsets[starts], self.offsets[stops])]
+
+    def _select(self, inside, edge, test):
+        """
+        Return a boolean array which is `True` for points in the ``inside``
+        cells, and for points in the ``edge`` cells for which ``test(indices)``
+        returns `True`.
+        """
+        result = np.zeros(self.size, dtype=bool)
+        result[self._indices(inside & ~edge)] = True
+        candidates = self._indices(edge)
+        if candidates.size > 0:
+            result[candidates[test(candidates)]] = True
+        return result
+
+    def contains_polygon(self, vx, vy, x, y):
+        """
+        Return a boolean array which is `True` for points inside a polygon.
+
+        ``x`` and ``y`` should be the coordinates that the index was built
+        from, and are used to test the points in cells that intersect the
+        edges of the polygon, using
+        :func:`~glue.utils.geometry.points_inside_poly`.
+        """
+
+        ny, nx = self.shape
+        x = np.asarray(x).ravel()
+        y = np.asarray(y).ravel()
+
+        vx, vy = _closed_polygon(vx, vy)
+        cx, cy = self._to_cell(vx, vy)
+        x0, x1, y0, y1 = cx[:-1], cx[1:], cy[:-1], cy[1:]
+
+        # Find the cells that intersect the edges. For each edge, we go
+        # through the columns of cells that the edge spans, and find the
+        # rows spanned by the part of the edge inside each column.
+
+        col_lo = np.floor(np.minimum(x0, x1) - CELL_TOLERANCE)
+        col_hi = np.floor(np.maximum(x0, x1) + CELL_TOLERANCE)
+        col_lo = np.clip(col_lo, 0, nx).astype(np.intp)
+        col_hi = np.clip(col_hi, -1, nx - 1).astype(np.intp)
+        n_col = np.maximum(col_hi - col_lo + 1, 0)
+
+        edge_index = np.repeat(np.arange(len(x0)), n_col)
+        col = _ranges(col_lo, col_lo + n_col)
+
+        ex0, ex1, ey0, ey1 = x0[edge_index], x1[edge_index], y0[edge_index], y1[edge_index]
+        dx = ex1 - ex0
+
+        # Fraction along the edge at which the edge enters and leaves the
+        # column (vertical edges span their whole length in a single column)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ta = np.where(dx == 0, 0., (col - ex0) / dx)
+            tb = np.where(dx == 0, 1., (col + 1 - ex0) / dx)
+        ta, tb = np.clip(np.minimum(ta, tb), 0, 1), np.clip(np.maximum(ta, tb), 0, 1)
+        ya = ey0 + ta * (ey1 - ey0)
+        yb = ey0 + tb * (ey1 - ey0)
+
+        row_lo = np.floor(np.minimum(ya, yb) - CELL_TOLERANCE)
+        row_hi = np.floor(np.maximum(ya, yb) + CELL_TOLERANCE)
+        row_lo = np.clip(row_lo, 0, ny).astype(np.intp)
+        row_hi = np.clip(row_hi, -1, ny - 1).astype(np.intp)
+        keep = row_hi >= row_lo
+
+        # Mark the rows in each column using a cumulative sum
+        marks = np.zeros((ny + 1, nx), dtype=np.intp)
+        np.add.at(marks, (row_lo[keep], col[keep]), 1)
+        np.add.at(marks, (row_hi[keep] + 1, col[keep]), -1)
+        edge = np.cumsum(marks, axis=0)[:-1] > 0
+
+        # Find which cells have centers inside the polygon, by counting, for
+        # each row, how many edges cross the row to the left of the center of
+        # each cell (the crossing number test).
+
+        with np.errstate(invalid='ignore'):
+            row_lo = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, ny).astype(np.intp)
+            row_hi = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, ny).astype(np.intp)
+        n_row = row_hi - row_lo
+
+        edge_index = np.repeat(np.arange(len(x0)), n_row)
+        row = _ranges(row_lo, row_hi)
+        yc = row + 0.5
+
+        ex0, ey0, ey1 = x0[edge_index], y0[edge_index], y1[edge_index]
+        xc = ex0 + (yc - ey0) * (x1[edge_index] - ex0) / (ey1 - ey0)
+
+        # Index of the first cell whose center is to the right of the crossing
+        first = np.clip(np.floor(xc - 0.5) + 1, 0, nx).astype(np.intp)
+
+        crossings = np.zeros((ny, nx + 1), dtype=np.intp)
+        np.add.at(crossings, (row, first), 1)
+        inside = np.cumsum(crossings, axis=1)[:, :-1] % 2 == 1
+
+        def test(indices):
+            return points_inside_poly(x[indices], y[indices], vx, vy)
+
+        return self._select(inside, edge, test)
+
+    def _cell_edges(self):
+        ny, nx = self.shape
+        x_edges = self.xmin + np.arange(nx + 1) * self.dx
+        y_edges = self.ymin + np.arange(ny + 1) * self.dy
+        # Widen the cells slightly to account for rounding errors
+        tol_x, tol_y = CELL_TOLERANCE * self.dx, CELL_TOLERANCE * self.dy
+        return (x_edges[:-1] - tol_x, x_edges[1:] + tol_x,
+                y_edges[:-1] - tol_y, y_edges[1:] + tol_y)
+
+    def contains_circle(self, xc, yc, radius, x, y):
+        """
+        Return a boolean array which is `True` for points strictly inside a
+        circle.
+        """
+
+        x = np.asarray(x).ravel()
+        y = np.asarray(y).ravel()
+
+        cx0, cx1, cy0, cy1 = self._cell_edges()
+
+        # Distances along each axis to the nearest and farthest points of each
+        # cell
+        near_x = np.maximum(np.maximum(cx0 - xc, xc - cx1), 0)
+        near_y = np.maximum(np.maximum(cy0 - yc, yc - cy1), 0)
+        far_x = np.maximum(np.abs(cx0 - xc), np.abs(cx1 - xc))
+        far_y = np.maximum(np.abs(cy0 - yc), np.abs(cy1 - yc))
+
+        r2 = radius ** 2
+        inside = (far_y[:, np.newaxis] ** 2 + far_x[np.newaxis, :] ** 2) < r2
+        edge = ((near_y[:, np.newaxis] ** 2 + near_x[np.newaxis, :] ** 2) < r2) & ~inside
+
+        def test(indices):
+            return (x[indices] - xc) ** 2 + (y[indices] - yc) ** 2 < r2
+
+        return self._select(inside, edge, test)
+
+    def contains_rectangle(self, xmin, xmax, ymin, ymax, x, y):
+        """
+        Return a boolean array which is `True` for points strictly inside a
+        rectangle.
+        """
+
+        x = np.asarray(x).ravel()
+        y = np.asarray(y).ravel()
+
+        cx0, cx1, cy0, cy1 = self._cell_edges()
+
+        inside_x = (cx0 > xmin) & (cx1 < xmax)
+        inside_y = (cy0 > ymin) & (cy1 < ymax)
+        overlap_x = (cx1 > xmin) & (cx0 < xmax)
+        overlap_y = (cy1 > ymin) & (cy0 < ymax)
+
+        inside = inside_y[:, np.newaxis] & inside_x[np.newaxis, :]
+        edge = (overlap_y[:, np.newaxis] & overlap_x[np.newaxis, :]) & ~inside
+
+        def test(indices):
+            xi, yi = x[indices], y[indices]
+            return (xi > xmin) & (xi < xmax) & (yi > ymin) & (yi < ymax)
+
+        return self._select(inside, edge, test)
+
+    def contains_roi(self, roi, x, y):
+        """
+        Return a boolean array which is `True` for points inside a region of
+        interest, with the same shape as ``x``, or `None` if the region of
+        interest is not supported.
+        """
+
+        if isinstance(roi, PolygonalROI):
+            result = self.contains_polygon(roi.vx, roi.vy, x, y)
+        elif isinstance(roi, CircularROI):
+            result = self.contains_circle(roi.xc, roi.yc, roi.radius, x, y)
+        elif isinstance(roi, RectangularROI):
+            result = self.contains_rectangle(roi.xmin, roi.xmax, roi.ymin, roi.ymax, x, y)
+        else:
+            return None
+
+        return result.reshape(np.shape(x))
+
+
+def get_point_index(data, xatt, yatt, x=None, y=None):
+    """
+    Return the :class:`PointIndex` for two components of a dataset, building
+    it if needed, or `None` if the dataset is too small to need an index or if
+    the cache is disabled.
+
+    The values of the components can be passed as ``x`` and ``y`` if they have
+    already been computed.
+    """
+
+    if data.size < MIN_INDEX_SIZE or settings.ROI_INDEX_CACHE_SIZE <= 0:
+        return None
+
+    key = (xatt, data, yatt, getattr(data, '_version', 0))
+
+    index = POINT_INDEX_CACHE.get(key)
+
+    if index is None:
+        if x is None:
+            x = data[xatt]
+        if y is None:
+            y = data[yatt]
+        index = PointIndex(x, y)
+        POINT_INDEX_CACHE.set(key, index)
+
+    return index
@@ -16,6 +16,19 @@ u = GlueUnSerializer.loads(str)
 u.object(varname) -> A reconstituted version of `x`
 u.object('__main__') -> The object passed to the GlueSerializer constructor
 
+Session bundles:
+
+s.dump_bundle(path) -> write a zip file containing the JSON description as
+                       well as arrays, which are stored as separate .npy
+                       files rather than being embedded in the JSON
+u = GlueUnSerializer.load_bundle(path) -> load a bundle, memory-mapping arrays
+
+Lazy loading:
+
+u = GlueUnSerializer.load(file, lazy=True) -> data loaded from files (when
+                                              include_data was False) is only
+                                              read once its values are needed
+
 Developer Notes:
 
 Custom methods to serialize a class of objects can be registered either by:
@@ -57,7 +70,10 @@ import os
 import json
 import uuid
 import types
+import struct
 import logging
+import zipfile
+import tempfile
 from io import BytesIO
 from itertools import count
 from collections import defaultdict
@@ -73,7 +89,8 @@ from glue import core
 from glue.core.data import Data
 from glue.core.component_id import ComponentID, PixelComponentID
 from glue.core.component import (Component, CategoricalComponent,
-                                 DerivedComponent, CoordinateComponent)
+                                 DerivedComponent, CoordinateComponent,
+                                 DeferredComponent, DeferredCategoricalComponent)
 from glue.core.subset import (OPSYM, SYMOP, CompositeSubsetState,
                               SubsetState, Subset, RoiSubsetState,
                               InequalitySubsetState, RangeSubsetState)
@@ -125,6 +142,81 @@ class GlueSerializeError(RuntimeError):
     pass
 
 
+# The name of the JSON description of the session inside session bundles
+BUNDLE_STATE = 'session.json'
+
+
+def is_bundle(path):
+    """
+    Return whether a file is a session bundle (as opposed to a JSON session).
+    """
+    return zipfile.is_zipfile(path)
+
+
+def _memmap_member(path, name):
+    """
+    Memory-map a .npy file stored (uncompressed) inside a zip file. If this
+    is not possible, the array is read into memory instead.
+    """
+
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name)
+        if info.compress_type != zipfile.ZIP_STORED:
+            return np.load(BytesIO(zf.read(name)))
+
+    with open(path, 'rb') as f:
+
+        # Skip over the local file header, which has a fixed size of 30 bytes
+        # followed by the file name and extra field.
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        start = info.header_offset + 30 + name_length + extra_length
+
+        f.seek(start)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            shape = None
+        offset = f.tell()
+
+        if shape is None or dtype.hasobject or np.prod(shape) == 0:
+            f.seek(start)
+            return np.load(BytesIO(f.read(info.file_size)))
+
+    # We use copy-on-write mode so that arrays can still be modified in memory
+    array = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=shape,
+                      order='F' if fortran_order else 'C')
+
+    return np.asarray(array)
+
+
+def _replace_file(src, dst):
+    """
+    Move the file ``src`` to ``dst``, replacing ``dst`` if it exists.
+    """
+
+    # Files created by mkstemp are only readable by the owner, so we use the
+    # permissions of the original file, or the default permissions.
+    if os.path.exists(dst):
+        mode = os.stat(dst).st_mode & 0o777
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(src, mode)
+
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:  # Python 2 - os.rename does not replace existing files on Windows
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
 class VersionedDict(object):
 
     """
@@ -234,6 +326,7 @@ class GlueSerializer(object):
         self._main = obj
         self.id(obj)
         self.include_data = include_data
+        self._arrays = None  # map id(array) -> (name, array) for bundles
 
     @classmethod
     def serializes(cls, obj, version=1):
@@ -379,25 +472,115 @@ class GlueSerializer(object):
         return json.dump(result, outfile, default=self.json_default,
                          indent=indent, sort_keys=True)
 
+    def store_array(self, array):
+        """
+        Register an array to be stored outside of the JSON description of
+        the state, if writing a session bundle.
+
+        Returns
+        -------
+        name : str or `None`
+            The name of the file in the bundle in which the array will be
+            stored, or `None` if the array should be embedded in the JSON.
+        """
+        if self._arrays is None or array.dtype.hasobject:
+            return None
+        if id(array) not in self._arrays:
+            name = 'arrays/{0}.npy'.format(len(self._arrays))
+            self._arrays[id(array)] = name, array
+        return self._arrays[id(array)][0]
+
+    def dump_bundle(self, path, indent=None):
+        """
+        Write a session bundle, which is a zip file containing the JSON
+        description of the state as well as the arrays, which are stored as
+        uncompressed .npy files so that they can be memory-mapped when
+        loading the bundle with :meth:`GlueUnSerializer.load_bundle`.
+        """
+
+        self._arrays = {}
+
+        try:
+
+            state = self.dumps(indent=indent)
+
+            # The arrays being saved may be memory-mapped from the file being
+            # overwritten (if the session was loaded from it), so we write the
+            # bundle to a temporary file in the same directory and only
+            # replace the original file once the bundle is complete.
+            directory = os.path.dirname(os.path.abspath(path))
+            handle, bundle_filename = tempfile.mkstemp(suffix='.glu', dir=directory)
+            os.close(handle)
+
+            try:
+
+                with zipfile.ZipFile(bundle_filename, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+
+                    zf.writestr(BUNDLE_STATE, state)
+
+                    # We write arrays to a temporary file first rather than
+                    # serializing them in memory, to avoid making copies of
+                    # large arrays.
+                    handle, filename = tempfile.mkstemp(suffix='.npy')
+                    os.close(handle)
+                    try:
+                        for name, array in sorted(self._arrays.values(), key=lambda x: x[0]):
+                            np.save(filename, array, allow_pickle=False)
+                            zf.write(filename, name)
+                    finally:
+                        os.remove(filename)
+
+                _replace_file(bundle_filename, path)
+
+            except Exception:
+                os.remove(bundle_filename)
+                raise
+
+        finally:
+            self._arrays = None
+
 
 class GlueUnSerializer(object):
     dispatch = VersionedDict()
 
-    def __init__(self, string=None, fobj=None):
+    def __init__(self, string=None, fobj=None, lazy=False):
         if string is None and fobj is None:
             raise ValueError("Most provide either a string or a file")
         self._names = {}  # map id(object) -> name
         self._objs = {}   # map name -> object
         self._working = set()
         self._rec = json.loads(string) if string else json.load(fobj)
+        self._bundle = None
+        self.lazy = lazy
 
     @classmethod
-    def loads(cls, string):
-        return cls(string=string)
+    def loads(cls, string, lazy=False):
+        return cls(string=string, lazy=lazy)
 
     @classmethod
-    def load(cls, fobj):
-        return cls(fobj=fobj)
+    def load(cls, fobj, lazy=False):
+        return cls(fobj=fobj, lazy=lazy)
+
+    @classmethod
+    def load_bundle(cls, path, lazy=False):
+        """
+        Load a session bundle written by :meth:`GlueSerializer.dump_bundle`.
+        """
+        with zipfile.ZipFile(path) as zf:
+            state = zf.read(BUNDLE_STATE).decode('utf-8')
+        self = cls(string=state, lazy=lazy)
+        self._bundle = path
+        return self
+
+    def load_array(self, name):
+        """
+        Load an array stored in the session bundle being loaded. Arrays are
+        memory-mapped where possible.
+        """
+        if self._bundle is None:
+            raise GlueSerializeError("Cannot load array {0} since the state "
+                                     "is not being loaded from a bundle".format(name))
+        return _memmap_member(self._bundle, name)
 
     @classmethod
     def unserializes(cls, obj, version=1):
@@ -805,8 +988,17 @@ def _save_component(component, context):
 
     if not context.include_data and hasattr(component, '_load_log'):
         log = component._load_log
+        # We store the shape and type of the values so that the component
+        # can be restored lazily without reading the file.
+        if isinstance(component, DeferredComponent):
+            dtype = component.dtype
+        else:
+            dtype = component.data.dtype
         return dict(log=context.id(log),
-                    log_item=log.id(component))
+                    log_item=log.id(component),
+                    shape=list(component.shape),
+                    dtype=dtype.str,
+                    units=component.units)
 
     return dict(data=context.do(component.data),
                 units=component.units)
@@ -815,7 +1007,11 @@ def _save_component(component, context):
 @loader(Component)
 def _load_component(rec, context):
     if 'log' in rec:
-        return context.object(rec['log']).component(rec['log_item'])
+        log = context.object(rec['log'])
+        if context.lazy and 'shape' in rec:
+            return log.deferred_component(rec['log_item'], rec['shape'],
+                                          dtype=rec['dtype'], units=rec['units'])
+        return log.component(rec['log_item'])
 
     return Component(data=context.object(rec['data']),
                      units=rec['units'])
@@ -825,8 +1021,17 @@ def _save_categorical_component(component, context):
 
     if not context.include_data and hasattr(component, '_load_log'):
         log = component._load_log
+        # As for other components, we store the shape and type of the values
+        # so that the component can be restored lazily.
+        if isinstance(component, DeferredCategoricalComponent):
+            dtype = component.dtype
+        else:
+            dtype = component.labels.dtype
         return dict(log=context.id(log),
-                    log_item=log.id(component))
+                    log_item=log.id(component),
+                    shape=list(component.shape),
+                    dtype=dtype.str,
+                    units=component.units)
 
     return dict(categorical_data=context.do(component.labels),
                 categories=context.do(component.categories),
@@ -837,7 +1042,12 @@ def _save_categorical_component(component, context):
 @loader(CategoricalComponent)
 def _load_categorical_component(rec, context):
     if 'log' in rec:
-        return context.object(rec['log']).component(rec['log_item'])
+        log = context.object(rec['log'])
+        if context.lazy and 'shape' in rec:
+            return log.deferred_component(rec['log_item'], rec['shape'],
+                                          dtype=rec['dtype'], units=rec['units'],
+                                          categorical=True)
+        return log.component(rec['log_item'])
 
     return CategoricalComponent(categorical_data=context.object(rec['categorical_data']),
                                 categories=context.object(rec['categories']),
@@ -932,12 +1142,17 @@ def _save_session(session, context):
 
 @loader(np.ndarray)
 def _load_numpy(rec, context):
+    if 'file' in rec:
+        return context.load_array(rec['file'])
     s = BytesIO(b64decode(rec['data']))
     return np.load(s)
 
 
 @saver(np.ndarray)
 def _save_numpy(obj, context):
+    name = context.store_array(obj)
+    if name is not None:
+        return dict(file=name)
     f = BytesIO()
     np.save(f, obj)
     data = b64encode(f.getvalue()).decode('ascii')
@@ -8,6 +8,7 @@ from glue.core import Subset
 from glue.external.echo import (delay_callback, CallbackProperty,
                                 HasCallbackProperties, CallbackList)
 from glue.core.state import saver, loader
+from glue.core.statistics import component_statistics
 
 __all__ = ['State', 'StateAttributeCacheHelper',
            'StateAttributeLimitsHelper', 'StateAttributeSingleValueHelper']
@@ -146,6 +147,24 @@ class StateAttributeCacheHelper(object):
         else:
             return self.data[self.component_id]
 
+    def data_statistics(self, positive=False):
+        """
+        Return the :class:`~glue.core.statistics.ComponentStatistics` of the
+        values in `data_values`, which are shared with other helpers using the
+        same component and kept until the dataset changes.
+        """
+        if isinstance(self.data, Subset):
+            return component_statistics(self.data.data, self.component_id, positive=positive)
+        else:
+            return component_statistics(self.data, self.component_id, positive=positive)
+
+    def data_sketch(self, positive=False):
+        """
+        Return a :class:`~glue.utils.quantiles.QuantileSketch` of the values
+        in `data_values` (see `data_statistics`).
+        """
+        return self.data_statistics(positive=positive).sketch
+
     @property
     def data_component(self):
         # For subsets in 'data' mode, we want to compute the limits based on
@@ -252,8 +271,10 @@ class StateAttributeLimitsHelper(StateAttributeCacheHelper):
         The attribute name - this will be populated once a dataset is assigned
         to the helper.
     percentile_subset : int
-        How many points to use at most for the percentile calculation (using all
-        values is highly inefficient and not needed)
+        This is no longer used, since percentiles are now estimated from a
+        quantile sketch of all the values (see
+        :meth:`~StateAttributeCacheHelper.data_sketch`), and is kept for
+        backward-compatibility.
     lower, upper : str
         The fields for the lower/upper levels
     percentile : ``QComboBox`` instance, optional
@@ -318,24 +339,13 @@ class StateAttributeLimitsHelper(StateAttributeCacheHelper):
 
             exclude = (100 - percentile) / 2.
 
-            data_values = self.data_values
+            sketch = self.data_sketch(positive=log)
 
-            if data_values.size > self.percentile_subset:
-                data_values = np.random.choice(data_values.ravel(), self.percentile_subset)
-
-            if log:
-                data_values = data_values[data_values > 0]
-                if len(data_values) == 0:
-                    self.set(lower=0.1, upper=1, percentile=percentile, log=log)
-                    return
+            if log and sketch.count == 0:
+                self.set(lower=0.1, upper=1, percentile=percentile, log=log)
+                return
 
-            try:
-                lower = np.nanpercentile(data_values, exclude)
-                upper = np.nanpercentile(data_values, 100 - exclude)
-            except AttributeError:  # Numpy < 1.9
-                data_values = data_values[~np.isnan(data_values)]
-                lower = np.percentile(data_values, exclude)
-                upper = np.percentile(data_values, 100 - exclude)
+            lower, upper = sketch.percentile([exclude, 100 - exclude])
 
             if self.data_component.categorical:
                 lower = np.floor(lower - 0.5) + 0.5
@@ -441,9 +451,9 @@ class StateAttributeHistogramHelper(StateAttributeCacheHelper):
                 else:
                     n_bin = self._common_n_bin
 
-                values = self.data_values
-                lower = np.nanmin(values)
-                upper = np.nanmax(values)
+                stats = self.data_statistics()
+                lower = stats.min
+                upper = stats.max
 
             self.set(lower=lower, upper=upper, n_bin=n_bin)
 
@@ -0,0 +1,216 @@
+"""
+Shared summaries of the values of components, used to determine default
+limits for viewers (e.g. image contrast, color limits, and histogram ranges).
+
+The values of a component (optionally restricted to a subset state) are
+summarized by a :class:`ComponentStatistics` object, which is computed in a
+single pass over the data in chunks of ``settings.MASK_CHUNK_SIZE`` elements
+and includes the minimum and maximum values, the number of finite values,
+and a :class:`~glue.utils.quantiles.QuantileSketch` from which percentiles
+can be estimated. Each dataset has a :class:`DataStatistics` registry (as
+``data.statistics``) which keeps these summaries until the values in the
+dataset change, so that all the viewers showing the same component share
+the same statistics rather than each scanning the data.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.config import settings
+from glue.core.array_cache import ArrayCache
+from glue.core.mask_cache import _data_versions
+from glue.utils import QuantileSketch, iterate_chunks
+
+__all__ = ['ComponentStatistics', 'DataStatistics', 'component_statistics',
+           'quantile_sketch']
+
+
+class ComponentStatistics(object):
+    """
+    Statistics of a set of values, computed by adding values in chunks with
+    `update`.
+
+    Attributes
+    ----------
+    count : int
+        The number of values
+    finite_count : int
+        The number of finite values
+    nanmin, nanmax : float
+        The minimum and maximum of the values, ignoring NaN values (as for
+        :func:`numpy.nanmin` and :func:`numpy.nanmax`), or NaN if all values
+        are NaN.
+    min, max : float
+        The minimum and maximum of the finite values, or NaN if there are no
+        finite values.
+    sketch : :class:`~glue.utils.quantiles.QuantileSketch`
+        A summary of the finite values, which can be used to estimate
+        percentiles.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nanmin = np.nan
+        self.nanmax = np.nan
+        self.sketch = QuantileSketch()
+
+    @property
+    def finite_count(self):
+        return self.sketch.count
+
+    @property
+    def min(self):
+        return self.sketch.min
+
+    @property
+    def max(self):
+        return self.sketch.max
+
+    @property
+    def nbytes(self):
+        return self.sketch.nbytes
+
+    def update(self, values):
+        """
+        Add values to the statistics.
+        """
+
+        values = np.asarray(values, dtype=float).ravel()
+
+        self.count += values.size
+
+        finite = np.isfinite(values)
+
+        if not finite.all():
+            # Infinite values only contribute to nanmin and nanmax
+            infinite = values[~finite & ~np.isnan(values)]
+            if infinite.size > 0:
+                self.nanmin = np.fmin(self.nanmin, infinite.min())
+                self.nanmax = np.fmax(self.nanmax, infinite.max())
+            values = values[finite]
+
+        self.sketch.update(values)
+
+        if values.size > 0:
+            self.nanmin = np.fmin(self.nanmin, self.sketch.min)
+            self.nanmax = np.fmax(self.nanmax, self.sketch.max)
+
+
+def _compute_statistics(data, cid, subset_state=None, positive=False):
+
+    stats = ComponentStatistics()
+
+    for chunk_view, _ in iterate_chunks(data.shape, chunk_size=settings.MASK_CHUNK_SIZE):
+        values = data[cid, chunk_view]
+        if subset_state is not None:
+            values = values[subset_state.to_mask(data, chunk_view)]
+        if positive:
+            values = values[values > 0]
+        stats.update(values)
+
+    return stats
+
+
+class DataStatistics(object):
+    """
+    A registry of the statistics of the components in a dataset.
+
+    Statistics are computed the first time they are requested and are then
+    kept until the version of the dataset changes - the version is
+    incremented whenever the components or their values change, just before
+    :class:`~glue.core.message.NumericalDataChangedMessage` is broadcast.
+    Statistics for subset states are also tied to the version of any other
+    dataset the subset state depends on, and are only kept for subset states
+    whose masks are cached (see :func:`~glue.core.mask_cache.cached_mask`),
+    since other subset states can be modified in place.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset
+    max_bytes : int, optional
+        The maximum total size of the statistics kept for the dataset.
+    """
+
+    def __init__(self, data, max_bytes=4 * 1024 ** 2):
+        self._data = data
+        self._version = None
+        self._cache = ArrayCache(None, max_bytes=max_bytes)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        """
+        Discard all the statistics for the dataset.
+        """
+        self._cache.clear()
+
+    def get(self, cid, subset_state=None, positive=False):
+        """
+        Return the :class:`ComponentStatistics` for the values of a component.
+
+        Parameters
+        ----------
+        cid : :class:`~glue.core.component_id.ComponentID`
+            The component to summarize
+        subset_state : :class:`~glue.core.subset.SubsetState`, optional
+            If specified, only the values in the subset state are included.
+        positive : bool, optional
+            If `True`, only strictly positive values are included (e.g. to
+            find limits for logarithmic scales).
+        """
+
+        data = self._data
+
+        if self._version != data._version:
+            self._cache.clear()
+            self._version = data._version
+
+        if subset_state is None:
+            key = (cid, None, positive)
+        elif getattr(subset_state.to_mask, 'cached', False):
+            key = (cid, subset_state, positive, _data_versions(subset_state, data))
+        else:
+            return _compute_statistics(data, cid, subset_state=subset_state, positive=positive)
+
+        stats = self._cache.get(key)
+
+        if stats is None:
+            stats = _compute_statistics(data, cid, subset_state=subset_state, positive=positive)
+            self._cache.set(key, stats)
+
+        return stats
+
+
+def component_statistics(data, cid, subset_state=None, positive=False):
+    """
+    Return the :class:`ComponentStatistics` for the values of a component in
+    a dataset, using the statistics registry of the dataset if available.
+
+    See :meth:`DataStatistics.get` for a description of the parameters.
+    """
+    registry = getattr(data, 'statistics', None)
+    if isinstance(registry, DataStatistics):
+        return registry.get(cid, subset_state=subset_state, positive=positive)
+    else:
+        return _compute_statistics(data, cid, subset_state=subset_state, positive=positive)
+
+
+def quantile_sketch(data, cid, positive=False):
+    """
+    Return a :class:`~glue.utils.quantiles.QuantileSketch` for the values of
+    a component in a dataset.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset
+    cid : :class:`~glue.core.component_id.ComponentID`
+        The component to summarize
+    positive : bool, optional
+        If `True`, only strictly positive values are included (e.g. to find
+        limits for logarithmic scales).
+    """
+    return component_statistics(data, cid, positive=positive).sketch
@@ -13,10 +13,12 @@ from glue.core.util import split_component_view
 from glue.core.registry import Registry
 from glue.core.exceptions import IncompatibleAttribute
 from glue.core.message import SubsetDeleteMessage, SubsetUpdateMessage
-from glue.core.decorators import memoize
+from glue.core.mask_cache import cached_mask
+from glue.core.point_index import get_point_index
+from glue.core.masks import DenseMask, IndexMask
 from glue.core.visual import VisualAttributes
 from glue.config import settings
-from glue.utils import view_shape, broadcast_to
+from glue.utils import view_shape, broadcast_to, iterate_chunks
 
 
 __all__ = ['Subset', 'SubsetState', 'RoiSubsetState', 'CategoricalROISubsetState',
@@ -34,6 +36,66 @@ OPSYM = {operator.ge: '>=', operator.gt: '>',
 SYMOP = dict((v, k) for k, v in OPSYM.items())
 
 
+def chunked_mask(data, view, func, chunk_size=None):
+    """
+    Compute a mask for a view of a dataset in chunks along the first
+    dimension.
+
+    The number of elements in each chunk defaults to the ``MASK_CHUNK_SIZE``
+    setting, and the chunks are combined into a preallocated output mask, so
+    that the memory needed for temporary arrays does not scale with the size
+    of the view.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset to compute the mask for
+    view : slice or tuple
+        The view of the data to compute the mask for, or `None`
+    func : callable
+        A function that takes ``chunk_view``, a view of the data to compute
+        the mask for, and ``out_view``, the position of the chunk in the
+        output mask, and returns the mask for the chunk.
+    chunk_size : int, optional
+        The approximate number of elements in each chunk
+    """
+
+    if chunk_size is None:
+        chunk_size = settings.MASK_CHUNK_SIZE
+
+    result = None
+
+    for chunk_view, out_view in iterate_chunks(data.shape, view, chunk_size=chunk_size):
+        mask = func(chunk_view, out_view)
+        if out_view is Ellipsis:
+            return mask
+        if result is None:
+            result = np.zeros(view_shape(data.shape, view), dtype=bool)
+        result[out_view] = mask
+
+    return result
+
+
+def _comparison_values(data, att, view):
+    """
+    Return the values used for an attribute in an inequality, which are the
+    labels for categorical components.
+    """
+
+    if isinstance(att, (numbers.Number, six.string_types)):
+        return att
+
+    try:
+        comp = data.get_component(att)
+    except IncompatibleAttribute:
+        return data[att, view]
+
+    if comp.categorical:
+        return comp.labels if view is None else comp.labels[view]
+    else:
+        return data[att, view]
+
+
 class Subset(object):
 
     """Base class to handle subsets of data.
@@ -162,14 +224,24 @@ class Subset(object):
                 raise exc
 
     def _to_index_list_join(self):
-        return np.where(self._to_mask_join(None).flat)[0]
+        other, mask_right = self._join_partner_mask()
+        return self.data._get_join_index(other).to_index_list(mask_right)
 
     def _to_mask_join(self, view):
         """
         Convert the subset to a mask through an entity join to another
         dataset.
         """
-        for other, (cid1, cid2) in self.data._key_joins.items():
+        other, mask_right = self._join_partner_mask()
+        return self.data._get_join_index(other).to_mask(mask_right, view)
+
+    def _join_partner_mask(self):
+        """
+        Find the first dataset joined to this subset's data for which the
+        subset state can be computed, and return that dataset along with the
+        mask of the subset state on it.
+        """
+        for other in self.data._key_joins:
 
             if getattr(other, '_recursing', False):
                 continue
@@ -184,60 +256,7 @@ class Subset(object):
             finally:
                 self.data._recursing = False
 
-            if len(cid1) == 1 and len(cid2) == 1:
-
-                key_left = self.data[cid1[0], view]
-                key_right = other[cid2[0], mask_right]
-                mask = np.in1d(key_left.ravel(), key_right.ravel())
-
-                return mask.reshape(key_left.shape)
-
-            elif len(cid1) == len(cid2):
-
-                key_left_all = []
-                key_right_all = []
-
-                for cid1_i, cid2_i in zip(cid1, cid2):
-                    key_left_all.append(self.data[cid1_i, view].ravel())
-                    key_right_all.append(other[cid2_i, mask_right].ravel())
-
-                # TODO: The following is slow because we are looping in Python.
-                #       This could be made significantly faster by switching to
-                #       C/Cython.
-
-                key_left_all = zip(*key_left_all)
-                key_right_all = set(zip(*key_right_all))
-
-                result = [key in key_right_all for key in key_left_all]
-                result = np.array(result)
-
-                return result.reshape(self.data[cid1_i, view].shape)
-
-            elif len(cid1) == 1:
-
-                key_left = self.data[cid1[0], view].ravel()
-                mask = np.zeros_like(key_left, dtype=bool)
-                for cid2_i in cid2:
-                    key_right = other[cid2_i, mask_right].ravel()
-                    mask |= np.in1d(key_left, key_right)
-
-                return mask.reshape(self.data[cid1[0], view].shape)
-
-            elif len(cid2) == 1:
-
-                key_right = other[cid2[0], mask_right].ravel()
-                mask = np.zeros_like(self.data[cid1[0], view].ravel(), dtype=bool)
-                for cid1_i in cid1:
-                    key_left = self.data[cid1_i, view].ravel()
-                    mask |= np.in1d(key_left, key_right)
-
-                return mask.reshape(self.data[cid1[0], view].shape)
-
-            else:
-
-                raise Exception("Either the number of components in the key join sets "
-                                "should match, or one of the component sets should ",
-                                "contain a single component.")
+            return other, mask_right
 
         raise IncompatibleAttribute
 
@@ -359,6 +378,16 @@ class Subset(object):
         :param view: View of the data. See data.__getitem__ for detils
         """
         c, v = split_component_view(view)
+        if v is None:
+            # Avoid creating a dense mask where possible
+            try:
+                mask = self.subset_state.to_compressed_mask(self.data)
+            except IncompatibleAttribute:
+                mask = DenseMask(self._to_mask_join(None))
+            if isinstance(mask, DenseMask):
+                return self.data[c][mask.array]
+            else:
+                return self.data[c].flat[mask.to_index_list()]
         ma = self.to_mask(v)
         return self.data[view][ma]
 
@@ -486,13 +515,23 @@ class SubsetState(object):
 
     @contract(data='isinstance(Data)')
     def to_index_list(self, data):
-        return np.where(self.to_mask(data).flat)[0]
+        return self.to_compressed_mask(data).to_index_list()
 
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
         shp = view_shape(data.shape, view)
         return np.zeros(shp, dtype=bool)
 
+    def to_compressed_mask(self, data):
+        """
+        Return the mask for the whole dataset as a
+        :class:`~glue.core.masks.Mask` object, which can be more compact than
+        a dense boolean array. By default, this wraps the result of
+        :meth:`to_mask`, but sub-classes can override this to return more
+        compact representations.
+        """
+        return DenseMask(self.to_mask(data))
+
     @contract(returns='isinstance(SubsetState)')
     def copy(self):
         return SubsetState()
@@ -559,8 +598,8 @@ class RoiSubsetState(SubsetState):
                 else:
                     subset.append(slice(0, 1))
 
-            x_slice = x[subset]
-            y_slice = y[subset]
+            x_slice = x[tuple(subset)]
+            y_slice = y[tuple(subset)]
 
             if self.roi.defined():
                 result = self.roi.contains(x_slice, y_slice)
@@ -572,7 +611,15 @@ class RoiSubsetState(SubsetState):
         else:
 
             if self.roi.defined():
-                result = self.roi.contains(x, y)
+                # For large datasets, we use a spatial index of the points,
+                # which is built for the whole dataset (so not for views)
+                result = None
+                if view is None:
+                    index = get_point_index(data, self.xatt, self.yatt, x, y)
+                    if index is not None:
+                        result = index.contains_roi(self.roi, x, y)
+                if result is None:
+                    result = self.roi.contains(x, y)
             else:
                 result = np.zeros(x.shape, dtype=bool)
 
@@ -600,7 +647,7 @@ class CategoricalROISubsetState(SubsetState):
     def attributes(self):
         return self.att,
 
-    @memoize
+    @cached_mask
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
         x = data.get_component(self.att)._categorical_data[view]
@@ -645,9 +692,14 @@ class RangeSubsetState(SubsetState):
 
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
-        x = data[self.att, view]
-        result = (x >= self.lo) & (x <= self.hi)
-        return result
+
+        def range_mask(chunk_view, out_view):
+            x = data[self.att, chunk_view]
+            result = x >= self.lo
+            result &= x <= self.hi
+            return result
+
+        return chunked_mask(data, view, range_mask)
 
     def copy(self):
         return RangeSubsetState(self.lo, self.hi, self.att)
@@ -674,11 +726,20 @@ class MultiRangeSubsetState(SubsetState):
 
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
-        x = data[self.att, view]
-        result = np.zeros_like(x, dtype=bool)
-        for lo, hi in self.pairs:
-            result |= (x >= lo) & (x <= hi)
-        return result
+
+        def multi_range_mask(chunk_view, out_view):
+            x = data[self.att, chunk_view]
+            result = np.zeros(x.shape, dtype=bool)
+            lower = np.zeros(x.shape, dtype=bool)
+            upper = np.zeros(x.shape, dtype=bool)
+            for lo, hi in self.pairs:
+                np.greater_equal(x, lo, out=lower)
+                np.less_equal(x, hi, out=upper)
+                lower &= upper
+                result |= lower
+            return result
+
+        return chunked_mask(data, view, multi_range_mask)
 
     def copy(self):
         return MultiRangeSubsetState(self.pairs, self.att)
@@ -708,7 +769,7 @@ class CategoricalROISubsetState2D(SubsetState):
     def attributes(self):
         return (self.att1, self.att2)
 
-    @memoize
+    @cached_mask
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
 
@@ -777,7 +838,7 @@ class CategoricalMultiRangeSubsetState(SubsetState):
     def attributes(self):
         return (self.cat_att, self._num_att)
 
-    @memoize
+    @cached_mask
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
 
@@ -844,16 +905,21 @@ class CompositeSubsetState(SubsetState):
             att += self.state2.attributes
         return tuple(sorted(set(att)))
 
-    @memoize
+    @cached_mask
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
-        return self.op(self.state1.to_mask(data, view),
-                       self.state2.to_mask(data, view))
+        from glue.core.subset_evaluator import SubsetEvaluator
+        return SubsetEvaluator(self).evaluate(data, view)
+
+    def to_compressed_mask(self, data):
+        return self.op(self.state1.to_compressed_mask(data),
+                       self.state2.to_compressed_mask(data))
 
     def __str__(self):
         sym = OPSYM.get(self.op, self.op)
         return "(%s %s %s)" % (self.state1, sym, self.state2)
 
+
 class OrState(CompositeSubsetState):
     op = operator.or_
 
@@ -868,10 +934,14 @@ class XorState(CompositeSubsetState):
 
 class InvertState(CompositeSubsetState):
 
-    @memoize
+    @cached_mask
     @contract(data='isinstance(Data)', view='array_view')
     def to_mask(self, data, view=None):
-        return ~self.state1.to_mask(data, view)
+        from glue.core.subset_evaluator import SubsetEvaluator
+        return SubsetEvaluator(self).evaluate(data, view)
+
+    def to_compressed_mask(self, data):
+        return ~self.state1.to_compressed_mask(data)
 
     def __str__(self):
         return "(~%s)" % self.state1
@@ -911,6 +981,12 @@ class MaskSubsetState(SubsetState):
 
         return result
 
+    def to_compressed_mask(self, data):
+        if data.pixel_component_ids == self.cids:
+            return DenseMask(self.mask)
+        else:
+            return DenseMask(self.to_mask(data))
+
     def __gluestate__(self, context):
         return dict(cids=[context.id(c) for c in self.cids],
                     mask=context.do(self.mask))
@@ -928,7 +1004,7 @@ class CategorySubsetState(SubsetState):
         self._attribute = attribute
         self._values = np.asarray(values).ravel()
 
-    @memoize
+    @cached_mask
     def to_mask(self, data, view=None):
         vals = data[self._attribute, view]
         result = np.in1d(vals.ravel(), self._values)
@@ -957,22 +1033,20 @@ class ElementSubsetState(SubsetState):
         else:
             self._data_uuid = data.uuid
 
-    @memoize
+    @cached_mask
     def to_mask(self, data, view=None):
+        return self.to_compressed_mask(data).to_dense(view=view)
+
+    def to_compressed_mask(self, data):
         if data.uuid == self._data_uuid or self._data_uuid is None:
-            # XXX this is inefficient for views
-            result = np.zeros(data.shape, dtype=bool)
-            if self._indices is not None:
-                try:
-                    result.flat[self._indices] = True
-                except IndexError:
-                    if self._data_uuid is None:
-                        raise IncompatibleAttribute()
-                    else:
-                        raise
-            if view is not None:
-                result = result[view]
-            return result
+            indices = [] if self._indices is None else self._indices
+            try:
+                return IndexMask(indices, data.shape)
+            except IndexError:
+                if self._data_uuid is None:
+                    raise IncompatibleAttribute()
+                else:
+                    raise
         else:
             raise IncompatibleAttribute()
 
@@ -1032,43 +1106,15 @@ class InequalitySubsetState(SubsetState):
     def operator(self):
         return self._operator
 
-    @memoize
+    @cached_mask
     def to_mask(self, data, view=None):
 
-        # FIXME: the default view in glue should be ... not None, because
-        # if x is a Numpy array, x[None] has one more dimension than x. For
-        # now we just fix this for the scope of this method.
-        if view is None:
-            view = Ellipsis
-
-        if isinstance(self._left, (numbers.Number, six.string_types)):
-            left = self._left
-        else:
-            try:
-                comp = data.get_component(self._left)
-            except IncompatibleAttribute:
-                left = data[self._left, view]
-            else:
-                if comp.categorical:
-                    left = comp.labels[view]
-                else:
-                    left = comp.data[view]
-
-        if isinstance(self._right, (numbers.Number, six.string_types)):
-            right = self._right
-        else:
-            try:
-                comp = data.get_component(self._right)
-            except IncompatibleAttribute:
-                right = data[self._right, view]
-            else:
-                if comp.categorical:
-                    right = comp.labels[view]
-                else:
-                    right = comp.data[view]
-
+        def inequality_mask(chunk_view, out_view):
+            left = _comparison_values(data, self._left, chunk_view)
+            right = _comparison_values(data, self._right, chunk_view)
+            return self._operator(left, right)
 
-        return self._operator(left, right)
+        return chunked_mask(data, view, inequality_mask)
 
     def copy(self):
         return InequalitySubsetState(self._left, self._right, self._operator)
@@ -0,0 +1,325 @@
+"""
+Evaluation of composite subset states.
+
+Composite subset states (e.g. combinations of ranges built up in the GUI with
+the different selection modes) form a tree of subset states. Evaluating such
+a tree naively by recursively calling ``to_mask`` on each state can result in
+the same components being read many times and in many full-size temporary
+arrays being created. :class:`SubsetEvaluator` instead:
+
+* flattens the tree into a directed acyclic graph in which identical
+  sub-states are only represented (and evaluated) once, and nested ``&`` and
+  ``|`` operations are merged into a single operation,
+* fuses ranges on the same attribute that are combined with ``|`` (or ``&``)
+  into a single set of non-overlapping intervals that can be evaluated in a
+  single pass,
+* reads each component at most once, and
+* evaluates the graph in chunks along the first dimension to bound the memory
+  used by temporary arrays.
+
+Subset states that are not known to the evaluator are evaluated by calling
+their ``to_mask`` method (once for the whole view).
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numbers
+import operator
+from functools import reduce
+
+import numpy as np
+
+from glue.external import six
+from glue.core.component_id import ComponentID
+from glue.core.subset import (RangeSubsetState, MultiRangeSubsetState,
+                              InequalitySubsetState, CompositeSubsetState,
+                              AndState, OrState, InvertState, chunked_mask,
+                              _comparison_values)
+
+__all__ = ['SubsetEvaluator']
+
+
+def _inherits_to_mask(state, cls):
+    """
+    Return whether the class of ``state`` uses the ``to_mask`` method of
+    ``cls`` rather than overriding it.
+    """
+    # On Python 2, accessing methods on classes returns a new unbound method
+    # each time, so we need to compare the underlying functions.
+    return (six.get_unbound_function(type(state).to_mask) is
+            six.get_unbound_function(cls.to_mask))
+
+
+def _merge_intervals(intervals):
+    """
+    Merge a list of closed (lo, hi) intervals into a sorted tuple of
+    non-overlapping intervals. Empty intervals (with lo > hi) are dropped.
+    """
+    result = []
+    for lo, hi in sorted((lo, hi) for lo, hi in intervals if lo <= hi):
+        if result and lo <= result[-1][1]:
+            result[-1] = (result[-1][0], max(hi, result[-1][1]))
+        else:
+            result.append((lo, hi))
+    return tuple(result)
+
+
+def _intersect_intervals(intervals1, intervals2):
+    """
+    Intersect two sorted tuples of non-overlapping closed intervals.
+    """
+    result = []
+    for lo1, hi1 in intervals1:
+        for lo2, hi2 in intervals2:
+            lo, hi = max(lo1, lo2), min(hi1, hi2)
+            if lo <= hi:
+                result.append((lo, hi))
+    return _merge_intervals(result)
+
+
+def _is_value(value):
+    return isinstance(value, (numbers.Number, six.string_types))
+
+
+def _ref(value):
+    # ComponentIDs define __eq__ for numbers and strings, so to be safe we
+    # never compare them directly when looking up keys.
+    if _is_value(value):
+        return ('value', value)
+    else:
+        return ('object', id(value))
+
+
+class SubsetEvaluator(object):
+    """
+    Evaluate a (composite) subset state.
+
+    Parameters
+    ----------
+    state : :class:`~glue.core.subset.SubsetState`
+        The subset state to evaluate
+    """
+
+    def __init__(self, state):
+        self._nodes = {}
+        self._opaque = {}
+        self._objects = {}
+        self.root = self._build(state)
+        self._prune()
+
+    @property
+    def n_nodes(self):
+        """
+        The number of distinct nodes in the graph.
+        """
+        return len(self._nodes)
+
+    def _children(self, key):
+        node = self._nodes[key]
+        if node[0] in ('and', 'or'):
+            return node[1]
+        elif node[0] == 'apply':
+            return node[2:]
+        elif node[0] == 'not':
+            return node[1:]
+        else:
+            return ()
+
+    def _prune(self):
+        # Remove nodes that are no longer used once ranges have been fused
+        used = set()
+        stack = [self.root]
+        while stack:
+            key = stack.pop()
+            if key not in used:
+                used.add(key)
+                stack.extend(self._children(key))
+        self._nodes = dict((key, self._nodes[key]) for key in used)
+        self._opaque = dict((key, state) for key, state in self._opaque.items() if key in used)
+
+    def _add(self, key, node):
+        if key not in self._nodes:
+            self._nodes[key] = node
+        return key
+
+    def _ranges(self, att, intervals):
+        self._objects[id(att)] = att
+        intervals = _merge_intervals(intervals)
+        return self._add(('ranges', _ref(att), intervals), ('ranges', att, intervals))
+
+    def _build(self, state):
+
+        # Note that we check for exact types (or for to_mask not being
+        # overridden) here since sub-classes could override to_mask.
+
+        if type(state) is RangeSubsetState and isinstance(state.att, ComponentID):
+            return self._ranges(state.att, [(state.lo, state.hi)])
+
+        elif type(state) is MultiRangeSubsetState and isinstance(state.att, ComponentID):
+            return self._ranges(state.att, state.pairs)
+
+        elif (type(state) is InequalitySubsetState and
+              all(isinstance(x, ComponentID) or _is_value(x) for x in (state.left, state.right))):
+            key = ('compare', _ref(state.left), state.operator, _ref(state.right))
+            return self._add(key, ('compare', state.left, state.operator, state.right))
+
+        elif isinstance(state, InvertState) and _inherits_to_mask(state, InvertState):
+            child = self._build(state.state1)
+            node = self._nodes[child]
+            if node[0] == 'not':
+                return node[1]
+            return self._add(('not', child), ('not', child))
+
+        elif type(state) in (AndState, OrState):
+            return self._build_reduce(state)
+
+        elif (isinstance(state, CompositeSubsetState) and
+              _inherits_to_mask(state, CompositeSubsetState)):
+            children = (self._build(state.state1), self._build(state.state2))
+            return self._add((state.op,) + children, ('apply', state.op) + children)
+
+        else:
+            key = ('state', id(state))
+            self._opaque[key] = state
+            return self._add(key, ('state', state))
+
+    def _build_reduce(self, state):
+
+        kind = 'and' if type(state) is AndState else 'or'
+
+        # Flatten nested operations of the same type, e.g. a | (b | c)
+        children = []
+        stack = [state.state2, state.state1]
+        while stack:
+            child = stack.pop()
+            if type(child) is type(state):
+                stack.extend([child.state2, child.state1])
+            else:
+                children.append(self._build(child))
+
+        # Fuse ranges on the same attribute
+        ranges = {}
+        others = []
+        for key in children:
+            node = self._nodes[key]
+            if node[0] == 'ranges':
+                ranges.setdefault(key[1], []).append(node[2])
+            elif key not in others:
+                others.append(key)
+
+        for att_ref, intervals in ranges.items():
+            att = self._objects[att_ref[1]]
+            if kind == 'or':
+                merged = _merge_intervals(sum(intervals, ()))
+            else:
+                merged = reduce(_intersect_intervals, intervals)
+            others.append(self._ranges(att, merged))
+
+        if len(others) == 1:
+            return others[0]
+
+        key = (kind, frozenset(others))
+        return self._add(key, (kind, tuple(others)))
+
+    def evaluate(self, data, view=None, chunk_size=None):
+        """
+        Compute the mask for the subset state.
+
+        Parameters
+        ----------
+        data : :class:`~glue.core.data.Data`
+            The data to compute the mask for
+        view : slice or tuple, optional
+            The view of the data to compute the mask for
+        chunk_size : int, optional
+            The approximate number of elements to evaluate at a time. If not
+            specified, this is determined by the ``MASK_CHUNK_SIZE`` setting.
+        """
+
+        # Subset states we don't know about are evaluated once for the whole
+        # view, and the results are then split into chunks.
+        opaque = {}
+        for key, state in self._opaque.items():
+            opaque[key] = state.to_mask(data, view)
+
+        def evaluate_chunk(chunk_view, out_view):
+            return np.asarray(self._evaluate(self.root, data, chunk_view, out_view,
+                                             opaque, {}, {}), dtype=bool)
+
+        return chunked_mask(data, view, evaluate_chunk, chunk_size=chunk_size)
+
+    def _read(self, data, att, view, reads, labels):
+        """
+        Read (and cache) component values, either as used by RangeSubsetState
+        (``labels=False``) or by InequalitySubsetState (``labels=True``).
+        """
+
+        if _is_value(att):
+            return att
+
+        key = (id(att), labels)
+
+        if key not in reads:
+            if labels:
+                reads[key] = _comparison_values(data, att, view)
+            else:
+                reads[key] = data[att, view]
+
+        return reads[key]
+
+    def _evaluate(self, key, data, view, out_view, opaque, results, reads):
+
+        if key in results:
+            return results[key]
+
+        node = self._nodes[key]
+        kind = node[0]
+
+        if kind == 'state':
+
+            result = opaque[key][out_view]
+
+        elif kind == 'ranges':
+
+            x = self._read(data, node[1], view, reads, False)
+            intervals = node[2]
+
+            if len(intervals) == 0:
+                result = np.zeros(np.shape(x), dtype=bool)
+            elif len(intervals) == 1:
+                lo, hi = intervals[0]
+                result = x >= lo
+                result &= x <= hi
+            else:
+                # Find the interval whose lower bound is just below each value
+                # and check whether the value is below the upper bound.
+                los = np.array([interval[0] for interval in intervals])
+                his = np.array([interval[1] for interval in intervals])
+                index = np.searchsorted(los, x, side='right') - 1
+                result = index >= 0
+                result &= x <= his[index.clip(0)]
+
+        elif kind == 'compare':
+
+            left = self._read(data, node[1], view, reads, True)
+            right = self._read(data, node[3], view, reads, True)
+            result = node[2](left, right)
+
+        elif kind == 'not':
+
+            result = ~self._evaluate(node[1], data, view, out_view, opaque, results, reads)
+
+        elif kind == 'apply':
+
+            result = node[1](*[self._evaluate(child, data, view, out_view, opaque, results, reads)
+                               for child in node[2:]])
+
+        else:
+
+            children = [self._evaluate(child, data, view, out_view, opaque, results, reads)
+                        for child in node[1]]
+            result = reduce(operator.and_ if kind == 'and' else operator.or_, children)
+
+        results[key] = result
+
+        return result
@@ -7,15 +7,17 @@ import operator
 
 import pytest
 import numpy as np
-from mock import MagicMock
+from mock import MagicMock, patch
 
 from glue.external import six
 from glue import core
+from glue.config import settings
 from glue.tests.helpers import requires_astropy
 
 from ..coordinates import Coordinates
 from ..component import (Component, DerivedComponent, CoordinateComponent,
-                         CategoricalComponent)
+                         CategoricalComponent, DeferredComponent, DERIVED_CACHE,
+                         WORLD_CACHE)
 from ..component_id import ComponentID
 from ..data import Data
 
@@ -244,6 +246,47 @@ class TestCoordinateComponent(object):
         np.testing.assert_array_equal(self.wy[view], y[view] * 2)
         np.testing.assert_array_equal(self.wz[view], z[view] * 3)
 
+    def test_world_cache(self):
+
+        calls = []
+
+        class CountingCoords(Coordinates):
+
+            def pixel2world(self, *args):
+                calls.append([np.size(a) for a in args])
+                x, y, z = args
+                return x + z, y * 2, z * 3 + x
+
+            def dependent_axes(self, axis):
+                return (0, 2) if axis in (0, 2) else (axis,)
+
+        self.data.coords = CountingCoords()
+
+        z, y, x = np.mgrid[0:3, 0:3, 0:3]
+
+        for view in VIEWS + (None, np.s_[1:, 2, ::-1], np.s_[[0, 2], 1]):
+            expected = x + z if view is None else (x + z)[view]
+            np.testing.assert_array_equal(self.wx[view], expected)
+            expected = y * 2 if view is None else (y * 2)[view]
+            np.testing.assert_array_equal(self.wy[view], expected)
+
+        # The coordinates should have been computed once per component, and
+        # only for the dependent axes.
+        assert calls == [[9, 9, 9], [3, 3, 3]]
+
+        # Changing the coordinates should invalidate the cache
+        self.data.coords = CountingCoords()
+        np.testing.assert_array_equal(self.wy.data, y * 2)
+        assert len(calls) == 3
+
+        # The size of the cache is controlled by WORLD_CACHE_SIZE
+        with patch.dict(settings._members, WORLD_CACHE_SIZE=0):
+            WORLD_CACHE.clear()
+            np.testing.assert_array_equal(self.wy.data, y * 2)
+            np.testing.assert_array_equal(self.wy.data, y * 2)
+            assert len(calls) == 5
+            assert len(WORLD_CACHE) == 0
+
 
 def check_binary(result, left, right, op):
     assert isinstance(result, core.subset.InequalitySubsetState)
@@ -325,6 +368,88 @@ def test_view_derived(view):
     np.testing.assert_array_equal(dc[view], comp.data[view] * 3)
 
 
+class TestDerivedCache(object):
+
+    def setup_method(self, method):
+        DERIVED_CACHE.clear()
+        DERIVED_CACHE.reset_stats()
+        self.data = Data(x=[1, 2, 3, 4])
+        self.calls = []
+
+        def using(x):
+            self.calls.append(x)
+            return x * 2
+
+        link = core.ComponentLink([self.data.id['x']], ComponentID('y'), using=using)
+        self.data.add_component(DerivedComponent(self.data, link), 'y')
+        self.y = self.data.id['y']
+
+    def test_disabled_by_default(self):
+        np.testing.assert_array_equal(self.data[self.y], [2, 4, 6, 8])
+        np.testing.assert_array_equal(self.data[self.y], [2, 4, 6, 8])
+        assert len(self.calls) == 2
+        assert len(DERIVED_CACHE) == 0
+
+    def test_cached(self):
+        with patch.dict(settings._members, DERIVED_CACHE_SIZE=1):
+
+            # Views are not cached until the full array has been computed
+            np.testing.assert_array_equal(self.data[self.y, 1:3], [4, 6])
+            assert len(self.calls) == 1
+
+            np.testing.assert_array_equal(self.data[self.y], [2, 4, 6, 8])
+            np.testing.assert_array_equal(self.data[self.y], [2, 4, 6, 8])
+            np.testing.assert_array_equal(self.data[self.y, 1:3], [4, 6])
+            assert len(self.calls) == 2
+
+            # Updating the data should invalidate the cache
+            self.data.update_components({self.data.id['x']: [4, 3, 2, 1]})
+            np.testing.assert_array_equal(self.data[self.y], [8, 6, 4, 2])
+            assert len(self.calls) == 3
+
+    def test_budget(self):
+        with patch.dict(settings._members, DERIVED_CACHE_SIZE=1):
+            DERIVED_CACHE.max_bytes = 16
+            try:
+                self.data[self.y]
+                assert len(DERIVED_CACHE) == 0
+                self.data[self.y]
+                assert len(self.calls) == 2
+            finally:
+                DERIVED_CACHE.max_bytes = None
+
+
+def test_deferred_component():
+
+    loader = MagicMock(return_value=np.array([[True, False, True]]))
+
+    comp = DeferredComponent(loader, (1, 3), dtype=int, units='m')
+
+    data = Data()
+    data.add_component(comp, 'x')
+
+    assert comp.shape == (1, 3)
+    assert comp.ndim == 2
+    assert comp.numeric
+    assert comp.dtype == int
+    assert comp.units == 'm'
+    assert not comp.loaded
+    assert data.shape == (1, 3)
+    assert loader.call_count == 0
+
+    np.testing.assert_array_equal(data['x'], [[1, 0, 1]])
+    assert comp.loaded
+    assert not comp.data.flags.writeable
+
+    comp.data
+    assert loader.call_count == 1
+
+    comp = DeferredComponent(MagicMock(return_value=np.zeros(2)), (3,))
+    with pytest.raises(ValueError) as exc:
+        comp.data
+    assert exc.value.args[0] == "Shape of loaded values (2,) does not match the expected shape (3,)"
+
+
 @requires_astropy
 def test_units():
 
@@ -2,6 +2,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+import gc
+
 import pytest
 from mock import MagicMock
 
@@ -9,7 +11,7 @@ from ..data import Data
 from ..data_collection import DataCollection
 from ..exceptions import InvalidSubscriber, InvalidMessage
 from ..hub import Hub, HubListener
-from ..message import SubsetMessage, Message
+from ..message import SubsetMessage, SubsetUpdateMessage, Message
 from ..subset import Subset
 
 
@@ -167,6 +169,67 @@ class TestHub(object):
         assert exc.value.args[0] == ("Inputs must be HubListener, data, "
                                      "subset, or data collection objects")
 
+    def test_dispatch_table(self):
+        msg, handler, subscriber = self.get_subscription()
+        handler2 = MagicMock()
+        self.hub.subscribe(subscriber, msg, handler)
+
+        self.hub.broadcast(SubsetMessage(Subset(None)))
+        assert handler.call_count == 1
+        assert SubsetMessage in self.hub._dispatch
+
+        # Subscribing should reset the dispatch table so that the more
+        # specific subscription is used
+        self.hub.subscribe(subscriber, SubsetMessage, handler2)
+        self.hub.broadcast(SubsetMessage(Subset(None)))
+        assert handler.call_count == 1
+        assert handler2.call_count == 1
+
+        self.hub.unsubscribe(subscriber, SubsetMessage)
+        self.hub.broadcast(SubsetMessage(Subset(None)))
+        assert handler.call_count == 2
+        assert handler2.call_count == 1
+
+    def test_garbage_collected_subscriber(self):
+        msg, handler, subscriber = self.get_subscription()
+        self.hub.subscribe(subscriber, msg, handler)
+        self.hub.broadcast(msg("Test"))
+        del subscriber
+        gc.collect()
+        self.hub.broadcast(msg("Test"))
+        assert handler.call_count == 1
+
+    def test_delay_callbacks(self):
+        msg, handler, subscriber = self.get_subscription()
+        self.hub.subscribe(subscriber, msg, handler)
+        subset = Subset(None)
+        with self.hub.delay_callbacks():
+            self.hub.broadcast(SubsetUpdateMessage(subset, attribute='style'))
+            self.hub.broadcast(SubsetUpdateMessage(subset, attribute='style'))
+            assert handler.call_count == 0
+        assert handler.call_count == 2
+
+    def test_delay_callbacks_coalesce(self):
+        msg, handler, subscriber = self.get_subscription()
+        self.hub.subscribe(subscriber, msg, handler)
+
+        subset1 = Subset(None)
+        subset2 = Subset(None)
+
+        messages = [SubsetUpdateMessage(subset1, attribute='style'),
+                    SubsetUpdateMessage(subset1, attribute='subset_state'),
+                    SubsetUpdateMessage(subset2, attribute='style'),
+                    SubsetUpdateMessage(subset1, attribute='style'),
+                    SubsetMessage(subset1),
+                    SubsetUpdateMessage(subset1, attribute='subset_state')]
+
+        with self.hub.delay_callbacks(coalesce=True):
+            for message in messages:
+                self.hub.broadcast(message)
+
+        assert [call[0][0] for call in handler.call_args_list] == [messages[3], messages[5],
+                                                                  messages[2], messages[4]]
+
 
 class TestHubListener(object):
     """This is a dumb test, I know. Fixated on code coverage"""
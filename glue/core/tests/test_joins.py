@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
 import pytest
+import numpy as np
 from numpy.testing import assert_array_equal
 
 from .. import Data, DataCollection
@@ -195,3 +196,97 @@ def test_mismatch():
                                  "join sets should match, or one of the "
                                  "component sets should contain a single "
                                  "component.")
+
+
+def test_many_to_many_categorical():
+
+    d1 = Data(x=['a', 'b', 'c', 'c', 'c'],
+              y=[0, 0, 1, 1, 2], label='d1')
+    d2 = Data(a=['c', 'b', 'c', 'd'],
+              b=[1, 0, 2, 1], label='d2')
+    d2.join_on_key(d1, ('a', 'b'), ('x', 'y'))
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['y'] > 0
+    assert_array_equal(s.to_mask(), [1, 0, 1, 0])
+
+
+def test_missing_keys_do_not_match():
+
+    d1 = Data(x=[1, np.nan, 3], y=[0, 1, 1], label='d1')
+    d2 = Data(a=[1, np.nan, 3], b=[0, 1, 2], label='d2')
+    d2.join_on_key(d1, ('a', 'b'), ('x', 'y'))
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['y'] > -1
+    assert_array_equal(s.to_mask(), [1, 0, 0])
+
+
+def test_join_view():
+
+    d1 = Data(x=[1, 2, 3, 4], label='d1')
+    d2 = Data(a=[[4, 3], [2, 1]], label='d2')
+    d2.join_on_key(d1, 'a', 'x')
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['x'] > 2
+    assert_array_equal(s.to_mask(view=(slice(None), 1)), [1, 0])
+
+
+def test_join_index_reused():
+
+    d1 = Data(x=[1, 2, 3], y=[4, 5, 6], label='d1')
+    d2 = Data(a=[3, 2, 1], b=[6, 5, 4], label='d2')
+    d2.join_on_key(d1, ('a', 'b'), ('x', 'y'))
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['x'] > 1
+    assert_array_equal(s.to_mask(), [1, 1, 0])
+
+    index = d2._get_join_index(d1)
+
+    s.subset_state = d1.id['x'] > 2
+    assert_array_equal(s.to_mask(), [1, 0, 0])
+    assert d2._get_join_index(d1) is index
+
+    # Changing the key values should cause the index to be rebuilt
+    d1.update_components({d1.id['x']: [3, 2, 1]})
+    assert_array_equal(s.to_mask(), [0, 0, 0])
+    assert d2._get_join_index(d1) is not index
+
+
+def test_join_index_invalidation():
+
+    d1 = Data(x=[1, 2, 3], y=[4, 5, 6], label='d1')
+    d2 = Data(a=[3, 2, 1], b=[6, 5, 4], label='d2')
+    d2.join_on_key(d1, 'a', 'x')
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['y'] > 4
+    assert_array_equal(s.to_mask(), [1, 1, 0])
+
+    index = d2._get_join_index(d1)
+
+    # Updating non-key components should not invalidate the index
+    d1.update_components({d1.id['y']: [6, 5, 4]})
+    d2.update_components({d2.id['b']: [1, 1, 1]})
+    assert d2._get_join_index(d1) is index
+    assert_array_equal(s.to_mask(), [0, 1, 1])
+
+    d2.update_components({d2.id['a']: [1, 1, 1]})
+    assert d2._get_join_index(d1) is not index
+    assert_array_equal(s.to_mask(), [1, 1, 1])
+
+
+def test_join_to_index_list():
+
+    d1 = Data(x=[1, 2, 3, 1], label='d1')
+    d2 = Data(a=[1, 2, 3, 4, 1, 2], b=[3, 3, 1, 2, 1, 1], label='d2')
+    d1.join_on_key(d2, 'x', ('a', 'b'))
+    d2.join_on_key(d1, ('a', 'b'), 'x')
+
+    s = d2.new_subset()
+    s.subset_state = d1.id['x'] == 1
+    assert_array_equal(s.to_index_list(), [0, 2, 4, 5])
+    assert_array_equal(s.to_mask(), [1, 0, 1, 0, 1, 1])
+    assert_array_equal(s.to_mask(view=slice(1, 3)), [0, 1])
@@ -80,6 +80,48 @@ def test_multilink_nofunc():
     assert exc.value.args[0] == "Must supply either forwards or backwards"
 
 
+class CountingFunction(object):
+
+    def __init__(self):
+        self.__name__ = 'counting'
+        self.calls = 0
+
+    def __call__(self, x, y):
+        self.calls += 1
+        return x * 3, y * 5
+
+
+def test_multilink_shared_evaluation():
+
+    func = CountingFunction()
+
+    data = Data(ra=[1., 2., 3.], dec=[4., 5., 6.])
+    lon, lat = ComponentID('lon'), ComponentID('lat')
+    for link in multi_link([data.id['ra'], data.id['dec']], [lon, lat], func):
+        data.add_component_link(link)
+
+    # Both outputs are computed with a single call to the function
+    np.testing.assert_array_equal(data[lon], [3, 6, 9])
+    np.testing.assert_array_equal(data[lat], [20, 25, 30])
+    assert func.calls == 1
+
+    # The outputs are discarded once both have been used
+    np.testing.assert_array_equal(data[lat], [20, 25, 30])
+    assert func.calls == 2
+
+    # Views are taken into account
+    np.testing.assert_array_equal(data[lon, 1:], [6, 9])
+    np.testing.assert_array_equal(data[lat, 1:], [25, 30])
+    np.testing.assert_array_equal(data[lat, :2], [20, 25])
+    assert func.calls == 4
+
+    # Changing the data invalidates the outputs
+    np.testing.assert_array_equal(data[lon], [3, 6, 9])
+    data.update_components({data.id['dec']: np.array([1., 1., 1.])})
+    np.testing.assert_array_equal(data[lat], [5, 5, 5])
+    assert func.calls == 6
+
+
 def test_linksame_string():
     """String inputs auto-converted to component IDs"""
     # ComponentLink does type checking to ensure conversion happens
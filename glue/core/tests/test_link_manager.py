@@ -3,13 +3,14 @@
 from __future__ import absolute_import, division, print_function
 
 import numpy as np
+from mock import patch
 
 from ..component_link import ComponentLink
 from ..data import ComponentID, DerivedComponent
 from ..data import Data, Component
 from ..data_collection import DataCollection
 from ..link_manager import (LinkManager, accessible_links, discover_links,
-                            find_dependents)
+                            find_dependents, consumer_index)
 from ..link_helpers import LinkSame
 
 comp = Component(data=np.array([1, 2, 3]))
@@ -111,6 +112,21 @@ class TestDiscoverLinks(object):
 
         assert links[self.cs[4]] is self.links[-1]
 
+    def test_long_chain(self):
+        """ Links are resolved in one pass regardless of their order """
+        cids = [self.cs[0]] + [ComponentID('x%i' % i) for i in range(100)]
+        chain = [ComponentLink([cids[i]], cids[i + 1]) for i in range(100)]
+        links = discover_links(self.data, chain[::-1])
+        for i in range(100):
+            assert links[cids[i + 1]] is chain[i]
+
+    def test_consumer_index(self):
+        index = consumer_index(self.links)
+        assert index[self.cs[2]] == set([self.links[2], self.links[4], self.links[5]])
+        assert self.cs[4] not in index
+        links = discover_links(self.data, self.links, consumers=index)
+        assert set(links) == set(self.direct + self.derived)
+
 
 class TestFindDependents(object):
 
@@ -160,6 +176,16 @@ class TestLinkManager(object):
         expected = set()
         assert set(self.data.derived_components) == expected
 
+    def test_consumers_updated(self):
+        id1 = ComponentID('id1')
+        id2 = ComponentID('id2')
+        lm = LinkManager()
+        link = ComponentLink([id1], id2, using=lambda x: x, inverse=lambda x: x)
+        lm.add_link(link)
+        assert lm._consumers == {id1: set([link]), id2: set([link.inverse])}
+        lm.remove_link(link)
+        assert lm._consumers == {}
+
     def test_update_data_components_adds_correctly(self):
         example_components(self, add_derived=False)
         lm = LinkManager()
@@ -258,3 +284,30 @@ class TestLinkManager(object):
         # Removing dataset should remove related links
         dc.remove(d1)
         assert len(dc.links) == 2
+
+
+def test_only_affected_data_updated():
+
+    d1 = Data(x=[1, 2, 3], label='d1')
+    d2 = Data(y=[1, 2, 3], label='d2')
+    d3 = Data(z=[1, 2, 3], label='d3')
+
+    dc = DataCollection([d1, d2, d3])
+
+    link = LinkSame(d1.id['x'], d2.id['y'])
+
+    with patch.object(dc._link_manager, 'update_data_components',
+                      wraps=dc._link_manager.update_data_components) as update:
+        dc.add_link(link)
+    assert set(call[0][0] for call in update.call_args_list) == set([d1, d2])
+
+    assert d2.id['y'] in d1.components
+    assert d1.id['x'] in d2.components
+
+    with patch.object(dc._link_manager, 'update_data_components',
+                      wraps=dc._link_manager.update_data_components) as update:
+        dc.remove_link(link)
+    assert set(call[0][0] for call in update.call_args_list) == set([d1, d2])
+
+    assert d2.id['y'] not in d1.components
+    assert d1.id['x'] not in d2.components
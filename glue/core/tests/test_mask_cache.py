@@ -0,0 +1,93 @@
+from __future__ import absolute_import, division, print_function
+
+import operator
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..data import Data
+from ..subset import CategorySubsetState, InequalitySubsetState
+from ..mask_cache import MaskCache, MASK_CACHE
+
+
+class TestMaskCache(object):
+
+    def test_lru_eviction(self):
+
+        cache = MaskCache(max_bytes=25)
+
+        cache.set('a', np.zeros(10, dtype=bool))
+        cache.set('b', np.zeros(10, dtype=bool))
+        assert cache.nbytes == 20
+
+        # Accessing 'a' makes 'b' the least recently used entry
+        assert cache.get('a') is not None
+
+        cache.set('c', np.zeros(10, dtype=bool))
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert cache.nbytes == 20
+
+        assert cache.stats == {'hits': 1, 'misses': 0, 'evictions': 1,
+                               'entries': 2, 'bytes': 20}
+
+    def test_too_large(self):
+        cache = MaskCache(max_bytes=5)
+        cache.set('a', np.zeros(10, dtype=bool))
+        assert len(cache) == 0
+        assert cache.get('a') is None
+        assert cache.stats['misses'] == 1
+
+    def test_reduce_budget(self):
+        cache = MaskCache(max_bytes=100)
+        cache.set('a', np.zeros(10, dtype=bool))
+        cache.set('b', np.zeros(10, dtype=bool))
+        cache.max_bytes = 10
+        assert len(cache) == 1
+        assert 'b' in cache
+
+
+class TestSubsetStateCaching(object):
+
+    def setup_method(self, method):
+        MASK_CACHE.clear()
+        MASK_CACHE.reset_stats()
+
+    def test_cached(self):
+
+        data = Data(x=[1, 2, 3, 4])
+        state = InequalitySubsetState(data.id['x'], 2, operator.gt)
+
+        assert_equal(state.to_mask(data), [0, 0, 1, 1])
+        assert_equal(state.to_mask(data), [0, 0, 1, 1])
+        assert MASK_CACHE.stats['hits'] == 1
+
+        # Views consisting of slices can be cached too
+        assert_equal(state.to_mask(data, view=slice(1, 3)), [0, 1])
+        assert_equal(state.to_mask(data, view=slice(1, 3)), [0, 1])
+        assert MASK_CACHE.stats['hits'] == 2
+
+        # but not array views
+        view = np.array([True, False, True, False])
+        assert_equal(state.to_mask(data, view=view), [0, 1])
+        assert MASK_CACHE.stats['entries'] == 2
+
+    def test_data_version(self):
+
+        data1 = Data(x=[1, 2, 3, 4])
+        data2 = Data(x=[4, 3, 2, 1])
+        state1 = CategorySubsetState(data1.id['x'], [2, 3])
+        state2 = CategorySubsetState(data2.id['x'], [2, 3])
+
+        assert_equal(state1.to_mask(data1), [0, 1, 1, 0])
+        assert_equal(state2.to_mask(data2), [0, 1, 1, 0])
+
+        data1.update_components({data1.id['x']: [2, 2, 2, 2]})
+
+        assert_equal(state1.to_mask(data1), [1, 1, 1, 1])
+
+        # The mask for the unrelated dataset should still be cached
+        assert_equal(state2.to_mask(data2), [0, 1, 1, 0])
+        assert MASK_CACHE.stats['hits'] == 1
@@ -0,0 +1,83 @@
+from __future__ import absolute_import, division, print_function
+
+import operator
+
+import pytest
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..masks import (DenseMask, IndexMask, RunLengthMask, BitPackedMask,
+                     compress)
+
+
+def make_masks(array):
+    return [DenseMask(array),
+            IndexMask(np.flatnonzero(array), array.shape),
+            RunLengthMask.from_array(array),
+            BitPackedMask.from_array(array)]
+
+
+ARRAYS = [np.random.RandomState(12345).random_sample((7, 5)) > 0.7,
+          np.random.RandomState(12346).random_sample((7, 5)) > 0.2,
+          np.zeros((7, 5), dtype=bool),
+          np.ones((7, 5), dtype=bool)]
+
+
+@pytest.mark.parametrize('array', ARRAYS)
+def test_conversions(array):
+    for mask in make_masks(array):
+        assert mask.shape == array.shape
+        assert mask.count() == np.count_nonzero(array)
+        assert_equal(mask.to_dense(), array)
+        assert_equal(mask.to_index_list(), np.flatnonzero(array))
+        assert_equal(mask.contains([0, 3, 34]), array.ravel()[[0, 3, 34]])
+        assert_equal(BitPackedMask.from_mask(mask).to_dense(), array)
+        assert_equal(~mask, ~array)
+
+
+@pytest.mark.parametrize('op', [operator.and_, operator.or_, operator.xor])
+def test_combine(op):
+    expected = op(ARRAYS[0], ARRAYS[1])
+    for mask1 in make_masks(ARRAYS[0]):
+        for mask2 in make_masks(ARRAYS[1]):
+            result = op(mask1, mask2)
+            assert_equal(result.to_dense(), expected)
+
+
+def test_combine_preserves_representation():
+    index1 = IndexMask([1, 5, 9], (10,))
+    index2 = IndexMask([5, 7], (10,))
+    runs1 = RunLengthMask([0, 6], [3, 8], (10,))
+    runs2 = RunLengthMask([2], [7], (10,))
+    assert isinstance(index1 | index2, IndexMask)
+    assert isinstance(index1 & runs1, IndexMask)
+    assert isinstance(runs1 & index1, IndexMask)
+    assert isinstance(runs1 ^ runs2, RunLengthMask)
+    assert isinstance(~runs1, RunLengthMask)
+    assert_equal((runs1 | runs2).starts, [0])
+    assert_equal((runs1 | runs2).ends, [8])
+
+
+def test_index_mask_view():
+    array = ARRAYS[0]
+    mask = IndexMask(np.flatnonzero(array), array.shape)
+    for view in [(slice(1, 5), slice(None, None, 2)), (3, slice(None)),
+                 (slice(None, None, -2), 1), slice(2, 4), (Ellipsis, 2),
+                 np.array([True, False, True, True, False, False, True])]:
+        assert_equal(mask.to_dense(view=view), array[view])
+
+
+def test_index_mask_bounds():
+    assert_equal(IndexMask([-1, 1, 1], (3,)).indices, [1, 2])
+    with pytest.raises(IndexError):
+        IndexMask([3], (3,))
+
+
+def test_compress():
+    array = np.zeros(1000, dtype=bool)
+    assert isinstance(compress(array), IndexMask)
+    array[100:800] = True
+    assert isinstance(compress(array), RunLengthMask)
+    array[::2] = False
+    assert isinstance(compress(array), BitPackedMask)
+    assert_equal(compress(array).to_dense(), array)
@@ -4,7 +4,9 @@ from __future__ import absolute_import, division, print_function
 
 import pytest
 import numpy as np
-from mock import MagicMock
+from mock import MagicMock, patch
+
+from glue.config import settings
 
 from .. import parse
 from ..data import ComponentID, Component, Data
@@ -151,6 +153,35 @@ class TestParsedCommand(object):
         assert exc.value.args[0] == "name 'nump' is not defined"
 
 
+    def test_compile_cached(self):
+        pc = parse.ParsedCommand('{comp1} * 5', {'comp1': ComponentID('c1')})
+        assert pc.compile() is pc.compile()
+
+    def test_elementwise(self):
+        refs = {'a': ComponentID('a'), 'b': ComponentID('b')}
+        for cmd in ['{a} * 5', '-{a} + {b} ** 2', '({a} > 1) & ({b} < 2)',
+                    'np.sin({a}) + numpy.arctan2({a}, {b})', '{a} // 3']:
+            assert parse.ParsedCommand(cmd, refs).compile().elementwise
+        for cmd in ['3 + 4', 'max({a}, 100)', '{a} - np.mean({a})',
+                    '{a} and {b}', '1 < {a} < 3', 'math.log10({a})']:
+            assert not parse.ParsedCommand(cmd, refs).compile().elementwise
+
+    def test_numexpr_source(self):
+        refs = {'a': ComponentID('a'), 'b': ComponentID('b')}
+        compiled = parse.ParsedCommand('np.sqrt({a}) * {b}', refs).compile()
+        assert compiled.numexpr_source == '(sqrt(_glue_ref_0) * _glue_ref_1)'
+        compiled = parse.ParsedCommand('np.floor({a}) * {b}', refs).compile()
+        assert compiled.numexpr_source is None
+
+    def test_evaluate_reads_once(self):
+        data = MagicMock()
+        c1 = ComponentID('c1')
+        data.__getitem__.return_value = 5
+        pc = parse.ParsedCommand('{comp1} * {comp1} + {comp1}', {'comp1': c1})
+        assert pc.evaluate(data) == 30
+        data.__getitem__.assert_called_once_with((c1, None))
+
+
 class TestParsedComponentLink(object):
 
     def make_link(self):
@@ -189,6 +220,54 @@ class TestParsedComponentLink(object):
         result = data[cid, ::2]
         np.testing.assert_array_equal(result, [100, 300])
 
+    @pytest.mark.parametrize(('chunk_size', 'use_numexpr'),
+                             [(2 ** 20, True), (2 ** 20, False),
+                              (5, True), (5, False)])
+    def test_chunks(self, chunk_size, use_numexpr):
+
+        x = np.arange(60.).reshape((10, 6))
+        y = np.random.random((10, 6))
+        data = Data(x=x, y=y)
+        c2 = ComponentID('c2')
+        refs = {'x': data.id['x'], 'y': data.id['y']}
+        pc = parse.ParsedCommand('np.sqrt({x}) * {y} + ({x} > 20)', refs)
+        data.add_component_link(parse.ParsedComponentLink(c2, pc))
+
+        expected = np.sqrt(x) * y + (x > 20)
+
+        with patch.dict(settings._members, MASK_CHUNK_SIZE=chunk_size):
+            with patch.object(parse, 'numexpr', parse.numexpr if use_numexpr else None):
+                np.testing.assert_allclose(data[c2], expected)
+                np.testing.assert_allclose(data[c2, 1:8:3], expected[1:8:3])
+                np.testing.assert_allclose(data[c2, ::-2, 2], expected[::-2, 2])
+                np.testing.assert_allclose(data[c2, 3], expected[3])
+
+    @pytest.mark.parametrize('cmd', ['np.abs({a})', '{a} * 2 + {b}', '{a} / {b}',
+                                     '({a} > 1) & ({b} < 3)', '{b} ** 2'])
+    @pytest.mark.parametrize('dtype', [np.int64, np.int32, np.float32, np.float64])
+    def test_numexpr_consistency(self, cmd, dtype):
+
+        # The results should not depend on whether numexpr is installed
+
+        data = Data(a=np.array([-3, -1, 0, 2, 5], dtype=dtype),
+                    b=np.array([1, 2, 3, 4, 5], dtype=dtype))
+        refs = {'a': data.id['a'], 'b': data.id['b']}
+        compiled = parse.ParsedCommand(cmd, refs).compile()
+
+        with patch.object(parse, 'numexpr', None):
+            expected = compiled.evaluate(data)
+
+        result = compiled.evaluate(data)
+
+        assert result.dtype == expected.dtype
+        np.testing.assert_array_equal(result, expected)
+
+    def test_numexpr_negative_integer_power(self):
+        data = Data(b=np.array([-1, 2, 3]))
+        compiled = parse.ParsedCommand('{b} ** {b}', {'b': data.id['b']}).compile()
+        with pytest.raises(ValueError):
+            compiled.evaluate(data)
+
     def test_save_load(self):
         from .test_state import clone
 
@@ -241,3 +320,14 @@ class TestParsedSubsetState(object):
         expected = np.array([0, 1, 0, 0], dtype=bool)
 
         np.testing.assert_array_equal(result, expected)
+
+    def test_view(self):
+        cmd = '{s1} & ({g} > 2)'
+        state = parse.ParsedSubsetState(parse.ParsedCommand(cmd, self.refs))
+        np.testing.assert_array_equal(state.to_mask(self.data, slice(1, None)), [1, 1, 0])
+
+    def test_view_not_elementwise(self):
+        # The mean has to be computed over the whole dataset, not the view
+        cmd = '{g} > np.mean({g})'
+        state = parse.ParsedSubsetState(parse.ParsedCommand(cmd, self.refs))
+        np.testing.assert_array_equal(state.to_mask(self.data, slice(2, None)), [1, 1])
@@ -0,0 +1,121 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from mock import patch
+
+from glue.config import settings
+
+from .. import point_index
+from ..data import Data
+from ..point_index import PointIndex, POINT_INDEX_CACHE, get_point_index
+from ..roi import PolygonalROI, CircularROI, RectangularROI, XRangeROI
+from ..subset import RoiSubsetState
+
+
+def random_points(n=20000, seed=12345):
+    np.random.seed(seed)
+    x = np.random.normal(0, 1, n)
+    y = np.random.uniform(-2, 3, n)
+    x[::97] = np.nan
+    y[::89] = np.inf
+    return x, y
+
+
+def lasso(xc, yc, radius, n=50):
+    # A star-shaped (non-convex) polygon
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = radius * (1 + 0.5 * np.sin(5 * theta))
+    return list(xc + r * np.cos(theta)), list(yc + r * np.sin(theta))
+
+
+ROIS = [PolygonalROI(*lasso(0.2, 0.5, 1)),
+        PolygonalROI(*lasso(2.5, 0., 1.5)),
+        PolygonalROI(*lasso(0, 0, 20)),
+        PolygonalROI(vx=[-0.5, 0.5, 0.5, -0.5], vy=[-1, -1, 1, 1]),
+        PolygonalROI(vx=[10, 11, 11], vy=[10, 10, 11]),
+        CircularROI(xc=0.3, yc=0.4, radius=0.8),
+        CircularROI(xc=-3, yc=3, radius=2),
+        RectangularROI(xmin=-1, xmax=0.5, ymin=-3, ymax=1.2),
+        RectangularROI(xmin=-10, xmax=10, ymin=-10, ymax=10)]
+
+
+@pytest.mark.parametrize(('roi', 'shape'),
+                         [(roi, shape) for roi in ROIS
+                          for shape in [None, (1, 1), (3, 50), (40, 40)]])
+def test_contains_roi(roi, shape):
+    x, y = random_points()
+    index = PointIndex(x, y, shape=shape)
+    np.testing.assert_array_equal(index.contains_roi(roi, x, y), roi.contains(x, y))
+
+
+def test_contains_roi_shape():
+    x, y = random_points(n=2000)
+    x, y = x.reshape((20, 100)), y.reshape((20, 100))
+    index = PointIndex(x, y)
+    roi = ROIS[0]
+    result = index.contains_roi(roi, x, y)
+    assert result.shape == (20, 100)
+    np.testing.assert_array_equal(result, roi.contains(x, y))
+
+
+def test_contains_roi_unsupported():
+    x, y = random_points(n=100)
+    assert PointIndex(x, y).contains_roi(XRangeROI(0, 1), x, y) is None
+
+
+def test_degenerate_points():
+    x = np.ones(100)
+    y = np.zeros(100)
+    index = PointIndex(x, y)
+    assert index.contains_roi(CircularROI(1, 0, 0.1), x, y).all()
+    assert not index.contains_roi(CircularROI(2, 0, 0.1), x, y).any()
+
+
+def test_roi_subset_state():
+
+    x, y = random_points()
+    data = Data(x=x, y=y)
+    state = RoiSubsetState(data.id['x'], data.id['y'], ROIS[0])
+
+    POINT_INDEX_CACHE.clear()
+
+    with patch.object(point_index, 'MIN_INDEX_SIZE', 1000):
+
+        np.testing.assert_array_equal(state.to_mask(data), ROIS[0].contains(x, y))
+        assert len(POINT_INDEX_CACHE) == 1
+
+        # The index is re-used for other regions of interest
+        state.roi = ROIS[5]
+        np.testing.assert_array_equal(state.to_mask(data), ROIS[5].contains(x, y))
+        assert len(POINT_INDEX_CACHE) == 1
+
+        # Views don't use the index
+        np.testing.assert_array_equal(state.to_mask(data, slice(10, 20)),
+                                      ROIS[5].contains(x[10:20], y[10:20]))
+
+        # Changing the data invalidates the index
+        data.update_components({data.id['x']: -x})
+        np.testing.assert_array_equal(state.to_mask(data), ROIS[5].contains(-x, y))
+        assert POINT_INDEX_CACHE.stats['entries'] == 2
+
+    POINT_INDEX_CACHE.clear()
+
+
+def test_get_point_index():
+
+    x, y = random_points(n=100)
+    data = Data(x=x, y=y)
+
+    POINT_INDEX_CACHE.clear()
+
+    # Small datasets don't need an index
+    assert get_point_index(data, data.id['x'], data.id['y']) is None
+
+    with patch.object(point_index, 'MIN_INDEX_SIZE', 10):
+        index = get_point_index(data, data.id['x'], data.id['y'])
+        assert get_point_index(data, data.id['x'], data.id['y']) is index
+        with patch.dict(settings._members, ROI_INDEX_CACHE_SIZE=0):
+            assert get_point_index(data, data.id['x'], data.id['y']) is None
+
+    POINT_INDEX_CACHE.clear()
@@ -1,20 +1,23 @@
 from __future__ import absolute_import, division, print_function
 
 import json
+import zipfile
 from io import BytesIO
 
 import pytest
 import numpy as np
+from mock import patch
 
 from glue.external import six
 from glue import core
-from glue.core.component import CategoricalComponent
+from glue.core.component import (CategoricalComponent, DeferredComponent,
+                                 DeferredCategoricalComponent)
 from glue.tests.helpers import requires_astropy, make_file
 
 from ..data_factories import load_data
 from ..data_factories.tests.test_fits import TEST_FITS_DATA
-from ..state import (GlueSerializer, GlueUnSerializer,
-                     saver, loader, VersionedDict)
+from ..state import (GlueSerializer, GlueUnSerializer, GlueSerializeError,
+                     saver, loader, VersionedDict, is_bundle)
 
 
 
@@ -243,6 +246,188 @@ def test_categorical_component():
     np.testing.assert_array_equal(c.categories, ['a','b','c'])
 
 
+def _is_memmap(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_bundle(tmpdir):
+
+    x = np.arange(24.).reshape((2, 3, 4))
+    mask = x > 10
+
+    data = core.Data(x=x, y=np.asfortranarray(x).astype(np.int16), label='data')
+    dc = core.DataCollection([data])
+    dc.new_subset_group(subset_state=core.subset.MaskSubsetState(mask, data.pixel_component_ids),
+                        label='mask')
+
+    path = tmpdir.join('session.glu').strpath
+
+    gs = GlueSerializer(dc, include_data=True)
+    gs.dump_bundle(path)
+
+    # Arrays should be stored separately from the JSON
+    with zipfile.ZipFile(path) as zf:
+        state = json.loads(zf.read('session.json').decode('utf-8'))
+        assert len([name for name in zf.namelist() if name.endswith('.npy')]) > 0
+    assert all('data' not in rec for rec in state.values()
+               if rec.get('_type') == 'numpy.ndarray')
+
+    assert is_bundle(path)
+
+    gu = GlueUnSerializer.load_bundle(path)
+    dc2 = gu.object('__main__')
+    data2 = dc2[0]
+
+    np.testing.assert_array_equal(data2['x'], x)
+    np.testing.assert_array_equal(data2['y'], x.astype(np.int16))
+    assert data2['y'].dtype == np.int16
+    np.testing.assert_array_equal(data2.subsets[0].to_mask(), mask)
+
+    assert _is_memmap(data2.get_component('x').data)
+
+    # Arrays are copy-on-write, so modifying them shouldn't modify the file
+    names = sorted(rec['file'] for rec in state.values()
+                   if rec.get('_type') == 'numpy.ndarray')
+    for name in names:
+        array = gu.load_array(name)
+        array[...] = 0
+    for name in names:
+        array = GlueUnSerializer.load_bundle(path).load_array(name)
+        assert np.any(array != 0)
+
+
+def test_bundle_save_to_loaded_path(tmpdir):
+
+    # Regression test for a bug that caused bundles to be truncated when
+    # saving a session back to the bundle it was loaded from, since the
+    # arrays are memory-mapped from that file.
+
+    x = np.arange(200000.)
+
+    path = tmpdir.join('session.glu').strpath
+    GlueSerializer(core.Data(x=x, label='data'), include_data=True).dump_bundle(path)
+
+    data = GlueUnSerializer.load_bundle(path).object('__main__')
+    assert _is_memmap(data.get_component('x').data)
+
+    GlueSerializer(data, include_data=True).dump_bundle(path)
+
+    data2 = GlueUnSerializer.load_bundle(path).object('__main__')
+    np.testing.assert_array_equal(data2['x'], x)
+    np.testing.assert_array_equal(data['x'], x)
+
+    # No temporary files should be left behind
+    assert tmpdir.listdir() == [tmpdir.join('session.glu')]
+
+
+def test_bundle_json_compat(tmpdir):
+    # Normal sessions shouldn't be detected as bundles, and can't contain
+    # references to external arrays.
+    path = tmpdir.join('session.glu').strpath
+    with open(path, 'w') as f:
+        f.write(GlueSerializer(core.Data(x=[1, 2, 3])).dumps())
+    assert not is_bundle(path)
+    with pytest.raises(GlueSerializeError) as exc:
+        GlueUnSerializer.loads('{"__main__": {"_type": "numpy.ndarray", "file": "arrays/0.npy"}}').object('__main__')
+    assert exc.value.args[0].startswith('Cannot load array arrays/0.npy')
+
+
+def test_lazy_restore(tmpdir):
+
+    path = tmpdir.join('data.csv').strpath
+    with open(path, 'w') as f:
+        f.write('a,b\n1,2\n3,4\n5,6\n')
+
+    dc = core.DataCollection([load_data(path)])
+    state = GlueSerializer(dc).dumps()
+
+    dc2 = GlueUnSerializer.loads(state, lazy=True).object('__main__')
+    data = dc2[0]
+    a = data.get_component('a')
+    b = data.get_component('b')
+
+    assert isinstance(a, DeferredComponent)
+    assert not a.loaded and not b.loaded
+    assert data.shape == (3,)
+    assert a.numeric
+
+    # Saving the session again shouldn't require reading the file
+    state2 = GlueSerializer(dc2).dumps()
+    assert not a.loaded and not b.loaded
+
+    # Reading one component reads the whole file
+    np.testing.assert_array_equal(data['a'], [1, 3, 5])
+    assert a.loaded and b.loaded
+    assert data.get_component('a') is a
+    np.testing.assert_array_equal(data['b'], [2, 4, 6])
+
+    for string in (state2, GlueSerializer(dc2).dumps()):
+        data3 = GlueUnSerializer.loads(string).object('__main__')[0]
+        assert not isinstance(data3.get_component('a'), DeferredComponent)
+        np.testing.assert_array_equal(data3['b'], [2, 4, 6])
+
+
+def test_lazy_restore_categorical(tmpdir):
+
+    path = tmpdir.join('data.csv').strpath
+    with open(path, 'w') as f:
+        f.write('a,c\n1,x\n3,y\n5,x\n')
+
+    dc = core.DataCollection([load_data(path)])
+    state = GlueSerializer(dc).dumps()
+
+    with patch('glue.core.data_factories.helpers.load_data', wraps=load_data) as loader:
+
+        data = GlueUnSerializer.loads(state, lazy=True).object('__main__')[0]
+        a = data.get_component('a')
+        c = data.get_component('c')
+
+        assert isinstance(c, DeferredCategoricalComponent)
+        assert c.categorical
+        assert c.shape == (3,)
+        assert not a.loaded and not c.loaded
+
+        # Saving the session again shouldn't require reading the file
+        state2 = GlueSerializer(data).dumps()
+        assert loader.call_count == 0
+
+        np.testing.assert_array_equal(c.labels, ['x', 'y', 'x'])
+        np.testing.assert_array_equal(c.categories, ['x', 'y'])
+        np.testing.assert_array_equal(data['c'], [0, 1, 0])
+        assert a.loaded and c.loaded
+        assert loader.call_count == 1
+
+    data2 = GlueUnSerializer.loads(state2).object('__main__')
+    assert not isinstance(data2.get_component('c'), DeferredCategoricalComponent)
+    np.testing.assert_array_equal(data2.get_component('c').labels, ['x', 'y', 'x'])
+
+
+def test_lazy_restore_eager_fallback(tmpdir):
+
+    # Sessions saved without information about the shape of the components
+    # are loaded straight away.
+
+    path = tmpdir.join('data.csv').strpath
+    with open(path, 'w') as f:
+        f.write('a,c\n1,x\n3,y\n5,x\n')
+
+    dc = core.DataCollection([load_data(path)])
+    state = GlueSerializer(dc).dumpo()
+
+    for rec in state.values():
+        rec.pop('shape', None)
+
+    data = GlueUnSerializer.loads(json.dumps(state), lazy=True).object('__main__')[0]
+    assert not isinstance(data.get_component('a'), DeferredComponent)
+    assert not isinstance(data.get_component('c'), DeferredCategoricalComponent)
+    np.testing.assert_array_equal(data['a'], [1, 3, 5])
+    np.testing.assert_array_equal(data.get_component('c').labels, ['x', 'y', 'x'])
+
+
 class DummyClass(object):
     pass
 
@@ -101,6 +101,12 @@ class TestStateAttributeLimitsHelper():
         assert_allclose(self.helper.lower, -90)
         assert_allclose(self.helper.upper, +90)
 
+    def test_log_percentile(self):
+        # Only positive values are used in log mode
+        self.helper.log = True
+        assert_allclose(self.helper.lower, 100 * 1 / 9999., rtol=1e-6)
+        assert_allclose(self.helper.upper, +100)
+
     def test_percentile_cached(self):
         # Make sure that if we change scale and change attribute, the scale
         # modes are cached on a per-attribute basis.
@@ -0,0 +1,114 @@
+from __future__ import absolute_import, division, print_function
+
+import operator
+
+import numpy as np
+from numpy.testing import assert_allclose
+from mock import patch
+
+from glue.config import settings
+
+from ..data import Data
+from ..subset import InequalitySubsetState, RangeSubsetState
+from ..statistics import ComponentStatistics, component_statistics, quantile_sketch
+
+
+def test_component_statistics():
+
+    stats = ComponentStatistics()
+    stats.update([np.nan, 3, -np.inf])
+    stats.update([])
+    stats.update([1, 2, np.nan])
+
+    assert stats.count == 6
+    assert stats.finite_count == 3
+    assert stats.nanmin == -np.inf
+    assert stats.nanmax == 3
+    assert stats.min == 1
+    assert stats.max == 3
+    assert_allclose(stats.sketch.percentile(50), 2)
+
+
+def test_component_statistics_empty():
+    stats = ComponentStatistics()
+    stats.update([np.nan, np.nan])
+    assert stats.count == 2
+    assert stats.finite_count == 0
+    assert np.isnan(stats.nanmin) and np.isnan(stats.nanmax)
+    assert np.isnan(stats.min) and np.isnan(stats.max)
+
+
+def test_quantile_sketch():
+
+    data = Data(x=np.arange(-5., 95.).reshape((10, 10)))
+
+    with patch.dict(settings._members, MASK_CHUNK_SIZE=15):
+
+        sketch = quantile_sketch(data, data.id['x'])
+        assert sketch.count == 100
+        assert_allclose(sketch.percentile([0, 50, 100]), [-5, 44.5, 94])
+
+        # The sketch is cached
+        assert quantile_sketch(data, data.id['x']) is sketch
+
+        # Positive values are summarized separately
+        positive = quantile_sketch(data, data.id['x'], positive=True)
+        assert positive.count == 94
+        assert_allclose(positive.percentile([0, 100]), [1, 94])
+
+        # Changing the data invalidates the sketch
+        data.update_components({data.id['x']: np.ones((10, 10))})
+        sketch = quantile_sketch(data, data.id['x'])
+        assert_allclose(sketch.percentile([0, 100]), [1, 1])
+
+
+def test_data_statistics():
+
+    x = np.arange(100.)
+    x[::7] = np.nan
+    data = Data(x=x, y=-x)
+
+    with patch.dict(settings._members, MASK_CHUNK_SIZE=15):
+
+        stats = data.statistics.get(data.id['x'])
+        assert stats.count == 100
+        assert stats.finite_count == np.isfinite(x).sum()
+        assert stats.min == np.nanmin(x)
+        assert stats.max == np.nanmax(x)
+        assert data.statistics.get(data.id['x']) is stats
+
+        # Statistics for subset states whose masks are cached are kept
+        state = InequalitySubsetState(data.id['x'], 50, operator.gt)
+        subset_stats = data.statistics.get(data.id['y'], subset_state=state)
+        assert subset_stats.finite_count == np.sum(x > 50)
+        assert subset_stats.min == -99
+        assert subset_stats.max == -51
+        assert data.statistics.get(data.id['y'], subset_state=state) is subset_stats
+        assert len(data.statistics) == 2
+
+        # Other subset states can be modified in place, so their statistics
+        # are always computed again
+        state = RangeSubsetState(10, 20, data.id['x'])
+        assert data.statistics.get(data.id['x'], subset_state=state).max == 20
+        state.hi = 30
+        assert data.statistics.get(data.id['x'], subset_state=state).max == 30
+        assert len(data.statistics) == 2
+
+        # Changing the values invalidates all statistics
+        data.update_components({data.id['x']: x * 2})
+        assert data.statistics.get(data.id['x']).max == np.nanmax(x) * 2
+        assert len(data.statistics) == 1
+
+
+def test_component_statistics_without_registry():
+
+    class FakeData(object):
+
+        shape = (5,)
+
+        def __getitem__(self, key):
+            return np.arange(5.)[key[1]]
+
+    stats = component_statistics(FakeData(), 'x', positive=True)
+    assert stats.finite_count == 4
+    assert stats.min == 1
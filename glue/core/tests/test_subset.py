@@ -9,8 +9,9 @@ import pytest
 import numpy as np
 from numpy.testing import assert_equal
 
-from mock import MagicMock
+from mock import MagicMock, patch
 
+from glue.config import settings
 from glue.tests.helpers import requires_astropy
 
 from .. import DataCollection, ComponentLink
@@ -18,13 +19,15 @@ from ..data import Data, Component
 from ..roi import CategoricalROI, RectangularROI
 from ..message import SubsetDeleteMessage
 from ..registry import Registry
-from ..subset import (Subset, SubsetState,
+from ..subset import (Subset, SubsetState, MultiRangeSubsetState,
                       ElementSubsetState, RoiSubsetState, RangeSubsetState,
                       CategoricalROISubsetState, InequalitySubsetState, CategorySubsetState, MaskSubsetState, CategoricalROISubsetState2D, CategoricalMultiRangeSubsetState)
 from ..subset import AndState
 from ..subset import InvertState
 from ..subset import OrState
 from ..subset import XorState
+from ..masks import IndexMask
+from ..mask_cache import MASK_CACHE
 from .test_state import clone
 
 
@@ -304,6 +307,35 @@ class TestElementSubsetState(object):
         state = ElementSubsetState(indices=ind)
         np.testing.assert_array_equal(ind, state._indices)
 
+    def test_compressed_mask(self):
+        self.state._indices = [1]
+        mask = self.state.to_compressed_mask(self.data)
+        assert isinstance(mask, IndexMask)
+        np.testing.assert_array_equal(mask.to_index_list(), [1])
+
+    def test_view_mask(self):
+        data = Data(x=np.arange(12).reshape((3, 4)))
+        state = ElementSubsetState(indices=[1, 5, 6, 11])
+        np.testing.assert_array_equal(state.to_mask(data, view=(slice(1, 3), 1)),
+                                      [True, False])
+        np.testing.assert_array_equal(state.to_mask(data, view=(1, slice(None, None, -1))),
+                                      [False, True, True, False])
+
+    def test_combine_compressed(self):
+        data = Data(x=np.arange(10))
+        state = ElementSubsetState(indices=[1, 5, 8]) & (data.id['x'] > 4)
+        mask = state.to_compressed_mask(data)
+        assert isinstance(mask, IndexMask)
+        np.testing.assert_array_equal(mask.to_index_list(), [5, 8])
+
+        subset = data.new_subset()
+        subset.subset_state = state
+        np.testing.assert_array_equal(subset.to_index_list(), [5, 8])
+        np.testing.assert_array_equal(subset[data.id['x']], [5, 8])
+
+        subset.subset_state = ~state
+        np.testing.assert_array_equal(subset[data.id['x']], [0, 1, 2, 3, 4, 6, 7, 9])
+
 
 class TestSubsetIo(object):
 
@@ -534,6 +566,30 @@ def test_mask_of_view_is_view_of_mask(statefac, view):
     np.testing.assert_array_equal(v1, v2)
 
 
+@pytest.mark.parametrize('view', [None, np.s_[2:17], np.s_[::-3, 1], np.s_[4, :],
+                                  np.s_[:, 1:3], np.s_[::2, ::-1]])
+def test_chunked_masks(view):
+
+    np.random.seed(12345)
+
+    d = Data(x=np.random.uniform(0, 10, (20, 4)))
+    x = d.id['x']
+    values = d['x'] if view is None else d['x'][view]
+
+    states = [(RangeSubsetState(2, 6, x),
+               (values >= 2) & (values <= 6)),
+              (MultiRangeSubsetState([(1, 2), (5, 9)], x),
+               ((values >= 1) & (values <= 2)) | ((values >= 5) & (values <= 9))),
+              (InequalitySubsetState(x, 4, op.gt),
+               values > 4)]
+
+    for chunk_size in [1, 3, 4, 7, 100]:
+        with patch.dict(settings._members, MASK_CHUNK_SIZE=chunk_size):
+            for state, expected in states:
+                MASK_CACHE.clear()
+                assert_equal(state.to_mask(d, view), expected)
+
+
 def test_inequality_state_str():
     d = Data(x=[1, 2, 3], y=[2, 3, 4])
     x = d.id['x']
@@ -0,0 +1,167 @@
+from __future__ import absolute_import, division, print_function
+
+import operator
+
+import numpy as np
+from numpy.testing import assert_equal
+from mock import patch
+
+from ..data import Data
+from ..subset import (RangeSubsetState, MultiRangeSubsetState,
+                      InequalitySubsetState, MaskSubsetState, OrState,
+                      XorState, InvertState)
+from ..subset_evaluator import SubsetEvaluator, _merge_intervals
+
+
+def naive_mask(state, data, view=None):
+    # Reference implementation, equivalent to the recursive evaluation
+    # of composite subset states.
+    if hasattr(state, 'state2') and state.state2 is not None:
+        return state.op(naive_mask(state.state1, data, view),
+                        naive_mask(state.state2, data, view))
+    elif hasattr(state, 'state1'):
+        return ~naive_mask(state.state1, data, view)
+    else:
+        return state.to_mask(data, view)
+
+
+class TestSubsetEvaluator(object):
+
+    def setup_method(self, method):
+        np.random.seed(12345)
+        self.data = Data(x=np.random.uniform(0, 10, (20, 5)),
+                         y=np.random.uniform(0, 10, (20, 5)),
+                         c=np.random.randint(0, 3, (20, 5)))
+        self.x = self.data.id['x']
+        self.y = self.data.id['y']
+        self.c = self.data.id['c']
+
+    def test_merge_intervals(self):
+        assert _merge_intervals([(3, 4), (1, 2), (1.5, 3.5), (6, 5)]) == ((1, 4),)
+        assert _merge_intervals([(1, 2), (3, 4)]) == ((1, 2), (3, 4))
+
+    def test_fuse_ranges(self):
+
+        state = RangeSubsetState(0, 1, self.x)
+        for i in range(1, 10):
+            state = state | RangeSubsetState(i, i + 0.5, self.x)
+
+        evaluator = SubsetEvaluator(state)
+        assert evaluator.n_nodes == 1
+        expected = ((0, 1.5),) + tuple((i, i + 0.5) for i in range(2, 10))
+        assert evaluator._nodes[evaluator.root][2] == expected
+
+        for chunk_size in (1, 7, 1000):
+            assert_equal(evaluator.evaluate(self.data, chunk_size=chunk_size),
+                         naive_mask(state, self.data))
+
+    def test_fuse_ranges_and(self):
+
+        state = (RangeSubsetState(2, 8, self.x) &
+                 MultiRangeSubsetState([(1, 3), (5, 7)], self.x) &
+                 RangeSubsetState(3, 5, self.y))
+
+        evaluator = SubsetEvaluator(state)
+        assert evaluator.n_nodes == 3
+        assert_equal(evaluator.evaluate(self.data, chunk_size=10),
+                     naive_mask(state, self.data))
+
+    def test_common_subexpressions(self):
+
+        a = RangeSubsetState(2, 8, self.x)
+        b = InequalitySubsetState(self.y, 5, operator.gt)
+        c = InequalitySubsetState(self.c, 1, operator.eq)
+
+        state = (a & b) ^ ((b & a) | ~~c) ^ ~(a.copy() & b.copy())
+
+        evaluator = SubsetEvaluator(state)
+
+        # x range, y > 5, c == 1, (a & b), (a & b) | c, ~(a & b), and the
+        # two xor operations
+        assert evaluator.n_nodes == 8
+
+        for chunk_size in (1, 7, 1000):
+            assert_equal(evaluator.evaluate(self.data, chunk_size=chunk_size),
+                         naive_mask(state, self.data))
+
+    def test_component_read_once(self):
+
+        state = InequalitySubsetState(self.y, 5, operator.gt) | InequalitySubsetState(self.y, 2, operator.lt)
+
+        evaluator = SubsetEvaluator(state)
+
+        with patch.object(self.data, 'get_component', wraps=self.data.get_component) as get_component:
+            evaluator.evaluate(self.data)
+        assert get_component.call_count == 1
+
+    def test_views(self):
+
+        state = ((RangeSubsetState(2, 4, self.x) | RangeSubsetState(6, 8, self.x)) &
+                 ~InequalitySubsetState(self.c, 0, operator.eq))
+
+        evaluator = SubsetEvaluator(state)
+
+        for view in [None, slice(2, 15), (slice(None, None, -3), 2),
+                     (slice(None), slice(1, 3)), (3, slice(None)),
+                     np.arange(10), self.data['x'] > 5]:
+            for chunk_size in (1, 8, 1000):
+                assert_equal(evaluator.evaluate(self.data, view=view, chunk_size=chunk_size),
+                             naive_mask(state, self.data, view=view))
+
+    def test_opaque_states(self):
+
+        mask = np.random.random((20, 5)) > 0.5
+        state = MaskSubsetState(mask, self.data.pixel_component_ids) | RangeSubsetState(2, 4, self.x)
+
+        evaluator = SubsetEvaluator(state)
+        assert_equal(evaluator.evaluate(self.data, chunk_size=10),
+                     mask | ((self.data['x'] >= 2) & (self.data['x'] <= 4)))
+
+    def test_overridden_to_mask(self):
+
+        # Composite states that override to_mask should be evaluated by
+        # calling to_mask rather than being evaluated as composites.
+
+        def constant_mask(data, view, value):
+            mask = np.zeros(data.shape, dtype=bool) | value
+            return mask if view is None else mask[view]
+
+        class CustomOrState(OrState):
+            def to_mask(self, data, view=None):
+                return constant_mask(data, view, False)
+
+        class CustomXorState(XorState):
+            def to_mask(self, data, view=None):
+                return constant_mask(data, view, True)
+
+        class CustomInvertState(InvertState):
+            def to_mask(self, data, view=None):
+                return constant_mask(data, view, False)
+
+        x_range = RangeSubsetState(2, 4, self.x)
+        y_range = RangeSubsetState(1, 6, self.y)
+
+        for cls, expected in [(CustomOrState, False), (CustomXorState, True)]:
+            state = cls(x_range, y_range) & RangeSubsetState(0, 10, self.x)
+            assert_equal(SubsetEvaluator(state).evaluate(self.data),
+                         np.ones((20, 5), dtype=bool) & expected)
+
+        state = CustomInvertState(x_range) | RangeSubsetState(3, 5, self.x)
+        assert_equal(SubsetEvaluator(state).evaluate(self.data),
+                     (self.data['x'] >= 3) & (self.data['x'] <= 5))
+
+        # States that don't override to_mask are evaluated as composites
+        state = InvertState(x_range)
+        assert_equal(SubsetEvaluator(state).evaluate(self.data), ~x_range.to_mask(self.data))
+
+    def test_to_mask(self):
+        state = RangeSubsetState(2, 4, self.x) | RangeSubsetState(3, 6, self.x)
+        assert_equal(state.to_mask(self.data),
+                     (self.data['x'] >= 2) & (self.data['x'] <= 6))
+
+    def test_categorical(self):
+        data = Data(c=['a', 'b', 'c', 'b', 'a'])
+        state = (InequalitySubsetState(data.id['c'], 'a', operator.eq) |
+                 InequalitySubsetState(data.id['c'], 'c', operator.eq))
+        assert_equal(SubsetEvaluator(state).evaluate(data, chunk_size=2),
+                     [1, 0, 1, 0, 1])
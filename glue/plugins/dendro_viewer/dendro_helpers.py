@@ -1,30 +1,274 @@
+from __future__ import absolute_import, division, print_function
+
 import numpy as np
 
+__all__ = ['DendrogramIndex', 'dendrogram_layout']
 
-def dendrogram_layout(parent, height, key):
 
-    children = _dendro_children(parent)
-    pos = np.zeros(key.size) - 1
-    cur_pos = 0
+def _list_ranks(successor):
+    """
+    Given the successor of each element in one or more linked lists (with -1
+    indicating the end of a list), return the number of steps needed to get
+    from each element to the end of its list.
+
+    This uses pointer jumping, so only requires a number of vectorized
+    operations that scales with the logarithm of the length of the lists.
+    """
+
+    successor = np.array(successor, dtype=np.intp)
+    distance = (successor >= 0).astype(np.intp)
+
+    # The loop would not terminate for cyclic lists, so we limit the number
+    # of iterations to the maximum number needed for valid lists.
+    max_iter = int(np.ceil(np.log2(max(successor.size, 2)))) + 1
+
+    for _ in range(max_iter):
+        active = np.nonzero(successor >= 0)[0]
+        if active.size == 0:
+            break
+        following = successor[active]
+        distance[active] += distance[following]
+        successor[active] = successor[following]
+
+    return distance
+
+
+class DendrogramIndex(object):
+    """
+    A precomputed index for the tree structure of a dendrogram.
+
+    The children of each structure are stored in compressed sparse row
+    format, and each structure is assigned an interval in the pre-order
+    traversal of the tree which contains all its substructures, so that
+    laying out the tree and finding substructures don't require walking the
+    tree in Python.
+
+    Parameters
+    ----------
+    parent : `~numpy.ndarray`
+        The index of the parent of each structure, with negative values
+        indicating structures without a parent.
+    key : `~numpy.ndarray`, optional
+        Values used to sort sibling structures. Defaults to the index of the
+        structures.
+
+    Attributes
+    ----------
+    children : `~numpy.ndarray`
+        The children of all structures - the children of structure ``i`` are
+        ``children[offsets[i]:offsets[i + 1]]``, sorted by key.
+    offsets : `~numpy.ndarray`
+        The offsets of the children of each structure in ``children``.
+    roots : `~numpy.ndarray`
+        The structures without parents, sorted by key.
+    preorder : `~numpy.ndarray`
+        All structures, in the order in which they are visited by a
+        depth-first traversal of the tree that visits siblings in order of
+        key.
+    start : `~numpy.ndarray`
+        The position of each structure in ``preorder``.
+    size : `~numpy.ndarray`
+        The number of structures in the subtree of each structure, including
+        the structure itself. The subtree of structure ``i`` is
+        ``preorder[start[i]:start[i] + size[i]]``.
+    depth : `~numpy.ndarray`
+        The number of ancestors of each structure.
+    """
+
+    def __init__(self, parent, key=None):
+
+        parent = np.asarray(parent).astype(np.intp).ravel()
+        n = parent.size
+
+        if key is None:
+            key = np.arange(n)
+        else:
+            key = np.asarray(key).ravel()
+
+        self.parent = parent
+
+        # Children in CSR format. np.lexsort is stable so ties in the key are
+        # broken by the index of the structures.
+        nonroot = np.nonzero(parent >= 0)[0]
+        self.children = nonroot[np.lexsort((key[nonroot], parent[nonroot]))]
+        self.n_children = np.bincount(parent[nonroot], minlength=n)
+        self.offsets = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(self.n_children, out=self.offsets[1:])
+
+        roots = np.nonzero(parent < 0)[0]
+        self.roots = roots[np.argsort(key[roots], kind='mergesort')]
+
+        # To find the pre-order traversal we construct the Euler tour of the
+        # tree as a linked list, in which element i is the entry into
+        # structure i and element n + i is the exit from structure i.
+
+        has_children = self.n_children > 0
+
+        first_child = np.repeat(-1, n)
+        first_child[has_children] = self.children[self.offsets[:-1][has_children]]
+
+        next_sibling = np.repeat(-1, n)
+        same_parent = parent[self.children[1:]] == parent[self.children[:-1]]
+        next_sibling[self.children[:-1][same_parent]] = self.children[1:][same_parent]
+        next_sibling[self.roots[:-1]] = self.roots[1:]
+
+        successor = np.empty(2 * n, dtype=np.intp)
+        successor[:n] = np.where(has_children, first_child, np.arange(n) + n)
+        successor[n:] = np.where(next_sibling >= 0, next_sibling,
+                                 np.where(parent >= 0, parent + n, -1))
+
+        distance = _list_ranks(successor)
+
+        # Elements further from the end of the tour are visited first
+        tour = np.argsort(-distance, kind='mergesort')
+
+        self.preorder = tour[tour < n]
+        self.start = np.empty(n, dtype=np.intp)
+        self.start[self.preorder] = np.arange(n)
+        self.size = (distance[:n] - distance[n:] + 1) // 2
+
+        # The depth of a structure is the number of structures that have been
+        # entered but not exited by the time it is entered.
+        steps = np.where(tour < n, 1, -1)
+        level = np.cumsum(steps) - 1
+        self.depth = np.empty(n, dtype=np.intp)
+        self.depth[tour[tour < n]] = level[tour < n]
+
+        self._levels = None
+
+    @property
+    def leaves(self):
+        """
+        The structures without children, in pre-order.
+        """
+        return self.preorder[self.n_children[self.preorder] == 0]
+
+    def substructures(self, idx):
+        """
+        Return an array of all substructure indices of one or more structures.
+        The input is included in the output.
+
+        Parameters
+        ----------
+        idx : int or `~numpy.ndarray`
+            The structure(s) to extract.
+
+        Returns
+        -------
+        array
+        """
 
-    for struct in _iter_sorted(children, parent, key):
-        if children[struct].size == 0:  # leaf
-            pos[struct] = cur_pos
-            cur_pos += 1
-        else:  # branch
-            assert pos[children[struct]].mean() >= 0
-            pos[struct] = pos[children[struct]].mean()
+        if np.isscalar(idx):
+            return self.preorder[self.start[idx]:self.start[idx] + self.size[idx]].copy()
 
-    layout = np.zeros((2, 3 * height.size))
-    layout[0, ::3] = pos
-    layout[0, 1::3] = pos
-    layout[0, 2::3] = np.where(parent >= 0, pos[parent], np.nan)
+        idx = np.asarray(idx, dtype=np.intp)
 
-    layout[1, ::3] = height
-    layout[1, 1::3] = np.where(parent >= 0, height[parent], height.min())
-    layout[1, 2::3] = layout[1, 1::3]
+        # Mark the intervals of the pre-order traversal covered by the
+        # structures, which may overlap
+        coverage = np.zeros(self.preorder.size + 1, dtype=np.intp)
+        np.add.at(coverage, self.start[idx], 1)
+        np.add.at(coverage, self.start[idx] + self.size[idx], -1)
 
-    return layout
+        return self.preorder[np.cumsum(coverage[:-1]) > 0]
+
+    def _level_structure(self):
+
+        # Branches sorted by depth, and the children of these branches in the
+        # same order, so that the children of the branches at any given depth
+        # are contiguous.
+
+        if self._levels is None:
+
+            branches = np.nonzero(self.n_children > 0)[0]
+            branches = branches[np.argsort(self.depth[branches], kind='mergesort')]
+
+            lengths = self.n_children[branches]
+            group_start = np.zeros(branches.size + 1, dtype=np.intp)
+            np.cumsum(lengths, out=group_start[1:])
+
+            children = np.repeat(self.offsets[branches] - group_start[:-1], lengths)
+            children = self.children[children + np.arange(group_start[-1])]
+
+            max_depth = self.depth.max() if self.depth.size > 0 else 0
+            bounds = np.searchsorted(self.depth[branches], np.arange(max_depth + 2))
+
+            self._levels = branches, children, group_start, bounds
+
+        return self._levels
+
+    def positions(self):
+        """
+        Return the horizontal position of each structure in a dendrogram plot.
+
+        Leaves are placed one unit apart in the order in which they are
+        visited, and branches are placed at the mean position of their
+        children.
+        """
+
+        pos = np.zeros(self.parent.size)
+
+        leaves = self.leaves
+        pos[leaves] = np.arange(leaves.size)
+
+        # The position of each branch depends on those of its children, so we
+        # compute these one level at a time, starting from the deepest level.
+
+        branches, children, group_start, bounds = self._level_structure()
+
+        for level in range(bounds.size - 2, -1, -1):
+            b_start, b_end = bounds[level], bounds[level + 1]
+            if b_start == b_end:
+                continue
+            c_start, c_end = group_start[b_start], group_start[b_end]
+            sums = np.add.reduceat(pos[children[c_start:c_end]],
+                                   group_start[b_start:b_end] - c_start)
+            level_branches = branches[b_start:b_end]
+            pos[level_branches] = sums / self.n_children[level_branches]
+
+        return pos
+
+    def layout(self, height):
+        """
+        Return the vertices of the lines used to draw the dendrogram.
+
+        Parameters
+        ----------
+        height : `~numpy.ndarray`
+            The height of each structure
+
+        Returns
+        -------
+        layout : `~numpy.ndarray`
+            A (2, 3 * n) array - the x and y vertices for structure ``i`` are
+            ``layout[:, 3 * i:3 * i + 3]``
+        """
+
+        parent = self.parent
+        height = np.asarray(height).ravel()
+        pos = self.positions()
+
+        has_parent = parent >= 0
+        parent_index = np.where(has_parent, parent, 0)
+
+        layout = np.zeros((2, 3 * height.size))
+        layout[0, ::3] = pos
+        layout[0, 1::3] = pos
+        layout[0, 2::3] = np.where(has_parent, pos[parent_index], np.nan)
+
+        layout[1, ::3] = height
+        base = height.min() if height.size > 0 else 0
+        layout[1, 1::3] = np.where(has_parent, height[parent_index], base)
+        layout[1, 2::3] = layout[1, 1::3]
+
+        return layout
+
+
+def dendrogram_layout(parent, height, key):
+    """
+    Return the vertices of the lines used to draw a dendrogram - see
+    :meth:`DendrogramIndex.layout`.
+    """
+    return DendrogramIndex(parent, key).layout(height)
 
 
 def _substructures(parent, idx):
@@ -41,62 +285,4 @@ def _substructures(parent, idx):
     -------
     array
     """
-    children = _dendro_children(parent)
-    result = []
-    if np.isscalar(idx):
-        todo = [idx]
-    else:
-        todo = idx.tolist()
-
-    while todo:
-        result.append(todo.pop())
-        todo.extend(children[result[-1]])
-    return np.array(result, dtype=np.int)
-
-
-def _dendro_children(parent):
-    children = [[] for _ in range(parent.size)]
-    for i, p in enumerate(parent):
-        if p < 0:
-            continue
-        children[p].append(i)
-    return list(map(np.asarray, children))
-
-
-def _iter_sorted(children, parent, key):
-    # must yield both children before parent
-    yielded = set()
-    trunks = np.array([i for i, p in enumerate(parent) if p < 0], dtype=np.int)
-    for idx in np.argsort(key[trunks]):
-        idx = trunks[idx]
-        for item in _postfix_iter(idx, children, parent, yielded, key):
-            yield item
-
-
-def _postfix_iter(node, children, parent, yielded, key):
-    """
-    Iterate over a node and its children, in the following fashion:
-
-    parents are yielded after children
-    children are yielded in order of ascending key value
-    """
-
-    todo = [node]
-    expanded = set()
-
-    while todo:
-        node = todo[-1]
-
-        if node in yielded:
-            todo.pop()
-            continue
-
-        if children[node].size == 0 or node in expanded:
-            yield todo.pop()
-            yielded.add(node)
-            continue
-
-        c = children[node]
-        ind = np.argsort(key[c])[::-1]
-        todo.extend(c[ind])
-        expanded.add(node)
+    return DendrogramIndex(parent).substructures(idx)
@@ -117,8 +117,12 @@ class DendrogramViewer(MatplotlibDataViewer):
             if np.isfinite(delt).any():
                 select = np.nanargmin(delt)
                 if self.state.select_substruct:
-                    parent = self.state.reference_data[self.state.parent_att]
-                    select = _substructures(parent, select)
+                    index = self.state._layout.index
+                    if index is None:
+                        parent = self.state.reference_data[self.state.parent_att]
+                        select = _substructures(parent, select)
+                    else:
+                        select = index.substructures(select)
                 select = np.asarray(select, dtype=np.int)
             else:
                 select = np.array([], dtype=np.int)
@@ -9,16 +9,17 @@ from glue.viewers.matplotlib.state import (MatplotlibDataViewerState,
                                            DeferredDrawSelectionCallbackProperty as DDSCProperty)
 from glue.core.data_combo_helper import ComponentIDComboHelper
 
-from .dendro_helpers import dendrogram_layout
+from .dendro_helpers import DendrogramIndex
 
 __all__ = ['DendrogramViewerState', 'DendrogramLayerState']
 
 
 class Layout(object):
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, index=None):
         self.x = x
         self.y = y
+        self.index = index
 
     @property
     def xy(self):
@@ -73,8 +74,9 @@ class DendrogramViewerState(MatplotlibDataViewerState):
             height = self.reference_data[self.height_att].ravel()
             parent = self.reference_data[self.parent_att].astype(int).ravel()
             order = self.reference_data[self.order_att].ravel()
-            x, y = dendrogram_layout(parent, height, order)
-            self._layout = Layout(x, y)
+            index = DendrogramIndex(parent, order)
+            x, y = index.layout(height)
+            self._layout = Layout(x, y, index=index)
 
     def _update_priority(self, name):
         if name == 'layers':
@@ -0,0 +1,134 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+
+from ..dendro_helpers import DendrogramIndex, dendrogram_layout, _substructures
+
+
+def random_tree(n, n_roots, seed=12345):
+    # Each structure has a parent with a smaller index, so the result is a
+    # valid forest with n_roots trees.
+    rng = np.random.RandomState(seed)
+    parent = np.repeat(-1, n)
+    for i in range(n_roots, n):
+        parent[i] = rng.randint(0, i)
+    order = rng.permutation(n)
+    inverse = np.argsort(order)
+    parent = np.where(parent[order] >= 0, inverse[parent[order]], -1)
+    return parent, rng.permutation(n).astype(float)
+
+
+def reference_positions(parent, key):
+    # Simple recursive implementation
+
+    children = [[] for _ in range(parent.size)]
+    for i, p in enumerate(parent):
+        if p >= 0:
+            children[p].append(i)
+
+    pos = np.zeros(parent.size)
+    next_leaf = [0]
+
+    def visit(node):
+        c = sorted(children[node], key=lambda i: key[i])
+        if len(c) == 0:
+            pos[node] = next_leaf[0]
+            next_leaf[0] += 1
+        else:
+            for child in c:
+                visit(child)
+            pos[node] = pos[c].mean()
+
+    for root in sorted(np.nonzero(parent < 0)[0], key=lambda i: key[i]):
+        visit(root)
+
+    return pos
+
+
+def reference_substructures(parent, idx):
+    result = set([idx])
+    for i in range(parent.size):
+        j = i
+        while j >= 0:
+            if j == idx:
+                result.add(i)
+                break
+            j = parent[j]
+    return result
+
+
+def test_index_simple():
+
+    #        0       5
+    #       / \     |
+    #      1   2    6
+    #     / \
+    #    3   4
+
+    parent = np.array([-1, 0, 0, 1, 1, -1, 5])
+
+    index = DendrogramIndex(parent)
+
+    assert_array_equal(index.children, [1, 2, 3, 4, 6])
+    assert_array_equal(index.offsets, [0, 2, 4, 4, 4, 4, 5, 5])
+    assert_array_equal(index.roots, [0, 5])
+    assert_array_equal(index.preorder, [0, 1, 3, 4, 2, 5, 6])
+    assert_array_equal(index.size, [5, 3, 1, 1, 1, 2, 1])
+    assert_array_equal(index.depth, [0, 1, 1, 2, 2, 0, 1])
+    assert_array_equal(index.leaves, [3, 4, 2, 6])
+
+    assert_allclose(index.positions(), [1.25, 0.5, 2, 0, 1, 3, 3])
+
+    assert_array_equal(index.substructures(1), [1, 3, 4])
+    assert_array_equal(index.substructures(np.array([1, 3, 6])), [1, 3, 4, 6])
+
+    # Siblings should be sorted by key
+    index = DendrogramIndex(parent, key=np.array([0, 2, 1, 0, 0, 0, 0]))
+    assert_array_equal(index.preorder, [0, 2, 1, 3, 4, 5, 6])
+
+
+def test_layout():
+
+    parent = np.array([-1, 0, 0])
+    height = np.array([1., 2., 3.])
+
+    layout = dendrogram_layout(parent, height, height)
+
+    assert_allclose(layout[0], [0.5, 0.5, np.nan, 0, 0, 0.5, 1, 1, 0.5])
+    assert_allclose(layout[1], [1, 1, 1, 2, 1, 1, 3, 1, 1])
+
+
+def test_random_tree():
+
+    parent, key = random_tree(500, 7)
+
+    index = DendrogramIndex(parent, key)
+
+    assert_allclose(index.positions(), reference_positions(parent, key))
+
+    for idx in [0, 10, 499]:
+        assert set(index.substructures(idx)) == reference_substructures(parent, idx)
+        assert set(_substructures(parent, idx)) == reference_substructures(parent, idx)
+
+    expected = set()
+    for idx in [3, 4, 5]:
+        expected |= reference_substructures(parent, idx)
+    assert set(index.substructures(np.array([3, 4, 5]))) == expected
+
+
+def test_deep_tree():
+    # A chain of structures is the worst case for the tree walks
+    n = 3000
+    parent = np.arange(n) - 1
+    index = DendrogramIndex(parent)
+    assert_array_equal(index.preorder, np.arange(n))
+    assert_array_equal(index.depth, np.arange(n))
+    assert_array_equal(index.size, n - np.arange(n))
+    assert_allclose(index.positions(), 0)
+
+
+def test_empty():
+    index = DendrogramIndex(np.array([], dtype=int))
+    assert index.positions().size == 0
+    assert index.layout(np.array([])).shape == (2, 0)
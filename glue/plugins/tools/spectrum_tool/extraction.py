@@ -0,0 +1,147 @@
+"""
+Extraction of spectra from data cubes.
+
+Spectra are extracted by averaging the values inside a two-dimensional mask
+(defined in the plane of the image being shown) for every position along the
+spectral axis. Only the part of the cube inside the bounding box of the mask
+is read, and the spectra are cached so that going back to a previous ROI or
+slice does not require the data to be read again.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.core.subset import RoiSubsetState
+from glue.core.array_cache import ArrayCache
+
+__all__ = ['SPECTRUM_CACHE', 'roi_mask', 'subset_mask', 'extract_spectrum']
+
+SPECTRUM_CACHE = ArrayCache('SPECTRUM_CACHE_SIZE')
+
+
+def _image_axes(slc):
+    return tuple(sorted((slc.index('x'), slc.index('y'))))
+
+
+def _plane_view(slc):
+    # A view that extracts the plane of the image without reducing the
+    # dimensionality of the array
+    return tuple(slice(None) if s in ('x', 'y') else slice(s, s + 1) for s in slc)
+
+
+def _plane_shape(shape, slc):
+    return tuple(shape[axis] for axis in _image_axes(slc))
+
+
+def roi_mask(data, roi, slc):
+    """
+    Compute the mask of a ROI in the plane of the image.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset
+    roi : :class:`~glue.core.roi.Roi`
+        The ROI, defined in pixel coordinates along the x and y axes
+    slc : tuple
+        The slice being shown, which should include ``'x'`` and ``'y'`` for the
+        axes of the image and integer indices for the other axes.
+
+    Returns
+    -------
+    mask : `~numpy.ndarray`
+        A 2D boolean mask, with the axes in the same order as in the data.
+    """
+    xatt = data.get_pixel_component_id(slc.index('x'))
+    yatt = data.get_pixel_component_id(slc.index('y'))
+    subset_state = RoiSubsetState(xatt=xatt, yatt=yatt, roi=roi)
+    mask = subset_state.to_mask(data, view=_plane_view(slc))
+    return mask.reshape(_plane_shape(data.shape, slc))
+
+
+def subset_mask(subset, slc):
+    """
+    Compute the mask of a subset in the plane of the image.
+
+    Parameters
+    ----------
+    subset : :class:`~glue.core.subset.Subset`
+        The subset
+    slc : tuple
+        The slice being shown, which should include ``'x'`` and ``'y'`` for the
+        axes of the image and integer indices for the other axes.
+
+    Returns
+    -------
+    mask : `~numpy.ndarray`
+        A 2D boolean mask, with the axes in the same order as in the data.
+    """
+    mask = subset.to_mask(_plane_view(slc))
+    return mask.reshape(_plane_shape(subset.data.shape, slc))
+
+
+def extract_spectrum(data, attribute, mask, slc, zaxis):
+    """
+    Compute the mean of an attribute inside a mask for each position along an
+    axis.
+
+    NaN values are ignored, and the result is NaN for positions along the axis
+    where no finite values are inside the mask.
+
+    Parameters
+    ----------
+    data : :class:`~glue.core.data.Data`
+        The dataset
+    attribute : :class:`~glue.core.component_id.ComponentID`
+        The attribute to extract the spectrum for
+    mask : `~numpy.ndarray`
+        The 2D mask in the plane of the image, as returned by :func:`roi_mask`
+        or :func:`subset_mask`.
+    slc : tuple
+        The slice being shown, which should include ``'x'`` and ``'y'`` for the
+        axes of the image and integer indices for the other axes.
+    zaxis : int
+        The axis along which to extract the spectrum
+    """
+
+    image_axes = _image_axes(slc)
+
+    rows = np.nonzero(np.any(mask, axis=1))[0]
+    cols = np.nonzero(np.any(mask, axis=0))[0]
+
+    if len(rows) == 0:
+        return np.repeat(np.nan, data.shape[zaxis])
+
+    # Crop the mask to its bounding box
+    bbox = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+    mask = mask[bbox]
+
+    view = []
+    for idim, s in enumerate(slc):
+        if idim == zaxis:
+            view.append(slice(None))
+        elif idim in image_axes:
+            view.append(bbox[image_axes.index(idim)])
+        else:
+            view.append(s)
+    view = tuple(view)
+
+    key = ('spectrum', data, data._version, id(attribute), zaxis,
+           tuple((s.start, s.stop) if isinstance(s, slice) else s for s in view),
+           np.packbits(mask).tobytes())
+
+    spectrum = SPECTRUM_CACHE.get(key)
+
+    if spectrum is None:
+
+        # Read the slab containing the mask for all positions along zaxis, and
+        # move zaxis to be the first axis.
+        values = data[attribute, view]
+        values = np.moveaxis(values, sorted(image_axes + (zaxis,)).index(zaxis), 0)
+
+        spectrum = np.nanmean(values[:, mask], axis=1)
+
+        SPECTRUM_CACHE.set(key, spectrum)
+
+    return spectrum.copy()
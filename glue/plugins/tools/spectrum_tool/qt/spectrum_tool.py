@@ -10,7 +10,6 @@ import numpy as np
 from qtpy import QtCore, QtGui, QtWidgets, compat
 from qtpy.QtCore import Qt
 
-from glue.external.six.moves import range as xrange
 from glue.core.exceptions import IncompatibleAttribute
 from glue.core import Subset
 from glue.core.callback_property import add_callback, ignore_callback
@@ -25,9 +24,9 @@ from glue.app.qt.mdi_area import GlueMdiSubWindow
 from glue.viewers.matplotlib.qt.widget import MplWidget
 from glue.utils import nonpartial, Pointer
 from glue.utils.qt import Worker, messagebox_on_error
-from glue.core.subset import RoiSubsetState
 from glue.core.qt import roi as qt_roi
 from .profile_viewer import ProfileViewer
+from ..extraction import roi_mask, subset_mask, extract_spectrum
 from glue.viewers.image.state import AggregateSlice
 from glue.core.aggregate import mom1, mom2
 
@@ -47,44 +46,10 @@ class Extractor(object):
     @staticmethod
     def spectrum(data, attribute, roi, slc, zaxis):
 
-        # Find the integer index of the x and y axes, which are the axes for
-        # which the image is shown (the ROI is drawn along these attributes)
-        xaxis = slc.index('x')
-        yaxis = slc.index('y')
-
-        # Get the actual component IDs corresponding to these axes
-        xatt = data.get_pixel_component_id(xaxis)
-        yatt = data.get_pixel_component_id(yaxis)
-
-        # Set up a view that does not reduce the dimensionality of the array but
-        # extracts 1-element slices along dimensions that are not relevant.
-        view = []
-        for idim, dim in enumerate(slc):
-            if idim in (xaxis, yaxis, zaxis):
-                view.append(slice(None))
-            else:
-                view.append(slice(dim, dim + 1))
-        view = tuple(view)
-
-        # We now delegate to RoiSubsetState to compute the mask based on the ROI
-        subset_state = RoiSubsetState(xatt=xatt, yatt=yatt, roi=roi)
-        mask = subset_state.to_mask(data, view=view)
-
-        # We now extract the values that fall inside the ROI. Unfortunately,
-        # this returns a flat 1-d array, so we need to then reshape it to get
-        # an array with shape (n_spec, n_pix), where n_pix is the number of
-        # pixels inside the ROI
-
-        values = data[attribute, view]
-
-        if zaxis != 0:
-            values = values.swapaxes(zaxis, 0)
-            mask = mask.swapaxes(zaxis, 0)
-
-        values = values[mask].reshape(data.shape[zaxis], -1)
-
-        # We then average along the spatial dimension
-        spectrum = np.nanmean(values, axis=1)
+        # Compute the mask of the ROI in the plane of the image, then average
+        # the values inside the mask for each position along zaxis.
+        mask = roi_mask(data, roi, slc)
+        spectrum = extract_spectrum(data, attribute, mask, slc, zaxis)
 
         # Get the world coordinates of the spectral axis
         x = Extractor.abcissa(data, zaxis)
@@ -123,29 +88,8 @@ class Extractor(object):
         """
         data = subset.data
         x = Extractor.abcissa(data, zaxis)
-
-        view = [slice(s, s + 1)
-                if s not in ['x', 'y'] else slice(None)
-                for s in slc]
-
-        mask = np.squeeze(subset.to_mask(view))
-        if slc.index('x') < slc.index('y'):
-            mask = mask.T
-
-        w = np.where(mask)
-        view[slc.index('x')] = w[1]
-        view[slc.index('y')] = w[0]
-
-        result = np.empty(x.size)
-
-        # treat each channel separately, to reduce memory storage
-        for i in xrange(data.shape[zaxis]):
-            view[zaxis] = i
-            val = data[attribute, view]
-            result[i] = np.nansum(val) / np.isfinite(val).sum()
-
-        y = result
-
+        mask = subset_mask(subset, slc)
+        y = extract_spectrum(data, attribute, mask, slc, zaxis)
         return x, y
 
 
@@ -0,0 +1,113 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from glue.core import Data, DataCollection
+from glue.core.roi import RectangularROI, PolygonalROI
+
+from ..extraction import SPECTRUM_CACHE, roi_mask, subset_mask, extract_spectrum
+
+
+def naive_spectrum(values, mask, slc, zaxis):
+    # Reference implementation that loops over the channels
+    result = []
+    for i in range(values.shape[zaxis]):
+        view = [s if isinstance(s, int) else slice(None) for s in slc]
+        view[zaxis] = i
+        selected = values[tuple(view)][mask]
+        selected = selected[np.isfinite(selected)]
+        result.append(selected.mean() if selected.size > 0 else np.nan)
+    return np.array(result)
+
+
+@pytest.mark.parametrize(('slc', 'zaxis'), [((0, 'y', 'x'), 0),
+                                            (('x', 1, 'y'), 1),
+                                            (('y', 'x', 2), 2),
+                                            ((1, 'x', 3, 'y'), 2),
+                                            ((2, 'y', 'x', 0), 0)])
+def test_extract_spectrum(slc, zaxis):
+
+    np.random.seed(12345)
+
+    shape = (5, 6, 7) if len(slc) == 3 else (3, 6, 5, 7)
+    values = np.random.random(shape)
+    values[values > 0.9] = np.nan
+
+    data = Data(x=values)
+
+    image_axes = sorted((slc.index('x'), slc.index('y')))
+    mask = np.zeros((shape[image_axes[0]], shape[image_axes[1]]), dtype=bool)
+    mask[1:4, 2:5] = True
+    mask[2, 3] = False
+    mask[4, 0] = True
+
+    assert_allclose(extract_spectrum(data, data.id['x'], mask, slc, zaxis),
+                    naive_spectrum(values, mask, slc, zaxis))
+
+
+def test_empty_mask():
+    data = Data(x=np.ones((4, 3, 2)))
+    mask = np.zeros((3, 2), dtype=bool)
+    assert_equal(extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0),
+                 [np.nan] * 4)
+
+
+def test_masks():
+
+    data = Data(x=np.arange(60.).reshape((3, 4, 5)))
+
+    roi = PolygonalROI(vx=[0.5, 3.5, 3.5], vy=[-0.5, -0.5, 2.5])
+    expected = [[0, 1, 1, 1, 0],
+                [0, 0, 1, 1, 0],
+                [0, 0, 0, 1, 0],
+                [0, 0, 0, 0, 0]]
+
+    assert_equal(roi_mask(data, roi, (1, 'y', 'x')), expected)
+
+    subset = data.new_subset()
+    subset.subset_state = data.id['x'] > 30
+    assert_equal(subset_mask(subset, (1, 'y', 'x')), np.arange(20, 40).reshape((4, 5)) > 30)
+
+
+def test_cache():
+
+    SPECTRUM_CACHE.clear()
+    SPECTRUM_CACHE.reset_stats()
+
+    data = Data(x=np.arange(60.).reshape((3, 4, 5)))
+
+    roi = RectangularROI(xmin=0.5, xmax=2.5, ymin=0.5, ymax=1.5)
+    mask = roi_mask(data, roi, (0, 'y', 'x')).copy()
+
+    expected = data['x'][:, 1, 1:3].mean(axis=1)
+
+    assert_allclose(extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0), expected)
+    assert SPECTRUM_CACHE.stats['misses'] == 1
+
+    spectrum = extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0)
+    assert_allclose(spectrum, expected)
+    assert SPECTRUM_CACHE.stats['hits'] == 1
+
+    # Modifying the result should not modify the cached value
+    spectrum[:] = 0
+    assert_allclose(extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0), expected)
+
+    # A different mask or changes to the data should cause the spectrum to be
+    # extracted again.
+
+    mask[2, 2] = True
+    extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0)
+    assert SPECTRUM_CACHE.stats['misses'] == 2
+
+    data.update_components({data.id['x']: -data['x']})
+    assert_allclose(extract_spectrum(data, data.id['x'], mask, (0, 'y', 'x'), 0),
+                    (data['x'][:, 1, 1:3].sum(axis=1) + data['x'][:, 2, 2]) / 3.)
+    assert SPECTRUM_CACHE.stats['misses'] == 3
+
+    # Removing the data from a data collection discards its spectra
+    dc = DataCollection([data])
+    assert len(SPECTRUM_CACHE) > 0
+    dc.remove(data)
+    assert len(SPECTRUM_CACHE) == 0
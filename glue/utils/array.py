@@ -9,7 +9,8 @@ from glue.external.six import string_types
 
 
 __all__ = ['unique', 'shape_to_string', 'view_shape', 'stack_view',
-           'coerce_numeric', 'check_sorted', 'broadcast_to', 'unbroadcast']
+           'coerce_numeric', 'check_sorted', 'broadcast_to', 'unbroadcast',
+           'iterate_chunks', 'view_key']
 
 
 def unbroadcast(array):
@@ -82,6 +83,82 @@ def view_shape(shape, view):
     return xy[0][view].shape
 
 
+def view_key(view):
+    """
+    Convert a view to a hashable key, for example to use as part of the key
+    of a cache.
+
+    Views made of `None`, `Ellipsis`, integers, and slices (or tuples and
+    lists of these) are supported. A `TypeError` is raised for other views
+    (e.g. boolean or integer arrays), which are not worth comparing.
+    """
+    if view is None or view is Ellipsis:
+        return view
+    elif isinstance(view, slice):
+        return ('slice', view.start, view.stop, view.step)
+    elif isinstance(view, (tuple, list)):
+        return (type(view).__name__,) + tuple(view_key(v) for v in view)
+    elif isinstance(view, (int, np.integer)):
+        return int(view)
+    else:
+        raise TypeError("Cannot use view of type {0} as a key".format(type(view).__name__))
+
+
+def iterate_chunks(shape, view=None, chunk_size=2 ** 22):
+    """
+    Split a view of an array into chunks along the first dimension.
+
+    This yields tuples of ``(chunk_view, out_view)`` where ``chunk_view`` can
+    be used to index the original array, and ``out_view`` gives the position
+    of the chunk in an array with the shape of the view. If the view cannot be
+    split (for example if it includes integer or boolean arrays, or if the
+    first dimension is indexed by an integer), a single chunk is returned,
+    with ``chunk_view`` set to ``view`` and ``out_view`` set to `Ellipsis`.
+
+    Parameters
+    ----------
+    shape : tuple
+        The shape of the array
+    view : slice or tuple, optional
+        A valid index into a Numpy array, or `None`
+    chunk_size : int, optional
+        The approximate number of elements in each chunk
+    """
+
+    if view is None:
+        items = (slice(None),)
+    elif isinstance(view, tuple):
+        items = view
+    else:
+        items = (view,)
+
+    basic = all(isinstance(item, (slice, int, np.integer)) for item in items)
+
+    if len(shape) == 0 or not basic or not isinstance(items[0], slice) or len(items) > len(shape):
+        yield view, Ellipsis
+        return
+
+    start, stop, step = items[0].indices(shape[0])
+    n_rows = len(range(start, stop, step))
+
+    out_shape = view_shape(shape, items)
+    row_size = int(np.prod(out_shape[1:]))
+
+    n_chunk = max(1, chunk_size // max(row_size, 1))
+
+    if n_rows <= n_chunk:
+        yield view, Ellipsis
+        return
+
+    for i in range(0, n_rows, n_chunk):
+        j = min(i + n_chunk, n_rows)
+        chunk_stop = start + j * step
+        if chunk_stop < 0:
+            chunk_stop = None
+        chunk_view = (slice(start + i * step, chunk_stop, step),) + tuple(items[1:])
+        yield chunk_view, slice(i, j)
+
+
 def stack_view(shape, *views):
     shp = tuple(slice(0, s, 1) for s in shape)
     result = np.broadcast_arrays(*np.ogrid[shp])
@@ -9,6 +9,8 @@ __all__ = ['points_inside_poly', 'polygon_line_intersections']
 
 def points_inside_poly(x, y, vx, vy):
 
+    from matplotlib.path import Path
+
     original_shape = x.shape
 
     x = unbroadcast(x)
@@ -17,28 +19,22 @@ def points_inside_poly(x, y, vx, vy):
 
     reduced_shape = x.shape
 
-    x = x.flat
-    y = y.flat
-
-    from matplotlib.path import Path
-    p = Path(np.column_stack((vx, vy)))
+    x = x.ravel()
+    y = y.ravel()
 
-    keep = ((x >= np.min(vx)) &
-            (x <= np.max(vx)) &
-            (y >= np.min(vy)) &
-            (y <= np.max(vy)))
+    # Only test the points inside the bounding box of the polygon - this also
+    # excludes points with non-finite coordinates.
+    keep = x >= np.min(vx)
+    keep &= x <= np.max(vx)
+    keep &= y >= np.min(vy)
+    keep &= y <= np.max(vy)
+    keep = np.flatnonzero(keep)
 
     inside = np.zeros(len(x), bool)
 
-    x = x[keep]
-    y = y[keep]
-
-    coords = np.column_stack((x, y))
-
-    inside[keep] = p.contains_points(coords).astype(bool)
-
-    good = np.isfinite(x) & np.isfinite(y)
-    inside[keep][~good] = False
+    if len(keep) > 0:
+        p = Path(np.column_stack((vx, vy)))
+        inside[keep] = p.contains_points(np.column_stack((x[keep], y[keep])))
 
     inside = inside.reshape(reduced_shape)
     inside = broadcast_to(inside, original_shape)
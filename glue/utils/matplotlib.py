@@ -11,6 +11,7 @@ import numpy as np
 
 from glue.external.axescache import AxesCache
 from glue.utils.misc import DeferredMethod
+from glue.utils.quantiles import QuantileSketch
 
 
 __all__ = ['renderless_figure', 'all_artists', 'new_artists', 'remove_artists',
@@ -100,16 +101,10 @@ def view_cascade(data, view):
     return tuple(v2), view
 
 
-def _scoreatpercentile(values, percentile, limit=None):
-    # Avoid using the scipy version since it is available in Numpy
-    if limit is not None:
-        values = values[(values >= limit[0]) & (values <= limit[1])]
-    return np.percentile(values, percentile)
-
-
 def fast_limits(data, plo, phi):
     """
-    Quickly estimate percentiles in an array, using a downsampled version
+    Quickly estimate percentiles in an array, using a
+    :class:`~glue.utils.quantiles.QuantileSketch`
 
     Parameters
     ----------
@@ -124,15 +119,12 @@ def fast_limits(data, plo, phi):
         The percentile values
     """
 
-    shp = data.shape
-    view = tuple([slice(None, None, np.intp(max(s / 50, 1))) for s in shp])
-    values = np.asarray(data)[view]
-    if ~np.isfinite(values).any():
+    sketch = QuantileSketch.from_array(data)
+
+    if sketch.count == 0:
         return (0.0, 1.0)
 
-    limits = (-np.inf, np.inf)
-    lo = _scoreatpercentile(values.flat, plo, limit=limits)
-    hi = _scoreatpercentile(values.flat, phi, limit=limits)
+    lo, hi = sketch.percentile([plo, phi])
     return lo, hi
 
 
@@ -0,0 +1,134 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.utils.array import iterate_chunks
+
+__all__ = ['QuantileSketch']
+
+
+class QuantileSketch(object):
+    """
+    A deterministic summary of the distribution of a set of values, used to
+    estimate percentiles without keeping or sorting all the values.
+
+    This is a t-digest: the values are summarized by a list of centroids
+    (means and weights), with small centroids near the extremes of the
+    distribution and larger ones in the middle, so that percentiles close to
+    0 and 100 are the most accurate. Values are added in chunks with
+    `update`, and the result only depends on the values and the order of the
+    chunks. Until more than ``buffer_size`` values have been added, all
+    values are kept, and percentiles are exact (and equal to those returned by
+    :func:`numpy.percentile`). The minimum and maximum are always exact.
+
+    Non-finite values are ignored.
+
+    Parameters
+    ----------
+    compression : int, optional
+        The compression parameter of the t-digest - the number of centroids
+        is of the order of this value.
+    buffer_size : int, optional
+        The number of values up to which all values are kept.
+    """
+
+    def __init__(self, compression=1000, buffer_size=10000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+
+    @classmethod
+    def from_array(cls, array, chunk_size=2 ** 22, **kwargs):
+        """
+        Create a sketch from the values of an array, read in chunks of
+        approximately ``chunk_size`` elements.
+        """
+        array = np.asarray(array)
+        sketch = cls(**kwargs)
+        for chunk_view, _ in iterate_chunks(array.shape, chunk_size=chunk_size):
+            sketch.update(array[chunk_view])
+        return sketch
+
+    @property
+    def nbytes(self):
+        return self.means.nbytes + self.weights.nbytes
+
+    def update(self, values):
+        """
+        Add values to the sketch.
+        """
+
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+
+        if values.size == 0:
+            return
+
+        if self.count == 0:
+            self.min, self.max = values.min(), values.max()
+        else:
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+
+        self.count += values.size
+
+        # Sort the new values and insert the existing centroids, which is
+        # faster than sorting everything since there are few centroids
+        values = np.sort(values)
+        index = np.searchsorted(values, self.means)
+        means = np.insert(values, index, self.means)
+        weights = np.insert(np.ones(values.size), index, self.weights)
+
+        if self.count > self.buffer_size:
+            means, weights = self._compress(means, weights)
+
+        self.means, self.weights = means, weights
+
+    def _compress(self, means, weights):
+
+        # Merge neighboring centroids for which the middle of the centroid
+        # falls in the same unit interval of the k1 scale function of the
+        # t-digest, which is steepest near the extremes of the distribution.
+
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+
+        starts = np.flatnonzero(np.hstack([True, k[1:] != k[:-1]]))
+
+        new_weights = np.add.reduceat(weights, starts)
+        new_means = np.add.reduceat(means * weights, starts) / new_weights
+
+        return new_means, new_weights
+
+    def percentile(self, percentiles):
+        """
+        Return estimates of percentiles (between 0 and 100) of the values, or
+        NaN if there are no values.
+        """
+
+        percentiles = np.asarray(percentiles, dtype=float)
+
+        if self.count == 0:
+            return np.zeros(percentiles.shape) * np.nan
+
+        # Position (rank) of each centroid, defined as for numpy.percentile,
+        # where the n values have ranks 0 to n - 1
+        centers = np.cumsum(self.weights) - (self.weights + 1) / 2
+        means = self.means
+
+        # Make sure the extreme values are exact
+        if centers[0] > 0:
+            centers = np.hstack([0, centers])
+            means = np.hstack([self.min, means])
+        if centers[-1] < self.count - 1:
+            centers = np.hstack([centers, self.count - 1])
+            means = np.hstack([means, self.max])
+
+        result = np.interp(percentiles / 100 * (self.count - 1), centers, means)
+
+        return np.clip(result, self.min, self.max)
@@ -6,7 +6,8 @@ import numpy as np
 from glue.external.six import string_types, PY2  # noqa
 
 from ..array import (view_shape, coerce_numeric, stack_view, unique, broadcast_to,
-                     shape_to_string, check_sorted, pretty_number, unbroadcast)
+                     shape_to_string, check_sorted, pretty_number, unbroadcast,
+                     iterate_chunks, view_key)
 
 
 @pytest.mark.parametrize(('before', 'ref_after', 'ref_indices'),
@@ -114,3 +115,39 @@ def test_unbroadcast():
     z = unbroadcast(y)
     assert z.shape == (1, 1, 3)
     np.testing.assert_allclose(z[0, 0], x)
+
+
+@pytest.mark.parametrize('view', [None, slice(1, 9), (slice(None, None, -3), 2),
+                                  (slice(None), slice(1, 3)), (2, slice(None)),
+                                  (np.array([1, 2]),), Ellipsis])
+def test_iterate_chunks(view):
+
+    x = np.arange(60).reshape((10, 6))
+    expected = x if view is None else x[view]
+
+    result = np.zeros_like(expected)
+    n_chunks = 0
+    for chunk_view, out_view in iterate_chunks(x.shape, view=view, chunk_size=10):
+        result[out_view] = x if chunk_view is None else x[chunk_view]
+        n_chunks += 1
+
+    np.testing.assert_equal(result, expected)
+
+    if view is None:
+        assert n_chunks == 10
+
+
+def test_view_key():
+    assert view_key(None) is None
+    assert view_key(slice(1, None)) == view_key(slice(1, None))
+    assert view_key(slice(1, None)) != view_key(slice(None, 1))
+    assert view_key((slice(None), 3, Ellipsis)) == view_key((slice(None), np.int64(3), Ellipsis))
+    assert view_key((1, 2)) != view_key([1, 2])
+    assert view_key((slice(None), None)) != view_key((slice(None), 1))
+    # Slices and tuples are distinguished
+    assert view_key(slice(1, 2, 3)) != view_key((1, 2, 3))
+    # Views that include arrays can't be used as keys
+    with pytest.raises(TypeError):
+        view_key(np.array([True, False]))
+    with pytest.raises(TypeError):
+        view_key((slice(None), np.array([1, 2])))
@@ -0,0 +1,59 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from ..quantiles import QuantileSketch
+
+PERCENTILES = [0, 0.25, 0.5, 1, 5, 25, 50, 75, 95, 99, 99.5, 99.75, 100]
+
+
+@pytest.mark.parametrize('n', [1, 2, 10, 10000])
+def test_exact(n):
+    np.random.seed(12345)
+    values = np.random.normal(0, 1, n)
+    sketch = QuantileSketch.from_array(values, chunk_size=7)
+    assert sketch.count == n
+    assert_allclose(sketch.percentile(PERCENTILES), np.percentile(values, PERCENTILES))
+
+
+@pytest.mark.parametrize('distribution', ['normal', 'uniform', 'lognormal'])
+def test_approximate(distribution):
+
+    np.random.seed(12345)
+    values = getattr(np.random, distribution)(size=(1000, 500))
+    sketch = QuantileSketch.from_array(values, chunk_size=50000)
+
+    assert sketch.count == values.size
+    assert len(sketch.means) < 2000
+
+    # Check the error in the rank of the percentiles
+    estimates = sketch.percentile(PERCENTILES)
+    ranks = np.searchsorted(np.sort(values.ravel()), estimates) / values.size * 100
+    assert_allclose(ranks, PERCENTILES, atol=0.01)
+
+    # The minimum and maximum should be exact
+    assert estimates[0] == values.min()
+    assert estimates[-1] == values.max()
+
+
+def test_deterministic():
+    np.random.seed(12345)
+    values = np.random.normal(0, 1, 100000)
+    sketch1 = QuantileSketch.from_array(values, chunk_size=30000)
+    sketch2 = QuantileSketch.from_array(values, chunk_size=30000)
+    assert_equal(sketch1.percentile(PERCENTILES), sketch2.percentile(PERCENTILES))
+
+
+def test_non_finite():
+    values = np.array([np.nan, 1, 3, np.inf, 2, -np.inf])
+    sketch = QuantileSketch.from_array(values)
+    assert sketch.count == 3
+    assert_allclose(sketch.percentile([0, 50, 100]), [1, 2, 3])
+
+
+def test_empty():
+    sketch = QuantileSketch.from_array(np.array([np.nan, np.nan]))
+    assert sketch.count == 0
+    assert np.all(np.isnan(sketch.percentile([5, 95])))
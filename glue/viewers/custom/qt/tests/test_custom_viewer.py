@@ -11,6 +11,7 @@ from numpy.testing import assert_array_equal
 from glue.core.tests.test_state import clone
 from glue.core.tests.util import simple_session
 from glue.core.subset import SubsetState
+from glue.core.masks import DenseMask
 from glue.core import Data
 from glue import custom_viewer
 
@@ -49,6 +50,7 @@ make_selector = MagicMock()
 make_selector.return_value = MagicMock(spec=SubsetState)
 make_selector().copy.return_value = MagicMock(spec=SubsetState)
 make_selector().copy().to_mask.return_value = np.array([False, True, True])
+make_selector().copy().to_compressed_mask.return_value = DenseMask(np.array([False, True, True]))
 
 
 @viewer.setup
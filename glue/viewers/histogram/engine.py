@@ -0,0 +1,176 @@
+# Histogram computation for the histogram viewer. Counts are computed by
+# reading the data in chunks and binning each chunk with np.bincount, and a
+# fine-grained base histogram is kept so that the number of bins can be
+# changed without reading the data again.
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.config import settings
+from glue.core.subset import Subset
+from glue.utils import iterate_chunks
+
+__all__ = ['HistogramEngine', 'histogram_edges', 'bin_counts', 'rebin']
+
+# The number of bins in the base histograms. This is divisible by all
+# integers up to 12 and by most of the small numbers of bins that are used in
+# practice, and the base histogram for each layer only takes ~400kB.
+BASE_BINS = 55440
+
+
+def _uniform_edges(lower, upper, n_bins):
+    # We compute the fractions i / n_bins first so that the edges of a
+    # histogram with n_bins bins are exactly equal to every k-th edge of a
+    # histogram with k * n_bins bins, which means that values on the edges
+    # fall in the same bins after rebinning.
+    edges = lower + (upper - lower) * (np.arange(n_bins + 1) / n_bins)
+    edges[-1] = upper
+    return edges
+
+
+def histogram_edges(lower, upper, n_bins, log=False):
+    """
+    Return the edges of ``n_bins`` bins between ``lower`` and ``upper``, which
+    are equally spaced in log space if ``log`` is `True`.
+    """
+    if log:
+        return 10 ** _uniform_edges(np.log10(lower), np.log10(upper), n_bins)
+    else:
+        return _uniform_edges(lower, upper, n_bins)
+
+
+def bin_counts(values, lower, upper, n_bins, log=False):
+    """
+    Count the number of values in each of ``n_bins`` equal-width bins between
+    ``lower`` and ``upper``.
+
+    The edges of the bins are given by `histogram_edges`, and as for
+    `numpy.histogram`, the last bin includes ``upper``. Values outside
+    the range and NaN values are ignored. If ``log`` is `True`, the bins are
+    equally spaced in log space.
+    """
+
+    values = np.asarray(values, dtype=float).ravel()
+
+    if log:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.log10(values)
+        lower, upper = np.log10(lower), np.log10(upper)
+
+    values = values[(values >= lower) & (values <= upper)]
+
+    if upper > lower:
+        index = ((values - lower) * (n_bins / (upper - lower))).astype(np.intp)
+        np.clip(index, 0, n_bins - 1, out=index)
+        # Correct for rounding errors for values close to the edges
+        edges = _uniform_edges(lower, upper, n_bins)
+        index[values < edges[index]] -= 1
+        index[(values >= edges[index + 1]) & (index != n_bins - 1)] += 1
+    else:
+        index = np.zeros(values.size, dtype=np.intp)
+
+    return np.bincount(index, minlength=n_bins)
+
+
+def rebin(counts, n_bins):
+    """
+    Combine the counts in a histogram into ``n_bins`` bins, which should be a
+    divisor of the number of bins in the original histogram.
+    """
+    return counts.reshape((n_bins, -1)).sum(axis=1)
+
+
+def _layer_values(layer, cid, chunk_size):
+    """
+    Iterate over the values of a component in chunks of a dataset or subset.
+    """
+
+    if isinstance(layer, Subset):
+        data = layer.data
+    else:
+        data = layer
+
+    for chunk_view, _ in iterate_chunks(data.shape, chunk_size=chunk_size):
+        values = data[cid, chunk_view]
+        if data is not layer:
+            values = values[layer.to_mask(chunk_view)]
+        yield values
+
+
+class HistogramEngine(object):
+    """
+    Compute histograms of the values of a component in a dataset or subset.
+
+    Values are read in chunks of approximately ``chunk_size`` elements, so
+    that the memory used does not scale with the size of the data. For each
+    combination of attribute and range, the engine keeps a base histogram
+    with ``base_bins`` bins, and histograms with a number of bins that divides
+    ``base_bins`` are computed from this base histogram without reading the
+    data again. Histograms with other numbers of bins are computed directly.
+
+    The engine does not know when the data changes - `reset` should be called
+    whenever the values in the dataset or the subset change.
+
+    Parameters
+    ----------
+    base_bins : int, optional
+        The number of bins in the base histograms
+    chunk_size : int, optional
+        The approximate number of elements to read at a time. Defaults to the
+        ``MASK_CHUNK_SIZE`` setting.
+    """
+
+    def __init__(self, base_bins=BASE_BINS, chunk_size=None):
+        self.base_bins = base_bins
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        """
+        Discard the cached base histogram.
+        """
+        self._base_key = None
+        self._base_counts = None
+
+    def _counts(self, layer, cid, lower, upper, n_bins, log):
+        chunk_size = self.chunk_size or settings.MASK_CHUNK_SIZE
+        counts = np.zeros(n_bins, dtype=np.intp)
+        for values in _layer_values(layer, cid, chunk_size):
+            counts += bin_counts(values, lower, upper, n_bins, log=log)
+        return counts
+
+    def histogram(self, layer, cid, lower, upper, n_bins, log=False):
+        """
+        Return the counts and bin edges of the histogram of a component.
+
+        Parameters
+        ----------
+        layer : :class:`~glue.core.data.Data` or :class:`~glue.core.subset.Subset`
+            The dataset or subset to compute the histogram for
+        cid : :class:`~glue.core.component_id.ComponentID`
+            The component to compute the histogram of
+        lower, upper : float
+            The range of the histogram
+        n_bins : int
+            The number of bins
+        log : bool, optional
+            Whether the bins should be equally spaced in log space
+        """
+
+        lower, upper = sorted([lower, upper])
+
+        edges = histogram_edges(lower, upper, n_bins, log=log)
+
+        if self.base_bins % n_bins != 0:
+            return self._counts(layer, cid, lower, upper, n_bins, log), edges
+
+        # ComponentID overloads == so we compare the layer and attribute by
+        # identity rather than comparing tuples.
+        key = (id(layer), id(cid), lower, upper, log)
+
+        if self._base_key != key:
+            self._base_counts = self._counts(layer, cid, lower, upper, self.base_bins, log)
+            self._base_key = key
+
+        return rebin(self._base_counts, n_bins), edges
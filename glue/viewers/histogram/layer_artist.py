@@ -5,6 +5,7 @@ import numpy as np
 from glue.utils import defer_draw
 
 from glue.viewers.histogram.state import HistogramLayerState
+from glue.viewers.histogram.engine import HistogramEngine
 from glue.viewers.matplotlib.layer_artist import MatplotlibLayerArtist
 from glue.core.exceptions import IncompatibleAttribute
 
@@ -23,6 +24,8 @@ class HistogramLayerArtist(MatplotlibLayerArtist):
         self._viewer_state.add_global_callback(self._update_histogram)
         self.state.add_global_callback(self._update_histogram)
 
+        self._engine = HistogramEngine()
+
         self.reset_cache()
 
     def remove(self):
@@ -41,7 +44,11 @@ class HistogramLayerArtist(MatplotlibLayerArtist):
         self.remove()
 
         try:
-            x = self.layer[self._viewer_state.x_att]
+            counts, bins = self._engine.histogram(self.layer, self._viewer_state.x_att,
+                                                  self._viewer_state.hist_x_min,
+                                                  self._viewer_state.hist_x_max,
+                                                  self._viewer_state.hist_n_bin,
+                                                  log=self._viewer_state.x_log)
         except AttributeError:
             return
         except (IncompatibleAttribute, IndexError):
@@ -50,23 +57,14 @@ class HistogramLayerArtist(MatplotlibLayerArtist):
         else:
             self.enable()
 
-        x = x[~np.isnan(x) & (x >= self._viewer_state.hist_x_min) &
-                             (x <= self._viewer_state.hist_x_max)]
-
-        if len(x) == 0:
+        if counts.sum() == 0:
             self.redraw()
             return
 
-        # For histogram
-        xmin, xmax = sorted([self._viewer_state.hist_x_min, self._viewer_state.hist_x_max])
-        if self._viewer_state.x_log:
-            range = None
-            bins = np.logspace(np.log10(xmin), np.log10(xmax), self._viewer_state.hist_n_bin)
-        else:
-            range = [xmin, xmax]
-            bins = self._viewer_state.hist_n_bin
-
-        self.mpl_hist_unscaled, self.mpl_bins, self.mpl_artists = self.axes.hist(x, range=range, bins=bins)
+        # The counts have already been computed, so we pass one value per bin
+        # with the counts as weights to get the histogram artists.
+        self.mpl_hist_unscaled, self.mpl_bins, self.mpl_artists = self.axes.hist(bins[:-1], bins=bins,
+                                                                                 weights=counts)
 
     @defer_draw
     def _scale_histogram(self):
@@ -166,6 +164,11 @@ class HistogramLayerArtist(MatplotlibLayerArtist):
         self._last_viewer_state.update(self._viewer_state.as_dict())
         self._last_layer_state.update(self.state.as_dict())
 
+        # The histogram engine caches the counts for the current attribute and
+        # range, so we need to discard these if the data or subset changed.
+        if force or 'layer' in changed:
+            self._engine.reset()
+
         if force or any(prop in changed for prop in ('layer', 'x_att', 'hist_x_min', 'hist_x_max', 'hist_n_bin', 'x_log')):
             self._calculate_histogram()
             force = True  # make sure scaling and visual attributes are updated
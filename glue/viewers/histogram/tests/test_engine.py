@@ -0,0 +1,97 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from glue.core import Data
+
+from ..engine import HistogramEngine, bin_counts, histogram_edges, rebin
+
+
+def test_bin_counts():
+
+    values = np.array([-1, 0, 1, 2.5, 5, 7.5, 10, 11, np.nan])
+
+    edges = histogram_edges(0, 10, 4)
+    assert_allclose(edges, [0, 2.5, 5, 7.5, 10])
+
+    assert_equal(bin_counts(values, 0, 10, 4), [2, 1, 1, 2])
+    assert_equal(bin_counts(values, 0, 10, 4), np.histogram(values[1:7], bins=edges)[0])
+
+
+def test_bin_counts_log():
+
+    values = np.array([-1, 0, 1, 5, 10, 50, 100, 200])
+
+    edges = histogram_edges(1, 100, 2, log=True)
+    assert_allclose(edges, [1, 10, 100])
+
+    assert_equal(bin_counts(values, 1, 100, 2, log=True), [2, 3])
+
+
+def test_rebin_edges():
+
+    # Values on the edges of the rebinned histogram should end up in the
+    # same bins as if the histogram had been computed directly.
+
+    values = np.concatenate([histogram_edges(-3.3, 7.1, 7),
+                             np.random.uniform(-4, 8, 1000)])
+
+    for n_bins in [1, 2, 3, 5, 6, 7, 15]:
+        assert_equal(rebin(bin_counts(values, -3.3, 7.1, 210), n_bins),
+                     bin_counts(values, -3.3, 7.1, n_bins))
+
+
+class TestHistogramEngine(object):
+
+    def setup_method(self, method):
+        self.data = Data(x=np.arange(1000.) % 37, y=np.arange(1000.))
+        self.subset = self.data.new_subset()
+        self.subset.subset_state = self.data.id['y'] > 499.5
+
+    def test_data(self):
+
+        engine = HistogramEngine(chunk_size=64)
+
+        counts, edges = engine.histogram(self.data, self.data.id['x'], 0, 36, 6)
+
+        expected, expected_edges = np.histogram(self.data['x'], bins=6, range=(0, 36))
+        assert_equal(counts, expected)
+        assert_allclose(edges, expected_edges)
+
+    def test_subset(self):
+
+        engine = HistogramEngine(chunk_size=64)
+
+        counts, edges = engine.histogram(self.subset, self.data.id['x'], 36, 0, 4)
+
+        expected = np.histogram(self.data['x'][500:], bins=4, range=(0, 36))[0]
+        assert_equal(counts, expected)
+
+    def test_rebin_cached(self):
+
+        engine = HistogramEngine(base_bins=12)
+
+        counts1, _ = engine.histogram(self.data, self.data.id['x'], 0, 36, 4)
+        base = engine._base_counts
+
+        # The number of bins divides the number of base bins so the base
+        # histogram should be re-used
+        counts2, _ = engine.histogram(self.data, self.data.id['x'], 0, 36, 3)
+        assert engine._base_counts is base
+        assert_equal(counts2, np.histogram(self.data['x'], bins=3, range=(0, 36))[0])
+
+        # Otherwise the histogram is computed directly
+        counts3, _ = engine.histogram(self.data, self.data.id['x'], 0, 36, 5)
+        assert engine._base_counts is base
+        assert_equal(counts3, np.histogram(self.data['x'], bins=5, range=(0, 36))[0])
+
+        # Changing the range requires a new base histogram
+        engine.histogram(self.data, self.data.id['x'], 0, 30, 3)
+        assert engine._base_counts is not base
+
+        # As does resetting the engine
+        base = engine._base_counts
+        engine.reset()
+        engine.histogram(self.data, self.data.id['x'], 0, 30, 3)
+        assert engine._base_counts is not base
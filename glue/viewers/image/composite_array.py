@@ -9,6 +9,8 @@ from matplotlib.colors import ColorConverter, Colormap
 from astropy.visualization import (LinearStretch, SqrtStretch, AsinhStretch,
                                    LogStretch, ManualInterval, ContrastBiasStretch)
 
+from glue.utils import view_key
+
 __all__ = ['CompositeArray']
 
 COLOR_CONVERTER = ColorConverter()
@@ -21,6 +23,13 @@ STRETCHES = {
 }
 
 
+def _color_key(color):
+    if isinstance(color, Colormap):
+        return id(color)
+    else:
+        return tuple(COLOR_CONVERTER.to_rgba(color))
+
+
 class CompositeArray(object):
 
     def __init__(self, **kwargs):
@@ -30,6 +39,16 @@ class CompositeArray(object):
         # 'zorder', 'visible', 'array', 'color', and 'alpha'.
         self.layers = {}
 
+        # For each layer, we keep the last plane computed (after stretching
+        # and, for colormaps, color mapping) along with the parameters used to
+        # compute it, so that only layers whose parameters have changed need
+        # to be recomputed when the composite image is requested again.
+        self._planes = {}
+
+        # Scratch buffers used when blending, which are re-used as long as
+        # the shape of the image does not change.
+        self._buffers = {}
+
         self._first = True
 
     def allocate(self, uuid):
@@ -46,6 +65,7 @@ class CompositeArray(object):
 
     def deallocate(self, uuid):
         self.layers.pop(uuid)
+        self._planes.pop(uuid, None)
 
     def set(self, uuid, **kwargs):
         for key, value in kwargs.items():
@@ -53,6 +73,26 @@ class CompositeArray(object):
                 raise KeyError("Unknown key: {0}".format(key))
             else:
                 self.layers[uuid][key] = value
+        if 'array' in kwargs:
+            self._planes.pop(uuid, None)
+
+    def clear_cache(self, uuid=None):
+        """
+        Discard cached planes, either for all layers or for a single layer.
+
+        This should be called whenever the values returned by the array of a
+        layer change.
+        """
+        if uuid is None:
+            self._planes.clear()
+        else:
+            self._planes.pop(uuid, None)
+
+    def _buffer(self, name, shape):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape, dtype=np.float32)
+        return buffer
 
     @property
     def shape(self):
@@ -73,10 +113,61 @@ class CompositeArray(object):
                 return shape
         return None
 
+    def _get_plane(self, uuid, view):
+        """
+        Return the stretched values for a layer (with NaN values set to zero)
+        if the layer uses a single color, or the RGBA values if the layer uses
+        a colormap, as a 2-d (or 3-d for RGBA values) float32 array, as well
+        as the shape of the view of the layer array. `None` is returned if the
+        layer has no data to show.
+        """
+
+        layer = self.layers[uuid]
+
+        try:
+            key = (view_key(view), tuple(layer['clim']), layer['contrast'],
+                   layer['bias'], layer['stretch'], _color_key(layer['color']))
+        except TypeError:  # views with arrays are not cached
+            key = None
+        else:
+            if uuid in self._planes and self._planes[uuid][0] == key:
+                return self._planes[uuid][1:]
+
+        if callable(layer['array']):
+            array = layer['array'](view=view)
+        else:
+            array = layer['array']
+
+        if array is None:
+            return None
+
+        if not callable(layer['array']):
+            array = array[view]
+
+        shape = np.shape(array)
+        array = np.atleast_2d(array)
+
+        interval = ManualInterval(*layer['clim'])
+        contrast_bias = ContrastBiasStretch(layer['contrast'], layer['bias'])
+
+        data = STRETCHES[layer['stretch']]()(contrast_bias(interval(array)))
+
+        if isinstance(layer['color'], Colormap):
+            plane = layer['color'](data).astype(np.float32)
+        else:
+            # We should treat NaN values as zero (post-stretch), which means
+            # that those pixels don't contribute towards the final image.
+            plane = np.nan_to_num(data).astype(np.float32)
+
+        if key is not None:
+            self._planes[uuid] = key, plane, shape
+
+        return plane, shape
+
     def __getitem__(self, view):
 
         img = None
-        visible_layers = 0
+        view_shape = None
 
         for uuid in sorted(self.layers, key=lambda x: self.layers[x]['zorder']):
 
@@ -85,86 +176,63 @@ class CompositeArray(object):
             if not layer['visible']:
                 continue
 
-            interval = ManualInterval(*layer['clim'])
-            contrast_bias = ContrastBiasStretch(layer['contrast'], layer['bias'])
+            result = self._get_plane(uuid, view)
 
-            if callable(layer['array']):
-                array = layer['array'](view=view)
-            else:
-                array = layer['array']
-
-            if array is None:
+            if result is None:
                 continue
 
-            if not callable(layer['array']):
-                array = array[view]
+            plane, view_shape = result
 
-            if np.isscalar(array):
-                scalar = True
-                array = np.atleast_2d(array)
-            else:
-                scalar = False
+            shape = plane.shape[:2]
 
-            data = STRETCHES[layer['stretch']]()(contrast_bias(interval(array)))
+            rgb = self._buffer('rgb', shape + (3,))
 
             if isinstance(layer['color'], Colormap):
 
                 if img is None:
-                    img = np.ones(data.shape + (4,))
-
-                # Compute colormapped image
-                plane = layer['color'](data)
-
-                alpha_plane = layer['alpha'] * plane[:, :, 3]
+                    img = np.ones(shape + (4,), dtype=np.float32)
 
                 # Use traditional alpha compositing
-                plane[:, :, 0] = plane[:, :, 0] * alpha_plane
-                plane[:, :, 1] = plane[:, :, 1] * alpha_plane
-                plane[:, :, 2] = plane[:, :, 2] * alpha_plane
+                alpha_plane = self._buffer('alpha', shape)
+                np.multiply(plane[:, :, 3], layer['alpha'], out=alpha_plane)
 
-                img[:, :, 0] *= (1 - alpha_plane)
-                img[:, :, 1] *= (1 - alpha_plane)
-                img[:, :, 2] *= (1 - alpha_plane)
-                img[:, :, 3] = 1
+                np.multiply(plane[:, :, :3], alpha_plane[:, :, np.newaxis], out=rgb)
+                np.subtract(1, alpha_plane, out=alpha_plane)
+                img[:, :, :3] *= alpha_plane[:, :, np.newaxis]
+                img[:, :, :3] += rgb
 
             else:
 
                 if img is None:
-                    img = np.zeros(data.shape + (4,))
+                    img = np.zeros(shape + (4,), dtype=np.float32)
 
                 # Get color and pre-multiply by alpha values
                 color = COLOR_CONVERTER.to_rgba_array(layer['color'])[0]
                 color *= layer['alpha']
 
-                # We should treat NaN values as zero (post-stretch), which means
-                # that those pixels don't contribute towards the final image.
-                reset = np.isnan(data)
-                if np.any(reset):
-                    data[reset] = 0.
-
-                plane = data[:, :, np.newaxis] * color
-                plane[:, :, 3] = 1
+                np.multiply(plane[:, :, np.newaxis], color[:3].astype(np.float32), out=rgb)
+                img[:, :, :3] += rgb
 
-                visible_layers += 1
-
-            if scalar:
-                plane = plane[0, 0]
-
-            img += plane
+            img[:, :, 3] = 1
 
         if img is None:
             if self.shape is None:
                 return None
             else:
-                img = np.zeros(self.shape + (4,))
+                img = np.zeros(self.shape + (4,), dtype=np.float32)
+
+        np.clip(img, 0, 1, out=img)
 
-        img = np.clip(img, 0, 1)
+        # Views with integer indices (e.g. a single pixel) drop the
+        # corresponding dimensions as for Numpy arrays
+        if view_shape is not None and len(view_shape) < 2:
+            img = img.reshape(view_shape + (4,))
 
         return img
 
     @property
     def dtype(self):
-        return np.float
+        return np.float32
 
     @property
     def ndim(self):
@@ -2,18 +2,21 @@ from __future__ import absolute_import, division, print_function
 
 import uuid
 import weakref
+from collections import OrderedDict
 
 import numpy as np
 
 from glue.utils import defer_draw
 
+from glue.config import settings
 from glue.viewers.image.state import ImageLayerState, ImageSubsetLayerState
+from glue.viewers.image.pyramid import ImagePyramid
 from glue.viewers.matplotlib.layer_artist import MatplotlibLayerArtist
 from glue.core.exceptions import IncompatibleAttribute
-from glue.utils import color2rgb
+from glue.utils import color2rgb, view_key
 from glue.core.link_manager import is_equivalent_cid
 from glue.core import Data, HubListener
-from glue.core.message import ComponentsChangedMessage
+from glue.core.message import ComponentsChangedMessage, SubsetUpdateMessage
 from glue.external.modest_image import imshow
 
 
@@ -117,6 +120,7 @@ class ImageLayerArtist(BaseImageLayerArtist):
         self.composite.set(self.uuid, array=self.get_image_data,
                            shape=self.get_image_shape)
         self.composite_image = self.axes._composite_image
+        self._pyramid = None
 
     def get_layer_color(self):
         if self._viewer_state.color_mode == 'One color per layer':
@@ -126,9 +130,16 @@ class ImageLayerArtist(BaseImageLayerArtist):
 
     def enable(self):
         if hasattr(self, 'composite_image'):
+            if not self.enabled:
+                self.composite.clear_cache(self.uuid)
             self.composite_image.invalidate_cache()
         super(ImageLayerArtist, self).enable()
 
+    def disable(self, reason):
+        if hasattr(self, 'composite'):
+            self.composite.clear_cache(self.uuid)
+        super(ImageLayerArtist, self).disable(reason)
+
     def remove(self):
         super(ImageLayerArtist, self).remove()
         self.composite.deallocate(self.uuid)
@@ -154,7 +165,9 @@ class ImageLayerArtist(BaseImageLayerArtist):
             return None
 
         try:
-            image = self.state.get_sliced_data(view=view)
+            image = self._get_pyramid_data(view)
+            if image is None:
+                image = self.state.get_sliced_data(view=view)
         except (IncompatibleAttribute, IndexError):
             # The following includes a call to self.clear()
             self.disable_invalid_attributes(self.state.attribute)
@@ -164,7 +177,19 @@ class ImageLayerArtist(BaseImageLayerArtist):
 
         return image
 
+    def _get_pyramid_data(self, view):
+        # When zoomed out, sample the image from a downsampled version of the
+        # current slice (if enabled) rather than from the full array.
+        if not settings.IMAGE_PYRAMID or view is None:
+            return None
+        if self._pyramid is None:
+            self._pyramid = ImagePyramid(self.state.get_sliced_data,
+                                         self.get_image_shape())
+        return self._pyramid[view]
+
     def _update_image_data(self):
+        self._pyramid = None
+        self.composite.clear_cache(self.uuid)
         self.composite_image.invalidate_cache()
         self.redraw()
 
@@ -247,12 +272,30 @@ class ImageLayerArtist(BaseImageLayerArtist):
         self.redraw()
 
 
+def subset_overlay(mask, color):
+    """
+    Convert a subset mask to an RGBA uint8 image using the specified color and
+    a transparency of 0.5.
+    """
+    rgba = np.array(color2rgb(color) + (0.5,))
+    if mask.dtype == bool:
+        lookup = np.zeros((2, 4), dtype=np.uint8)
+        lookup[1] = (255 * rgba).astype(np.uint8)
+        return lookup[mask.view(np.uint8)]
+    else:
+        return (255 * (mask[:, :, np.newaxis] * rgba)).astype(np.uint8)
+
+
 class ImageSubsetArray(object):
 
+    # The number of views for which to keep the mask and overlay
+    cache_size = 4
+
     def __init__(self, viewer_state, layer_artist):
         self._viewer_state = weakref.ref(viewer_state)
         self._layer_artist = weakref.ref(layer_artist)
         self._layer_state = weakref.ref(layer_artist.state)
+        self._cache = OrderedDict()
 
     @property
     def layer_artist(self):
@@ -277,6 +320,26 @@ class ImageSubsetArray(object):
     def nan_array(self):
         return np.ones(self.shape) * np.nan
 
+    def clear_cache(self):
+        """
+        Discard all cached masks and overlays.
+        """
+        self._cache.clear()
+
+    def _cache_key(self, view):
+
+        try:
+            key = view_key(view)
+        except TypeError:  # views with arrays are not cached
+            return None
+
+        viewer_state = self.viewer_state
+        subset = self.layer_state.layer
+
+        return (key, id(subset.subset_state), subset.data._version,
+                id(viewer_state.reference_data), viewer_state.x_att.axis,
+                viewer_state.y_att.axis, tuple(viewer_state.slices))
+
     def __getitem__(self, view=None):
 
         if (self.layer_artist is None or
@@ -287,6 +350,21 @@ class ImageSubsetArray(object):
         if not self.layer_artist._compatible_with_reference_data:
             return self.nan_array
 
+        # The overlay for a given view only changes if the subset state, data,
+        # or slice changes, so we cache the mask and the overlay for the last
+        # few views, and only re-compute the overlay if the color changes.
+
+        key = self._cache_key(view)
+        color = self.layer_state.color
+        subset_state = self.layer_state.layer.subset_state
+
+        if key in self._cache and self._cache[key][0] is subset_state:
+            _, mask, overlay_color, overlay = self._cache[key] = self._cache.pop(key)
+            if overlay_color != color:
+                overlay = subset_overlay(mask, color)
+                self._cache[key] = subset_state, mask, color, overlay
+            return overlay
+
         try:
             mask = self.layer_state.get_sliced_data(view=view)
         except IncompatibleAttribute:
@@ -295,11 +373,14 @@ class ImageSubsetArray(object):
         else:
             self.layer_artist.enable()
 
-        r, g, b = color2rgb(self.layer_state.color)
-        mask = np.dstack((r * mask, g * mask, b * mask, mask * .5))
-        mask = (255 * mask).astype(np.uint8)
+        overlay = subset_overlay(mask, color)
 
-        return mask
+        if key is not None:
+            self._cache[key] = subset_state, mask, color, overlay
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return overlay
 
     @property
     def dtype(self):
@@ -325,11 +406,28 @@ class ImageSubsetLayerArtist(BaseImageLayerArtist):
 
         self.subset_array = ImageSubsetArray(self._viewer_state, self)
 
+        self.layer.hub.subscribe(self, SubsetUpdateMessage,
+                                 handler=self._subset_updated,
+                                 filter=self._is_layer)
+
         self.image_artist = imshow(self.axes, self.subset_array,
                                    origin='lower', interpolation='nearest',
                                    vmin=0, vmax=1, aspect=self._viewer_state.aspect)
         self.mpl_artists = [self.image_artist]
 
+    def _is_layer(self, message):
+        return message.sender is self.layer
+
+    def _subset_updated(self, message):
+        if message.attribute == 'subset_state':
+            self.subset_array.clear_cache()
+
+    def _update_compatibility(self, *args, **kwargs):
+        # Changes in components can change whether the subset can be computed
+        if hasattr(self, 'subset_array'):
+            self.subset_array.clear_cache()
+        super(ImageSubsetLayerArtist, self)._update_compatibility(*args, **kwargs)
+
     @defer_draw
     def _update_visual_attributes(self):
 
@@ -0,0 +1,177 @@
+# Multi-resolution representation of a 2D image, used to avoid reading the
+# full-resolution array every time a zoomed-out view is drawn.
+
+from __future__ import absolute_import, division, print_function
+
+import warnings
+
+import numpy as np
+
+__all__ = ['ImagePyramid', 'downsample']
+
+REDUCTIONS = {'mean': np.nanmean,
+              'max': np.nanmax}
+
+
+def downsample(array, mode='mean'):
+    """
+    Downsample a 2D array by a factor of two along each dimension.
+
+    Each output pixel is computed from the (up to) four input pixels in the
+    corresponding 2x2 block, ignoring NaN values. If a dimension has an odd
+    size, the last block along that dimension only contains one row/column.
+
+    Parameters
+    ----------
+    array : `~numpy.ndarray`
+        The 2D array to downsample
+    mode : { 'mean' | 'max' }
+        How to combine the values in each block
+    """
+
+    if mode not in REDUCTIONS:
+        raise ValueError("mode should be one of {0}".format('/'.join(sorted(REDUCTIONS))))
+
+    array = np.asarray(array, dtype=float)
+
+    ny, nx = array.shape
+
+    # Pad with NaN values to an even size so that we can reshape the array
+    if ny % 2 == 1 or nx % 2 == 1:
+        padded = np.empty((ny + ny % 2, nx + nx % 2))
+        padded[ny:] = np.nan
+        padded[:, nx:] = np.nan
+        padded[:ny, :nx] = array
+        array = padded
+
+    blocks = array.reshape(array.shape[0] // 2, 2, array.shape[1] // 2, 2)
+
+    # Blocks that only contain NaN values emit warnings and give NaN, which is
+    # what we want.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return REDUCTIONS[mode](blocks, axis=(1, 3))
+
+
+class ImagePyramid(object):
+    """
+    A lazily computed pyramid of downsampled versions of a 2D image.
+
+    Level ``k`` of the pyramid is the image downsampled by a factor ``2 ** k``
+    along each dimension. Level 1 is computed by reading the full-resolution
+    image in blocks of rows, and each following level is computed from the
+    previous one, so that the full-resolution image is read at most once
+    until the pyramid is reset. Levels are only computed when they are first
+    needed.
+
+    Parameters
+    ----------
+    array : callable
+        A function that takes a ``view=`` argument (a tuple of two slices) and
+        returns the corresponding part of the full-resolution image.
+    shape : tuple
+        The shape of the full-resolution image.
+    mode : { 'mean' | 'max' }
+        How to combine pixel values when downsampling.
+    block_size : int, optional
+        The approximate number of full-resolution pixels to read at a time
+        when computing the first level.
+    """
+
+    def __init__(self, array, shape, mode='mean', block_size=2 ** 22):
+        if mode not in REDUCTIONS:
+            raise ValueError("mode should be one of {0}".format('/'.join(sorted(REDUCTIONS))))
+        self._array = array
+        self.shape = tuple(shape)
+        self.mode = mode
+        self.block_size = block_size
+        self._levels = {}
+
+    @property
+    def max_level(self):
+        """
+        The coarsest level, for which the image is a single pixel.
+        """
+        return int(np.ceil(np.log2(max(1, max(self.shape)))))
+
+    def reset(self):
+        """
+        Discard all computed levels.
+        """
+        self._levels.clear()
+
+    def level(self, k):
+        """
+        Return level ``k`` (with ``k >= 1``) of the pyramid.
+        """
+
+        if k < 1 or k > self.max_level:
+            raise ValueError("level should be between 1 and {0}".format(self.max_level))
+
+        if k not in self._levels:
+            if k == 1:
+                self._levels[k] = self._first_level()
+            else:
+                self._levels[k] = downsample(self.level(k - 1), mode=self.mode)
+
+        return self._levels[k]
+
+    def _first_level(self):
+
+        ny, nx = self.shape
+
+        # Read an even number of rows at a time so that blocks don't straddle
+        # two reads.
+        n_rows = max(2, self.block_size // max(nx, 1))
+        n_rows += n_rows % 2
+
+        result = np.empty(((ny + 1) // 2, (nx + 1) // 2))
+
+        for start in range(0, ny, n_rows):
+            stop = min(start + n_rows, ny)
+            block = self._array(view=(slice(start, stop), slice(0, nx)))
+            result[start // 2:(stop + 1) // 2] = downsample(block, mode=self.mode)
+
+        return result
+
+    def __getitem__(self, view):
+        """
+        Sample the image for a view with strides, using the coarsest level
+        which has a resolution at least as high as that of the view.
+
+        The returned array has the same shape as ``image[view]``, and each
+        value is computed from the block of pixels in the coarsest suitable
+        level that contains the corresponding full-resolution pixel. If the
+        view does not skip any pixels, or is not a tuple of two slices with
+        positive steps, `None` is returned, and the view should be read from
+        the full-resolution image instead.
+        """
+
+        if not isinstance(view, tuple) or len(view) != 2:
+            return None
+
+        if not all(isinstance(s, slice) for s in view):
+            return None
+
+        indices = [s.indices(n) for s, n in zip(view, self.shape)]
+
+        if any(step < 1 for _, _, step in indices):
+            return None
+
+        step = min(step for _, _, step in indices)
+
+        if step < 2:
+            return None
+
+        k = min(int(np.floor(np.log2(step))), self.max_level)
+
+        if k < 1:
+            return None
+
+        level = self.level(k)
+
+        factor = 2 ** k
+        iy = np.arange(*indices[0]) // factor
+        ix = np.arange(*indices[1]) // factor
+
+        return level[iy[:, np.newaxis], ix[np.newaxis, :]]
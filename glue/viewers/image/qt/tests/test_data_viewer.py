@@ -27,6 +27,8 @@ from glue.viewers.scatter.state import ScatterLayerState
 from glue.viewers.image.state import ImageLayerState, ImageSubsetLayerState
 from glue.core.link_helpers import LinkSame
 from glue.app.qt import GlueApplication
+from glue.config import settings
+from mock import patch
 
 from ..data_viewer import ImageViewer
 
@@ -580,6 +582,36 @@ class TestImageViewer(object):
         assert not self.viewer.layers[2].enabled  # image subset
         assert self.viewer.layers[3].enabled  # scatter subset
 
+    def test_pyramid(self):
+
+        data = Data(label='large', x=np.arange(10000.).reshape((100, 100)))
+        self.data_collection.append(data)
+
+        self.viewer.add_data(data)
+        layer_artist = self.viewer.layers[0]
+
+        view = (slice(0, 100, 4), slice(0, 100, 4))
+
+        assert_allclose(layer_artist.get_image_data(view=view), data['x'][view])
+        assert layer_artist._pyramid is None
+
+        with patch.dict(settings._members, IMAGE_PYRAMID=True):
+
+            image = layer_artist.get_image_data(view=view)
+            assert image.shape == (25, 25)
+            assert_allclose(image, data['x'].reshape((25, 4, 25, 4)).mean(axis=(1, 3)))
+
+            # Views that don't skip pixels use the full-resolution data
+            assert_allclose(layer_artist.get_image_data(view=(slice(0, 5), slice(0, 5))),
+                            data['x'][:5, :5])
+
+            assert layer_artist._pyramid is not None
+            self.viewer.state.layers[0].attribute = data.id['Pixel Axis 0 [y]']
+            assert layer_artist._pyramid is None
+
+            image = layer_artist.get_image_data(view=view)
+            assert_allclose(image[:, 0], np.arange(25) * 4 + 1.5)
+
 
 class TestSessions(object):
 
@@ -20,7 +20,7 @@ class TestCompositeArray(object):
         assert self.composite.shape is None
         assert self.composite.size is None
         assert self.composite.ndim == 2  # for now, this is hard-coded
-        assert self.composite.dtype is np.float  # for now, this is hard-coded
+        assert self.composite.dtype is np.float32  # for now, this is hard-coded
 
         self.composite.allocate('a')
         self.composite.set('a', array=self.array1)
@@ -28,7 +28,7 @@ class TestCompositeArray(object):
         assert self.composite.shape == (2, 2)
         assert self.composite.size == 4
         assert self.composite.ndim == 2
-        assert self.composite.dtype is np.float
+        assert self.composite.dtype is np.float32
 
     def test_shape_function(self):
 
@@ -132,3 +132,79 @@ class TestCompositeArray(object):
         self.composite.deallocate('a')
         assert self.composite.shape is None
         assert self.composite[...] is None
+
+    def test_integer_views(self):
+
+        # Integer indices drop the corresponding dimensions of the output
+
+        self.composite.allocate('a')
+        self.composite.set('a', array=self.array1, color=cm.Blues, clim=(0, 2))
+        self.composite.allocate('b')
+        self.composite.set('b', array=self.array3, color='0.5', clim=(0, 1))
+
+        full = self.composite[...]
+        assert full.shape == (2, 2, 4)
+
+        for view in [(1, 0), (0, slice(None)), (slice(None), 1), (slice(0, 1), 1)]:
+            result = self.composite[view]
+            assert result.dtype == np.float32
+            assert result.shape == full[view].shape
+            assert_allclose(result, full[view])
+
+    def test_cache(self):
+
+        arrays = [self.array1, self.array2, self.array3, self.array4]
+        funcs = [MagicMock(side_effect=lambda view=None, array=array: array[view])
+                 for array in arrays]
+
+        for i, func in enumerate(funcs):
+            self.composite.allocate(i)
+            self.composite.set(i, array=func, color=cm.Blues if i == 0 else (0, i % 2, 1, 1),
+                               clim=(0, 2), zorder=i)
+
+        def reference():
+            composite = CompositeArray()
+            for uuid, layer in self.composite.layers.items():
+                composite.allocate(uuid)
+                composite.set(uuid, **dict(layer, array=arrays[uuid]))
+            return composite[...]
+
+        result = self.composite[...]
+        assert result.dtype == np.float32
+        assert_allclose(result, reference(), atol=1e-7)
+        assert [func.call_count for func in funcs] == [1, 1, 1, 1]
+
+        # Changing the alpha only requires blending again, and changing the
+        # contrast of one layer only requires that layer to be recomputed.
+
+        self.composite.set(1, alpha=0.5)
+        self.composite.set(2, contrast=0.8, bias=0.4)
+        assert_allclose(self.composite[...], reference(), atol=1e-7)
+        assert [func.call_count for func in funcs] == [1, 1, 2, 1]
+
+        self.composite.set(0, color=cm.Reds)
+        self.composite.set(3, stretch='sqrt')
+        assert_allclose(self.composite[...], reference(), atol=1e-7)
+        assert [func.call_count for func in funcs] == [2, 1, 2, 2]
+
+        # Different views and explicitly clearing the cache require the data
+        # to be read again.
+
+        view = (slice(0, 1), slice(None))
+        assert_allclose(self.composite[view], reference()[view], atol=1e-7)
+        assert [func.call_count for func in funcs] == [3, 2, 3, 3]
+
+        self.composite.clear_cache(1)
+        self.composite[view]
+        assert [func.call_count for func in funcs] == [3, 3, 3, 3]
+
+        self.composite.clear_cache()
+        self.composite[view]
+        assert [func.call_count for func in funcs] == [4, 4, 4, 4]
+
+        # Setting the array should reset the cache for that layer
+
+        arrays[3] = self.array1
+        self.composite.set(3, array=arrays[3])
+        assert_allclose(self.composite[view], reference()[view], atol=1e-7)
+        assert [func.call_count for func in funcs] == [4, 4, 4, 4]
@@ -0,0 +1,89 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_equal
+from mock import MagicMock, patch
+
+from glue.core import Data, DataCollection
+from glue.utils import color2rgb
+
+from ..state import ImageViewerState, ImageLayerState, ImageSubsetLayerState
+from ..layer_artist import ImageSubsetArray, subset_overlay
+
+
+def test_subset_overlay():
+
+    mask = np.array([[True, False], [False, True]])
+
+    for values in (mask, mask.astype(float), np.array([[0.5, 0.], [1., 0.25]])):
+        r, g, b = color2rgb('#ff8000')
+        expected = np.dstack((r * values, g * values, b * values, values * .5))
+        expected = (255 * expected).astype(np.uint8)
+        assert_equal(subset_overlay(values, '#ff8000'), expected)
+
+
+class TestImageSubsetArray(object):
+
+    def setup_method(self, method):
+
+        self.data = Data(label='data', x=np.arange(24).reshape((2, 3, 4)))
+        self.data_collection = DataCollection([self.data])
+
+        self.subset = self.data_collection.new_subset_group(subset_state=self.data.id['x'] > 10).subsets[0]
+
+        self.viewer_state = ImageViewerState()
+        self.viewer_state.layers.append(ImageLayerState(layer=self.data, viewer_state=self.viewer_state))
+        self.viewer_state.reference_data = self.data
+
+        self.layer_state = ImageSubsetLayerState(layer=self.subset, viewer_state=self.viewer_state)
+        self.layer_state.color = '#ff0000'
+
+        self.layer_artist = MagicMock(state=self.layer_state, _compatible_with_reference_data=True)
+
+        self.array = ImageSubsetArray(self.viewer_state, self.layer_artist)
+
+    def sliced_mask(self, view):
+        return self.subset.to_mask()[self.viewer_state.slices[0]][view]
+
+    def expected(self, view, color='#ff0000'):
+        return subset_overlay(self.sliced_mask(view), color)
+
+    def test_cache(self):
+
+        view = (slice(0, 3, 2), slice(None))
+
+        with patch.object(self.layer_state, 'get_sliced_data',
+                          side_effect=self.sliced_mask) as get_sliced_data:
+
+            assert_equal(self.array[view], self.expected(view))
+            assert_equal(self.array[view], self.expected(view))
+            assert get_sliced_data.call_count == 1
+
+            # Changing the color should not require the mask to be recomputed
+            self.layer_state.color = '#00ff00'
+            assert_equal(self.array[view], self.expected(view, color='#00ff00'))
+            assert get_sliced_data.call_count == 1
+
+            # Different views are cached separately
+            assert_equal(self.array[(slice(1, 2), slice(0, 2))], self.expected((slice(1, 2), slice(0, 2)), color='#00ff00'))
+            assert_equal(self.array[view], self.expected(view, color='#00ff00'))
+            assert get_sliced_data.call_count == 2
+
+            # Changing the slice, the subset state, or the data should cause
+            # the mask to be recomputed
+
+            self.viewer_state.slices = (1, 0, 0)
+            assert_equal(self.array[view], self.expected(view, color='#00ff00'))
+            assert get_sliced_data.call_count == 3
+
+            self.subset.subset_state = self.data.id['x'] > 15
+            assert_equal(self.array[view], self.expected(view, color='#00ff00'))
+            assert get_sliced_data.call_count == 4
+
+            self.data.update_components({self.data.id['x']: np.arange(24).reshape((2, 3, 4))[::-1]})
+            assert_equal(self.array[view], self.expected(view, color='#00ff00'))
+            assert get_sliced_data.call_count == 5
+
+            self.array.clear_cache()
+            self.array[view]
+            assert get_sliced_data.call_count == 6
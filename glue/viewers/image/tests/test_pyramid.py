@@ -0,0 +1,87 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import numpy as np
+from numpy.testing import assert_allclose
+
+from ..pyramid import ImagePyramid, downsample
+
+
+class CountingArray(object):
+
+    def __init__(self, array):
+        self.array = array
+        self.n_read = 0
+
+    def __call__(self, view=None):
+        result = self.array[view]
+        self.n_read += result.size
+        return result
+
+
+def test_downsample():
+
+    array = np.arange(20.).reshape((4, 5))
+    array[0, 0] = np.nan
+
+    assert_allclose(downsample(array), [[4, 5, 6.5], [13, 15, 16.5]])
+    assert_allclose(downsample(array, mode='max'), [[6, 8, 9], [16, 18, 19]])
+
+    with pytest.raises(ValueError) as exc:
+        downsample(array, mode='median')
+    assert exc.value.args[0] == 'mode should be one of max/mean'
+
+
+@pytest.mark.parametrize('shape', [(16, 16), (17, 10), (3, 40), (1, 7)])
+def test_levels(shape):
+
+    np.random.seed(12345)
+    array = np.random.random(shape)
+
+    pyramid = ImagePyramid(CountingArray(array), shape, block_size=20)
+
+    expected = array
+    for k in range(1, pyramid.max_level + 1):
+        expected = downsample(expected)
+        assert_allclose(pyramid.level(k), expected)
+
+    assert pyramid.level(pyramid.max_level).shape == (1, 1)
+
+
+def test_getitem():
+
+    np.random.seed(12345)
+    array = np.random.random((64, 48))
+    counter = CountingArray(array)
+
+    pyramid = ImagePyramid(counter, array.shape, mode='max')
+
+    # Views that don't skip pixels should be read from the original array
+    assert pyramid[(slice(0, 10), slice(5, 20))] is None
+    assert pyramid[(slice(0, 10, 4), slice(5, 20))] is None
+    assert pyramid[(slice(None, None, -2), slice(None, None, 2))] is None
+    assert pyramid[(3, slice(None, None, 2))] is None
+    assert pyramid[None] is None
+    assert counter.n_read == 0
+
+    view = (slice(3, 60, 5), slice(1, 40, 6))
+    result = pyramid[view]
+    assert result.shape == array[view].shape
+
+    # Each value should be the maximum of the 4x4 block containing the
+    # sampled pixel
+    for i, y in enumerate(range(3, 60, 5)):
+        for j, x in enumerate(range(1, 40, 6)):
+            y0, x0 = y // 4 * 4, x // 4 * 4
+            assert result[i, j] == array[y0:y0 + 4, x0:x0 + 4].max()
+
+    # The full-resolution array should only be read once, even when panning
+    # and zooming further out.
+    assert counter.n_read == array.size
+    pyramid[(slice(10, 64, 5), slice(0, 48, 5))]
+    pyramid[(slice(0, 64, 20), slice(0, 48, 20))]
+    assert counter.n_read == array.size
+
+    pyramid.reset()
+    pyramid[view]
+    assert counter.n_read == 2 * array.size
@@ -0,0 +1,377 @@
+# Aggregation of scatter points into density maps, used to avoid binning all
+# the points in a layer every time a density map is drawn.
+
+from __future__ import absolute_import, division, print_function
+
+from math import log10
+
+import numpy as np
+
+from matplotlib.image import AxesImage
+
+from mpl_scatter_density import ScatterDensityArtist
+
+from glue.config import settings
+from glue.core.subset import Subset
+from glue.utils import iterate_chunks
+
+__all__ = ['DensityGrid', 'DensityMapArtist', 'integrate_grid']
+
+
+def _downsample_sum(array):
+    # Sum 2x2 blocks of cells, dropping the last row/column if the size is odd
+    ny, nx = array.shape[0] // 2, array.shape[1] // 2
+    return array[:2 * ny, :2 * nx].reshape((ny, 2, nx, 2)).sum(axis=(1, 3))
+
+
+def _interpolate_rows(table, edges):
+    # Linearly interpolate the rows of a table at fractional positions
+    lower = np.minimum(np.floor(edges).astype(np.intp), table.shape[0] - 2)
+    frac = (edges - lower)[:, np.newaxis]
+    return table[lower] * (1 - frac) + table[lower + 1] * frac
+
+
+def integrate_grid(array, y_edges, x_edges):
+    """
+    Sum the cells of a 2D array in the rectangular blocks defined by the
+    boundaries ``y_edges`` and ``x_edges``.
+
+    The boundaries are given in units of cells and can be fractional, in
+    which case cells that straddle a boundary are split in proportion to
+    their overlap with each block. The result has shape
+    ``(len(y_edges) - 1, len(x_edges) - 1)``. Boundaries should be increasing
+    and lie between 0 and the size of the array along each dimension.
+    """
+
+    y_edges = np.asarray(y_edges, dtype=float)
+    x_edges = np.asarray(x_edges, dtype=float)
+
+    # Only integrate over the part of the array that is needed
+    y0 = int(np.floor(y_edges[0]))
+    x0 = int(np.floor(x_edges[0]))
+    array = array[y0:int(np.ceil(y_edges[-1])), x0:int(np.ceil(x_edges[-1]))]
+
+    # Summed-area table, padded so that there are at least two rows and
+    # columns to interpolate between
+    table = np.zeros((array.shape[0] + 2, array.shape[1] + 2))
+    np.cumsum(array, axis=0, out=table[1:-1, 1:-1])
+    np.cumsum(table[1:-1, 1:-1], axis=1, out=table[1:-1, 1:-1])
+    table[-1] = table[-2]
+    table[:, -1] = table[:, -2]
+
+    table = _interpolate_rows(table, y_edges - y0)
+    table = _interpolate_rows(table.T, x_edges - x0).T
+
+    return np.diff(np.diff(table, axis=0), axis=1)
+
+
+class DensityGrid(object):
+    """
+    Counts of the points in a dataset or subset on a regular grid.
+
+    When a density map is requested for a given region, the points are binned
+    onto a grid that covers a larger region (extending by ``margin`` times
+    the size of the requested region on each side) with ``oversample`` times
+    more cells than the density map along each dimension. Coarser levels are
+    then built by summing blocks of 2x2 cells. Density maps for regions that
+    lie inside the cached region, and which don't require finer cells than
+    the cached ones, are computed from the coarsest suitable level without
+    reading the points again - cells that straddle the edges of pixels in the
+    density map are split between pixels in proportion to their overlap,
+    which assumes that points are uniformly distributed within cells. The
+    points are only binned again when
+    the view leaves the cached region or is zoomed in too far.
+
+    The points are read in chunks of approximately ``chunk_size`` elements,
+    which defaults to the ``MASK_CHUNK_SIZE`` setting, and points in subsets
+    are selected using the subset mask for each chunk.
+
+    Parameters
+    ----------
+    margin : float, optional
+        The size of the margin around the requested region to include in the
+        grid, relative to the size of the requested region.
+    oversample : int, optional
+        The minimum number of grid cells per pixel along each dimension.
+    chunk_size : int, optional
+        The approximate number of elements to read at a time.
+    """
+
+    def __init__(self, margin=0.5, oversample=2, chunk_size=None):
+        self.margin = margin
+        self.oversample = oversample
+        self.chunk_size = chunk_size
+        self.layer = None
+        self.x_att = None
+        self.y_att = None
+        self.weights_att = None
+        self.reset()
+
+    def set_points(self, layer, x_att, y_att):
+        """
+        Set the dataset or subset, and the attributes to use for the points.
+        """
+        self.layer = layer
+        self.x_att = x_att
+        self.y_att = y_att
+        self.reset()
+
+    def set_weights(self, weights_att):
+        """
+        Set the attribute to average in each pixel of the density map, or
+        `None` to only compute counts.
+        """
+        if weights_att is not self.weights_att:
+            self.weights_att = weights_att
+            self.reset()
+
+    def reset(self):
+        """
+        Discard the cached grid - this should be called whenever the values
+        of the points change.
+        """
+        self._key = None
+        self._region = None
+        self._levels = []
+
+    def _iter_points(self):
+
+        if isinstance(self.layer, Subset):
+            data = self.layer.data
+        else:
+            data = self.layer
+
+        chunk_size = self.chunk_size or settings.MASK_CHUNK_SIZE
+
+        for chunk_view, _ in iterate_chunks(data.shape, chunk_size=chunk_size):
+            x = data[self.x_att, chunk_view]
+            y = data[self.y_att, chunk_view]
+            if self.weights_att is None:
+                w = None
+            else:
+                w = data[self.weights_att, chunk_view]
+            if data is not self.layer:
+                mask = self.layer.to_mask(chunk_view)
+                x, y = x[mask], y[mask]
+                if w is not None:
+                    w = w[mask]
+            yield x, y, w
+
+    def _build(self, region, shape, x_log, y_log):
+
+        x0, x1, y0, y1 = region
+        ny, nx = shape
+
+        counts = np.zeros(ny * nx, dtype=np.intp)
+        if self.weights_att is None:
+            sums = None
+        else:
+            sums = np.zeros(ny * nx)
+
+        if self.layer is not None:
+
+            for x, y, w in self._iter_points():
+
+                x = np.asarray(x, dtype=float).ravel()
+                y = np.asarray(y, dtype=float).ravel()
+
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    if x_log:
+                        x = np.log10(x)
+                    if y_log:
+                        y = np.log10(y)
+                    keep = (x >= x0) & (x < x1) & (y >= y0) & (y < y1)
+
+                ix = ((x[keep] - x0) * (nx / (x1 - x0))).astype(np.intp)
+                iy = ((y[keep] - y0) * (ny / (y1 - y0))).astype(np.intp)
+                np.clip(ix, 0, nx - 1, out=ix)
+                np.clip(iy, 0, ny - 1, out=iy)
+                index = iy * nx + ix
+
+                counts += np.bincount(index, minlength=ny * nx)
+                if sums is not None:
+                    w = np.asarray(w, dtype=float).ravel()[keep]
+                    valid = ~np.isnan(w)
+                    sums += np.bincount(index[valid], weights=w[valid], minlength=ny * nx)
+
+        levels = [(counts.reshape(shape), None if sums is None else sums.reshape(shape))]
+
+        while min(levels[-1][0].shape) >= 2:
+            counts, sums = levels[-1]
+            levels.append((_downsample_sum(counts),
+                           None if sums is None else _downsample_sum(sums)))
+
+        self._region = region
+        self._levels = levels
+
+    def _find_level(self, xmin, xmax, ymin, ymax, nx, ny):
+
+        # Return the coarsest cached level that covers the requested region
+        # with at least ``oversample`` cells per pixel, or `None`.
+
+        if self._region is None:
+            return None
+
+        x0, x1, y0, y1 = self._region
+        ny0, nx0 = self._levels[0][0].shape
+        dx0, dy0 = (x1 - x0) / nx0, (y1 - y0) / ny0
+
+        dx_max = (xmax - xmin) / nx / self.oversample
+        dy_max = (ymax - ymin) / ny / self.oversample
+
+        for level in range(len(self._levels) - 1, -1, -1):
+            scale = 2 ** level
+            dx, dy = dx0 * scale, dy0 * scale
+            if dx > dx_max or dy > dy_max:
+                continue
+            ny_level, nx_level = self._levels[level][0].shape
+            if (xmin >= x0 and xmax <= x0 + nx_level * dx and
+                    ymin >= y0 and ymax <= y0 + ny_level * dy):
+                return level
+
+        return None
+
+    def histogram(self, xmin, xmax, ymin, ymax, nx, ny, x_log=False, y_log=False):
+        """
+        Return a density map of the points.
+
+        Parameters
+        ----------
+        xmin, xmax, ymin, ymax : float
+            The region to compute the density map for. If ``x_log`` or
+            ``y_log`` are set, the limits along the corresponding axis should
+            be given as the log10 of the values.
+        nx, ny : int
+            The number of pixels along each dimension.
+        x_log, y_log : bool, optional
+            Whether the pixels should be equally spaced in log10 of the values.
+
+        Returns
+        -------
+        counts : `~numpy.ndarray`
+            The (approximate) number of points in each pixel, with shape
+            ``(ny, nx)``.
+        sums : `~numpy.ndarray`
+            The sum of the weights in each pixel, or `None` if no weights
+            attribute is set.
+        """
+
+        if not (xmax > xmin and ymax > ymin):
+            empty = np.zeros((ny, nx))
+            return empty, None if self.weights_att is None else empty.copy()
+
+        key = (x_log, y_log)
+
+        if self._key != key:
+            self.reset()
+            self._key = key
+
+        level = self._find_level(xmin, xmax, ymin, ymax, nx, ny)
+
+        if level is None:
+            width = xmax - xmin
+            height = ymax - ymin
+            region = (xmin - self.margin * width, xmax + self.margin * width,
+                      ymin - self.margin * height, ymax + self.margin * height)
+            scale = 1 + 2 * self.margin
+            shape = (int(np.ceil(ny * self.oversample * scale)),
+                     int(np.ceil(nx * self.oversample * scale)))
+            self._build(region, shape, x_log, y_log)
+            level = 0
+
+        x0, x1, y0, y1 = self._region
+        counts, sums = self._levels[level]
+        ny0, nx0 = self._levels[0][0].shape
+        dx = (x1 - x0) / nx0 * 2 ** level
+        dy = (y1 - y0) / ny0 * 2 ** level
+
+        x_edges = (np.linspace(xmin, xmax, nx + 1) - x0) / dx
+        y_edges = (np.linspace(ymin, ymax, ny + 1) - y0) / dy
+        np.clip(x_edges, 0, counts.shape[1], out=x_edges)
+        np.clip(y_edges, 0, counts.shape[0], out=y_edges)
+
+        if sums is None:
+            return integrate_grid(counts, y_edges, x_edges), None
+        else:
+            return integrate_grid(counts, y_edges, x_edges), integrate_grid(sums, y_edges, x_edges)
+
+
+class DensityMapArtist(ScatterDensityArtist):
+    """
+    A version of :class:`~mpl_scatter_density.ScatterDensityArtist` which
+    computes the density map from a :class:`DensityGrid` rather than from
+    arrays of points.
+    """
+
+    def __init__(self, ax, grid, **kwargs):
+        self.grid = grid
+        super(DensityMapArtist, self).__init__(ax, [], [], **kwargs)
+
+    def make_image(self, *args, **kwargs):
+
+        xmin, xmax = self._ax.get_xlim()
+        ymin, ymax = self._ax.get_ylim()
+
+        if self._dpi is None:
+            dpi = self.axes.figure.get_dpi()
+        else:
+            dpi = self._dpi
+
+        width = (self._ax.get_position().width *
+                 self._ax.figure.get_figwidth())
+        height = (self._ax.get_position().height *
+                  self._ax.figure.get_figheight())
+
+        nx = max(int(round(width * dpi)), 1)
+        ny = max(int(round(height * dpi)), 1)
+
+        flip_x = xmin > xmax
+        flip_y = ymin > ymax
+
+        if flip_x:
+            xmin, xmax = xmax, xmin
+
+        if flip_y:
+            ymin, ymax = ymax, ymin
+
+        x_log = self._ax.get_xscale() == 'log'
+        y_log = self._ax.get_yscale() == 'log'
+
+        if x_log:
+            xmin, xmax = log10(xmin), log10(xmax)
+
+        if y_log:
+            ymin, ymax = log10(ymin), log10(ymax)
+
+        counts, sums = self.grid.histogram(xmin, xmax, ymin, ymax, nx, ny,
+                                           x_log=x_log, y_log=y_log)
+
+        if sums is None:
+            array = counts
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                array = sums / counts
+
+        if flip_x:
+            array = array[:, ::-1]
+
+        if flip_y:
+            array = array[::-1, :]
+
+        if self.origin == 'upper':
+            array = np.flipud(array)
+
+        if callable(self._density_vmin):
+            vmin = self._density_vmin(array)
+        else:
+            vmin = self._density_vmin
+
+        if callable(self._density_vmax):
+            vmax = self._density_vmax(array)
+        else:
+            vmax = self._density_vmax
+
+        self.set_data(array)
+        AxesImage.set_clim(self, vmin, vmax)
+
+        return AxesImage.make_image(self, *args, **kwargs)
@@ -12,6 +12,7 @@ from astropy.visualization import (ImageNormalize, LinearStretch, SqrtStretch,
 
 from glue.utils import defer_draw, broadcast_to
 from glue.viewers.scatter.state import ScatterLayerState
+from glue.viewers.scatter.density import DensityGrid, DensityMapArtist
 from glue.viewers.matplotlib.layer_artist import MatplotlibLayerArtist
 from glue.core.exceptions import IncompatibleAttribute
 
@@ -90,9 +91,10 @@ class ScatterLayerArtist(MatplotlibLayerArtist):
 
         # Scatter density
         self.density_auto_limits = DensityMapLimits()
-        self.density_artist = ScatterDensityArtist(self.axes, [], [], color='white',
-                                                   vmin=self.density_auto_limits.min,
-                                                   vmax=self.density_auto_limits.max)
+        self.density_grid = DensityGrid()
+        self.density_artist = DensityMapArtist(self.axes, self.density_grid, color='white',
+                                               vmin=self.density_auto_limits.min,
+                                               vmax=self.density_auto_limits.max)
         self.axes.add_artist(self.density_artist)
 
         self.mpl_artists = [self.scatter_artist, self.plot_artist,
@@ -134,7 +136,11 @@ class ScatterLayerArtist(MatplotlibLayerArtist):
 
         if self.state.markers_visible:
             if self.state.density_map:
-                self.density_artist.set_xy(x, y)
+                # The density map is computed from the data as needed when
+                # drawing, so we only need to tell it which points to use.
+                self.density_grid.set_points(self.layer, self._viewer_state.x_att,
+                                             self._viewer_state.y_att)
+                self.density_artist.stale = True
                 self.plot_artist.set_data([], [])
                 self.scatter_artist.set_offsets(np.zeros((0, 2)))
             else:
@@ -143,16 +149,16 @@ class ScatterLayerArtist(MatplotlibLayerArtist):
                     # better performance than scatter.
                     self.plot_artist.set_data(x, y)
                     self.scatter_artist.set_offsets(np.zeros((0, 2)))
-                    self.density_artist.set_xy([], [])
+                    self.density_grid.set_points(None, None, None)
                 else:
                     self.plot_artist.set_data([], [])
                     offsets = np.vstack((x, y)).transpose()
                     self.scatter_artist.set_offsets(offsets)
-                    self.density_artist.set_xy([], [])
+                    self.density_grid.set_points(None, None, None)
         else:
             self.plot_artist.set_data([], [])
             self.scatter_artist.set_offsets(np.zeros((0, 2)))
-            self.density_artist.set_xy([], [])
+            self.density_grid.set_points(None, None, None)
 
         if self.state.line_visible:
             if self.state.cmap_mode == 'Fixed':
@@ -256,13 +262,14 @@ class ScatterLayerArtist(MatplotlibLayerArtist):
 
                 if self.state.cmap_mode == 'Fixed':
                     if force or 'color' in changed or 'cmap_mode' in changed:
+                        self.density_grid.set_weights(None)
                         self.density_artist.set_color(self.state.color)
                         self.density_artist.set_c(None)
                         self.density_artist.set_clim(self.density_auto_limits.min,
                                                      self.density_auto_limits.max)
                 elif force or any(prop in changed for prop in CMAP_PROPERTIES):
-                    c = self.layer[self.state.cmap_att].ravel()
-                    set_mpl_artist_cmap(self.density_artist, c, self.state)
+                    self.density_grid.set_weights(self.state.cmap_att)
+                    set_mpl_artist_cmap(self.density_artist, None, self.state)
 
                 if force or 'stretch' in changed:
                     self.density_artist.set_norm(ImageNormalize(stretch=STRETCHES[self.state.stretch]()))
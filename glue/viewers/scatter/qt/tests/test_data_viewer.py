@@ -236,11 +236,13 @@ class TestScatterViewer(object):
 
         self.viewer.add_data(self.data)
         self.viewer.state.layers[0].points_mode = 'auto'
-        assert len(self.viewer.layers[0].density_artist._x) == 0
+        assert self.viewer.layers[0].density_grid.layer is None
         self.viewer.state.layers[0].points_mode = 'density'
-        assert len(self.viewer.layers[0].density_artist._x) == 4
+        assert self.viewer.layers[0].density_grid.layer is self.data
+        counts, _ = self.viewer.layers[0].density_grid.histogram(-10, 10, -10, 10, 4, 4)
+        assert_allclose(counts.sum(), 4)
         self.viewer.state.layers[0].points_mode = 'markers'
-        assert len(self.viewer.layers[0].density_artist._x) == 0
+        assert self.viewer.layers[0].density_grid.layer is None
 
     @pytest.mark.parametrize('protocol', [0, 1])
     def test_session_back_compat(self, protocol):
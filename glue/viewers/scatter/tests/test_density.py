@@ -0,0 +1,101 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from glue.core import Data
+
+from ..density import DensityGrid, integrate_grid
+
+
+def test_integrate_grid():
+
+    array = np.arange(20.).reshape((4, 5))
+
+    assert_allclose(integrate_grid(array, [0, 2, 2, 4], [1, 3, 5]),
+                    [[16, 24], [0, 0], [56, 64]])
+
+    # Cells on fractional boundaries are split between blocks
+    assert_allclose(integrate_grid(array, [0.5, 4], [0, 2.5, 5]),
+                    [[array[:, :2].sum() + array[:, 2].sum() / 2 - 0.5 * array[0, :2].sum() - array[0, 2] / 4,
+                      array[:, 3:].sum() + array[:, 2].sum() / 2 - 0.5 * array[0, 3:].sum() - array[0, 2] / 4]])
+
+
+class TestDensityGrid(object):
+
+    def setup_method(self, method):
+        rng = np.random.RandomState(12345)
+        self.data = Data(x=rng.normal(0, 1, 10000),
+                         y=rng.normal(0, 2, 10000),
+                         w=rng.uniform(0, 1, 10000))
+        self.subset = self.data.new_subset()
+        self.subset.subset_state = self.data.id['w'] > 0.5
+
+    def expected(self, mask, xmin, xmax, ymin, ymax, nx, ny, weights=None):
+        x, y = self.data['x'][mask], self.data['y'][mask]
+        if weights is not None:
+            weights = weights[mask]
+        return np.histogram2d(y, x, bins=(ny, nx), weights=weights,
+                              range=((ymin, ymax), (xmin, xmax)))[0]
+
+    def test_counts(self):
+
+        grid = DensityGrid(chunk_size=1000)
+        grid.set_points(self.data, self.data.id['x'], self.data.id['y'])
+
+        counts, sums = grid.histogram(-2, 2, -3, 3, 20, 15)
+        assert sums is None
+        assert_allclose(counts, self.expected(Ellipsis, -2, 2, -3, 3, 20, 15))
+
+    def test_subset_weights(self):
+
+        grid = DensityGrid(chunk_size=1000)
+        grid.set_points(self.subset, self.data.id['x'], self.data.id['y'])
+        grid.set_weights(self.data.id['w'])
+
+        mask = self.data['w'] > 0.5
+
+        counts, sums = grid.histogram(-2, 2, -3, 3, 20, 15)
+        assert_allclose(counts, self.expected(mask, -2, 2, -3, 3, 20, 15))
+        assert_allclose(sums, self.expected(mask, -2, 2, -3, 3, 20, 15,
+                                            weights=self.data['w']))
+
+    def test_cache(self):
+
+        grid = DensityGrid()
+        grid.set_points(self.data, self.data.id['x'], self.data.id['y'])
+
+        grid.histogram(-2, 2, -3, 3, 20, 15)
+        levels = grid._levels
+
+        # Panning and zooming out by less than the margin uses the cached
+        # grid. If the pixel edges line up with the grid cells, the result is
+        # exact.
+        counts, _ = grid.histogram(-1.8, 2.2, -2.6, 3.4, 20, 15)
+        assert grid._levels is levels
+        assert_allclose(counts, self.expected(Ellipsis, -1.8, 2.2, -2.6, 3.4, 20, 15))
+
+        counts, _ = grid.histogram(-3, 3, -4.5, 4.5, 20, 15)
+        assert grid._levels is levels
+        assert_allclose(counts.sum(), self.expected(Ellipsis, -3, 3, -4.5, 4.5, 20, 15).sum())
+
+        # Zooming in requires a finer grid
+        grid.histogram(-1, 1, -1.5, 1.5, 20, 15)
+        assert grid._levels is not levels
+
+        # As does panning outside the cached region
+        levels = grid._levels
+        grid.histogram(5, 7, -1.5, 1.5, 20, 15)
+        assert grid._levels is not levels
+
+    def test_log(self):
+
+        grid = DensityGrid()
+        grid.set_points(self.data, self.data.id['w'], self.data.id['y'])
+
+        counts, _ = grid.histogram(-2, 0, -3, 3, 10, 10, x_log=True)
+
+        x = np.log10(self.data['w'])
+        expected = np.histogram2d(self.data['y'], x, bins=(10, 10),
+                                  range=((-3, 3), (-2, 0)))[0]
+        assert_allclose(counts, expected)
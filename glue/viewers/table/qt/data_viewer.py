@@ -1,6 +1,8 @@
 from __future__ import absolute_import, division, print_function
 
 import os
+from collections import OrderedDict
+
 import numpy as np
 
 from qtpy.QtCore import Qt
@@ -28,8 +30,21 @@ __all__ = ['TableViewer', 'TableLayerArtist']
 COLOR_CONVERTER = ColorConverter()
 
 
+def _format_values(values):
+    """
+    Convert an array of values to a list of strings to show in the table.
+    """
+    return [value.decode('ascii') if isinstance(value, bytes) else str(value)
+            for value in values]
+
+
 class DataTableModel(QtCore.QAbstractTableModel):
 
+    # Values and colors are computed for blocks of rows at a time (in the
+    # current sort order) and cached until the data or subsets change.
+    block_size = 1024
+    max_blocks = 32
+
     def __init__(self, table_viewer):
         super(DataTableModel, self).__init__()
         if table_viewer.data.ndim != 1:
@@ -37,9 +52,21 @@ class DataTableModel(QtCore.QAbstractTableModel):
         self._table_viewer = table_viewer
         self._data = table_viewer.data
         self.show_hidden = False
-        self.order = np.arange(self._data.shape[0])
+        self._order = np.arange(self._data.shape[0])
+        self._blocks = OrderedDict()
+        self._sort_cache = {}
+
+    @property
+    def order(self):
+        return self._order
+
+    @order.setter
+    def order(self, value):
+        self._order = value
+        self._blocks.clear()
 
     def data_changed(self):
+        self._blocks.clear()
         top_left = self.index(0, 0)
         bottom_right = self.index(self.columnCount(), self.rowCount())
         self.dataChanged.emit(top_left, bottom_right)
@@ -72,6 +99,91 @@ class DataTableModel(QtCore.QAbstractTableModel):
         elif orientation == Qt.Vertical:
             return str(self.order[section])
 
+    def _get_block(self, row):
+        """
+        Return the block containing a given row, as well as the position of
+        the row inside the block.
+        """
+
+        index = row // self.block_size
+
+        if index in self._blocks:
+            block = self._blocks[index] = self._blocks.pop(index)
+        else:
+            start = index * self.block_size
+            block = {'rows': self.order[start:start + self.block_size],
+                     'text': {}, 'brushes': None}
+            self._blocks[index] = block
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+        return block, row - index * self.block_size
+
+    def _block_text(self, block, cid):
+
+        if id(cid) not in block['text']:
+            comp = self._data.get_component(cid)
+            if comp.categorical:
+                values = comp.labels[block['rows']]
+            else:
+                values = comp[block['rows']]
+            block['text'][id(cid)] = _format_values(values)
+
+        return block['text'][id(cid)]
+
+    def _block_brushes(self, block):
+
+        if block['brushes'] is not None:
+            return block['brushes']
+
+        rows = block['rows']
+
+        # Find which subsets each row is part of
+        colors = []
+        masks = []
+        for layer_artist in self._table_viewer.layers[::-1]:
+            if isinstance(layer_artist.layer, Data):
+                continue
+            if layer_artist.visible:
+                subset = layer_artist.layer
+                try:
+                    mask = subset.to_mask(view=rows)
+                except IncompatibleAttribute as exc:
+                    layer_artist.disable_invalid_attributes(*exc.args)
+                else:
+                    layer_artist.enabled = True
+                    colors.append(subset.style.color)
+                    masks.append(mask)
+
+        if len(masks) == 0:
+            block['brushes'] = [None] * len(rows)
+            return block['brushes']
+
+        # Blend the colors using alpha blending, only once for each distinct
+        # combination of subsets. To find the combinations, we pack the
+        # membership of each row in groups of up to 32 subsets into integers
+        # and combine these with the combinations found so far.
+        masks = np.array(masks, dtype=bool).reshape((len(masks), -1))
+        inverse = np.zeros(masks.shape[1], dtype=np.int64)
+        for start in range(0, len(masks), 32):
+            bits = masks[start:start + 32].astype(np.int64)
+            key = (1 << np.arange(len(bits), dtype=np.int64)).dot(bits)
+            first, inverse = np.unique(inverse * 2 ** 32 + key, return_index=True,
+                                       return_inverse=True)[1:]
+        combinations = masks[:, first]
+        brushes = []
+        for membership in combinations.T:
+            if np.any(membership):
+                color = alpha_blend_colors([color for color, member in zip(colors, membership) if member],
+                                           additional_alpha=0.5)
+                brushes.append(QtGui.QBrush(mpl_to_qt4_color(color)))
+            else:
+                brushes.append(None)
+
+        block['brushes'] = [brushes[i] for i in inverse.ravel()]
+
+        return block['brushes']
+
     def data(self, index, role):
 
         if not index.isValid():
@@ -79,52 +191,34 @@ class DataTableModel(QtCore.QAbstractTableModel):
 
         if role == Qt.DisplayRole:
 
-            c = self.columns[index.column()]
-            idx = self.order[index.row()]
-            comp = self._data.get_component(c)
-            if comp.categorical:
-                comp = comp.labels
-            else:
-                comp = comp.data
-            if isinstance(comp[idx], bytes):
-                return comp[idx].decode('ascii')
-            else:
-                return str(comp[idx])
+            block, position = self._get_block(index.row())
+            return self._block_text(block, self.columns[index.column()])[position]
 
         elif role == Qt.BackgroundRole:
 
-            idx = self.order[index.row()]
-
-            # Find all subsets that this index is part of
-            colors = []
-            for layer_artist in self._table_viewer.layers[::-1]:
-                if isinstance(layer_artist.layer, Data):
-                    continue
-                if layer_artist.visible:
-                    subset = layer_artist.layer
-                    try:
-                        if subset.to_mask(view=slice(idx, idx + 1))[0]:
-                            colors.append(subset.style.color)
-                    except IncompatibleAttribute as exc:
-                        layer_artist.disable_invalid_attributes(*exc.args)
-                    else:
-                        layer_artist.enabled = True
-
-            # Blend the colors using alpha blending
-            if len(colors) > 0:
-                color = alpha_blend_colors(colors, additional_alpha=0.5)
-                color = mpl_to_qt4_color(color)
-                return QtGui.QBrush(color)
+            block, position = self._get_block(index.row())
+            return self._block_brushes(block)[position]
+
+    def _argsort(self, cid):
+        """
+        Return the indices that sort the data by a given component. These
+        are cached for each component until the data changes.
+        """
+        cached = self._sort_cache.get(id(cid))
+        if cached is None or cached[0] is not cid or cached[1] != self._data._version:
+            comp = self._data.get_component(cid)
+            if comp.categorical:
+                order = np.argsort(comp.labels)
+            else:
+                order = np.argsort(comp.data)
+            cached = self._sort_cache[id(cid)] = cid, self._data._version, order
+        return cached[2]
 
     def sort(self, column, ascending):
-        c = self.columns[column]
-        comp = self._data.get_component(c)
-        if comp.categorical:
-            self.order = np.argsort(comp.labels)
-        else:
-            self.order = np.argsort(comp.data)
+        order = self._argsort(self.columns[column])
         if ascending == Qt.DescendingOrder:
-            self.order = self.order[::-1]
+            order = order[::-1]
+        self.order = order
         self.layoutChanged.emit()
 
 
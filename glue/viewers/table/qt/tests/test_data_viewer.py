@@ -2,7 +2,8 @@ from __future__ import absolute_import, division, print_function
 
 import pytest
 import numpy as np
-from mock import MagicMock
+from mock import MagicMock, patch
+from numpy.testing import assert_equal
 
 from qtpy import QtCore, QtGui
 from glue.utils.qt import get_qapp
@@ -59,6 +60,33 @@ class TestDataTableModel():
                 result = self.model.data(idx, Qt.DisplayRole)
                 assert float(result) == self.data[c].ravel()[j]
 
+    def test_data_blocks(self):
+        self.model.block_size = 3
+        self.model.max_blocks = 1
+        for j in range(self.data.size):
+            idx = self.model.index(j, 1)
+            assert self.model.data(idx, Qt.DisplayRole) == str(self.data['y'][j])
+            assert len(self.model._blocks) == 1
+        self.model.data_changed()
+        assert len(self.model._blocks) == 0
+
+    def test_sort_cache(self):
+
+        with patch.object(np, 'argsort', wraps=np.argsort) as argsort:
+
+            self.model.sort(0, Qt.DescendingOrder)
+            assert_equal(self.model.order, [3, 2, 1, 0])
+            self.model.sort(1, Qt.AscendingOrder)
+            self.model.sort(0, Qt.AscendingOrder)
+            assert_equal(self.model.order, [0, 1, 2, 3])
+            assert argsort.call_count == 2
+
+            # The sort order should be recomputed if the data changes
+            self.data.update_components({self.data.id['x']: [4, 1, 3, 2]})
+            self.model.sort(0, Qt.AscendingOrder)
+            assert_equal(self.model.order, [1, 3, 2, 0])
+            assert argsort.call_count == 3
+
 
 def check_values_and_color(model, data, colors):
 